@@ -0,0 +1,331 @@
+"""Cold tier for completed tasks.
+
+Tasks completed more than N days ago move out of the store into an
+append-only gzip file, one JSON line per archived task
+(``{"archivedAt": ..., "task": {...}}``). Each archive run appends whole
+gzip members and never rewrites earlier ones. Unarchiving reinserts the
+task into the store and appends a tombstone (task id plus archivedAt) to a
+small uncompressed sidecar file, so the archive itself stays append-only.
+
+Only the tombstones, per-project counts of live entries and the byte
+offset of each gzip member are held in memory; queries stream the file
+from the member holding their cursor. That summary is rebuilt whenever either
+file's ``file_signature`` changes, so several workers can share an
+archive, and every write holds a ``FileLock`` on it.
+
+A task is appended to the archive before it is deleted from the store,
+and reinserted (and flushed to disk) before its tombstone is written, so
+a crash in between leaves it in both tiers. The store's copy wins: rebuilding the summary
+tombstones any live entry whose id is still in the store. A crash in the
+middle of an append leaves a torn final member, which the rebuild cuts
+off.
+"""
+from bisect import bisect_right
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+import gzip
+import json
+import os
+import threading
+import zlib
+
+from storage import FileLock, fcntl, file_signature
+from telemetry import REGISTRY, get_logger
+
+log = get_logger("archive")
+
+ARCHIVE_TASKS = REGISTRY.counter("archive_tasks_total", "Tasks moved between the store and the archive", ("op",))
+
+# Entries per gzip member; bounds what a reader buffers and what a torn append can lose
+MEMBER_SIZE = 1000
+READ_CHUNK = 1 << 16
+UNSET = object()
+
+
+class ArchiveDamaged(Exception):
+    """The archive holds bytes that do not decompress (not just a torn tail)."""
+
+
+class _Summary:
+    __slots__ = ("signature", "removed", "counts", "members", "size")
+
+    def __init__(self, signature: tuple, removed: set, counts: Counter, members: list, size: int):
+        self.signature = signature  # (archive, tombstones) file signatures it was built from
+        self.removed = removed      # (task id, archivedAt) of unarchived entries
+        self.counts = counts        # projectId (None = inbox) -> live entries
+        self.members = members      # (first position, byte offset) of each gzip member
+        self.size = size            # entries in the archive, live or not
+
+
+class TaskArchive:
+    """Append-only gzip archive of completed tasks, with tombstones for unarchived ones."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.removed_path = path.removesuffix(".gz").removesuffix(".jsonl") + ".removed.jsonl"
+        self._summary: Optional[_Summary] = None
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(path) if fcntl is not None else None
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if self._file_lock is None:
+                yield
+                return
+            self._file_lock.acquire()
+            try:
+                yield
+            finally:
+                self._file_lock.release()
+
+    def close(self) -> None:
+        if self._file_lock is not None:
+            self._file_lock.close()
+
+    # --- Reading the archive ---
+    def _members(self, repair: bool = False, offset: int = 0) -> Iterator[tuple[int, list[bytes]]]:
+        """Yield (byte offset, lines) of each complete gzip member from ``offset`` on, in order.
+
+        A member cut short at the end of the file is a crash mid-append (or
+        another process still writing): it is skipped, and with ``repair``
+        truncated away. Undecodable bytes anywhere raise ArchiveDamaged.
+        """
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+
+        with f:
+            f.seek(offset)
+            start = offset  # offset of the member being decoded
+            consumed = 0  # bytes of it fed to the decoder so far
+            decoder = zlib.decompressobj(wbits=31)
+            text = b""
+            while chunk := f.read(READ_CHUNK):
+                while chunk:
+                    try:
+                        text += decoder.decompress(chunk)
+                    except zlib.error as e:
+                        raise ArchiveDamaged(f"{self.path} does not decompress at offset {start}: {e}")
+                    if not decoder.eof:
+                        consumed += len(chunk)
+                        break
+                    consumed += len(chunk) - len(decoder.unused_data)
+                    yield start, text.splitlines()
+                    start, consumed, text = start + consumed, 0, b""
+                    chunk = decoder.unused_data
+                    decoder = zlib.decompressobj(wbits=31)
+
+        if consumed and repair:
+            log.warning("archive torn tail removed", path=self.path, offset=start, bytes=consumed)
+            os.truncate(self.path, start)
+
+    def _entries(self, start: tuple[int, int] = (0, 0)) -> Iterator[tuple[int, dict]]:
+        """(position, entry) for every archived entry from the member at ``start`` (first position, offset).
+
+        Positions are stable since the file only grows.
+        """
+        position, offset = start
+        for _, lines in self._members(offset=offset):
+            for line in lines:
+                yield position, json.loads(line)
+                position += 1
+
+    def _read_removed(self) -> set:
+        removed = set()
+        try:
+            with open(self.removed_path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a torn line; a later rebuild re-tombstones what it covered
+                    removed.add((entry["id"], entry["archivedAt"]))
+        except FileNotFoundError:
+            pass
+        return removed
+
+    def _signature(self) -> tuple:
+        return file_signature(self.path), file_signature(self.removed_path)
+
+    def _current(self, store) -> _Summary:
+        """The summary, rebuilt if either file changed since it was taken; the file lock is held."""
+        summary = self._summary
+        if summary is not None and summary.signature == self._signature():
+            return summary
+
+        removed = self._read_removed()
+        hot_ids = {task["id"] for task in store.all("tasks")}
+        counts, stale, members, size = Counter(), [], [], 0
+        for offset, lines in self._members(repair=True):
+            members.append((size, offset))
+            size += len(lines)
+            for line in lines:
+                entry = json.loads(line)
+                task = entry["task"]
+                key = (task["id"], entry["archivedAt"])
+                if key in removed:
+                    continue
+                if task["id"] in hot_ids:
+                    stale.append(key)
+                    continue
+                counts[task.get("projectId")] += 1
+        if stale:
+            log.warning("archive entries still in the store", count=len(stale))
+            self._append_removed(stale)
+            removed.update(stale)
+
+        self._summary = _Summary(self._signature(), removed, counts, members, size)
+        return self._summary
+
+    def counts(self, store) -> dict[Optional[str], int]:
+        """Live archived tasks per projectId (None = inbox)."""
+        with self._locked():
+            return dict(+self._current(store).counts)
+
+    def query(self, store, project_id=UNSET, search: Optional[str] = None,
+              completed_after: Optional[str] = None, completed_before: Optional[str] = None,
+              after: Optional[int] = None, limit: Optional[int] = None
+              ) -> tuple[list[dict], Optional[int], Optional[int]]:
+        """Archived tasks in archive order (oldest runs first), each with its ``archivedAt``.
+
+        Returns (page, total, next_after): ``total`` is known without a scan
+        only when filtering by project alone and is None otherwise;
+        ``next_after`` is the position to resume from, or None on the last page.
+        """
+        with self._locked():
+            summary = self._current(store)
+            removed = summary.removed
+            # Resume from the member holding the entry after the cursor.
+            start = (0, 0)
+            if after is not None:
+                index = bisect_right(summary.members, (after + 1, float("inf"))) - 1
+                if index >= 0:
+                    start = summary.members[index]
+            if search or completed_after or completed_before:
+                total = None
+            elif project_id is UNSET:
+                total = sum(summary.counts.values())
+            else:
+                total = summary.counts.get(project_id, 0)
+
+        needle = search.lower() if search else None
+        page, after_last = [], None
+        for position, entry in self._entries(start):
+            if after is not None and position <= after:
+                continue
+            task = entry["task"]
+            if (task["id"], entry["archivedAt"]) in removed:
+                continue
+            if project_id is not UNSET and task.get("projectId") != project_id:
+                continue
+            completed = task.get("completedAt") or ""
+            if completed_after and completed < completed_after:
+                continue
+            if completed_before and completed > completed_before:
+                continue
+            if needle and needle not in (task.get("text") or "").lower():
+                continue
+            if limit is not None and len(page) == limit:
+                return page, total, after_last
+            page.append({**task, "archivedAt": entry["archivedAt"]})
+            after_last = position
+        return page, total, None
+
+    # --- Moving tasks between tiers ---
+    def archive(self, store, older_than_days: float, now: Optional[datetime] = None) -> int:
+        """Move tasks completed more than ``older_than_days`` ago into the archive; returns how many."""
+        now = now or datetime.utcnow()
+        cutoff = (now - timedelta(days=older_than_days)).isoformat() + "Z"
+        archived_at = now.isoformat() + "Z"
+
+        with self._locked():
+            summary = self._current(store)
+            tasks = sorted(
+                (task for task in store.find("tasks", status="completed")
+                 if task.get("completedAt") and task["completedAt"] < cutoff),
+                key=lambda task: task["completedAt"],
+            )
+            if not tasks:
+                return 0
+
+            for start in range(0, len(tasks), MEMBER_SIZE):
+                lines = "".join(
+                    json.dumps({"archivedAt": archived_at, "task": task}) + "\n"
+                    for task in tasks[start:start + MEMBER_SIZE]
+                )
+                offset = self._append(self.path, gzip.compress(lines.encode()))
+                summary.members.append((summary.size, offset))
+                summary.size += len(tasks[start:start + MEMBER_SIZE])
+            # The archive holds them now; drop them from the store in one commit.
+            with store.batch():
+                for task in tasks:
+                    store.delete("tasks", task["id"])
+
+            summary.counts.update(task.get("projectId") for task in tasks)
+            summary.signature = self._signature()
+
+        ARCHIVE_TASKS.inc(len(tasks), op="archived")
+        log.info("tasks archived", count=len(tasks), cutoff=cutoff)
+        return len(tasks)
+
+    def unarchive(self, store, task_id: str) -> Optional[dict]:
+        """Put an archived task back in the store; None if it is not in the archive."""
+        with self._locked():
+            summary = self._current(store)
+            found = None
+            for _, entry in self._entries():
+                if entry["task"]["id"] == task_id and (task_id, entry["archivedAt"]) not in summary.removed:
+                    found = entry
+            if found is None:
+                return None
+
+            task = found["task"]
+            if task.get("projectId") and not store.get("projects", task["projectId"]):
+                task = {**task, "projectId": None}  # its project is gone; back to the inbox
+            task = store.insert("tasks", task)
+            # A write-behind store holds the insert in memory; it must be on
+            # disk before the tombstone is, or a crash loses the task. A
+            # failed save raises here and leaves the archived copy live.
+            store.sync()
+            key = (task_id, found["archivedAt"])
+            self._append_removed([key])
+            summary.removed.add(key)
+            summary.counts[found["task"].get("projectId")] -= 1
+            summary.signature = self._signature()
+
+        ARCHIVE_TASKS.inc(op="unarchived")
+        return task
+
+    # --- Appends ---
+    @staticmethod
+    def _append(path: str, data: bytes) -> int:
+        """Append and fsync ``data``, cutting the file back if the write fails; returns where it starts."""
+        with open(path, 'ab') as f:
+            start = f.seek(0, os.SEEK_END)
+            try:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            except BaseException:
+                f.truncate(start)
+                raise
+        return start
+
+    def _append_removed(self, keys: list[tuple[str, str]]) -> None:
+        removed_at = datetime.utcnow().isoformat() + "Z"
+        lines = "".join(
+            json.dumps({"id": task_id, "archivedAt": archived_at, "removedAt": removed_at}) + "\n"
+            for task_id, archived_at in keys
+        )
+        # Start on a fresh line if a crash left a torn one.
+        size = os.path.getsize(self.removed_path) if os.path.exists(self.removed_path) else 0
+        if size:
+            with open(self.removed_path, 'rb') as f:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    lines = "\n" + lines
+        self._append(self.removed_path, lines.encode())
@@ -0,0 +1,974 @@
+"""Natural-language and AI features layered on the REST server.
+
+The LangGraph /nl pipeline, project suggestions and inbox categorization
+(directly or as a background job). server.py imports this module unless
+REST_ONLY=1, so CRUD-only deployments never load langchain, langgraph or
+langserve and need no model credentials. The model client itself is built
+on first use.
+"""
+from fastapi import Query, Request
+from fastapi.responses import JSONResponse
+from langserve import add_routes
+from langgraph.graph import StateGraph, END
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_openai import ChatOpenAI
+from typing import TypedDict, Literal, Optional
+from pydantic import BaseModel
+from datetime import datetime
+from classifier import ProjectClassifier
+from llm_cache import build_llm_cache
+from local_parser import MIN_ID_PREFIX, parse_local, resolve_task_id
+from search import ProjectRetriever
+from telemetry import REGISTRY, get_logger
+from server import (
+    Idea, Project, Task, app, job_manager, load_ideas, load_projects, load_tasks,
+    register_index, shutdown_hooks, store, task_stats,
+)
+import asyncio
+import httpx
+import json
+import os
+import threading
+
+log = get_logger("assistant")
+
+# --- Pydantic Models ---
+class Suggestion(BaseModel):
+    taskId: str
+    suggestedProjectId: Optional[str] = None
+    confidence: float
+    reasoning: str
+    source: Literal["local", "llm"] = "llm"
+
+# Naive Bayes over tasks already filed into projects; updated on every task change
+project_classifier = ProjectClassifier(min_examples=int(os.environ.get("AI_LOCAL_MIN_EXAMPLES", "3")))
+register_index(project_classifier)
+
+# Lexical project profiles (name, description, filed tasks) for prompt prefiltering
+project_retriever = ProjectRetriever()
+register_index(project_retriever)
+
+# --- State Definition ---
+# Nodes read what they need from the store; only the final "respond" node
+# attaches whole collections, and only for output="full".
+class AppState(TypedDict, total=False):
+    user_input: str
+    output: Literal["full", "delta"]
+    intent: str
+    response: str
+    args: dict  # arguments extracted alongside the intent (single-call mode)
+    parsed_by: str  # "local", "llm" or "keyword" (nodes extract with the LLM)
+    changes: list[dict]  # records this request created/updated/deleted
+    tasks: list[dict]
+    ideas: list[dict]
+    projects: list[dict]
+
+def change(kind: str, change_type: str, record: Optional[dict], record_id: Optional[str] = None) -> dict:
+    """One entry of AppState.changes, shaped like a GET /changes entry."""
+    return {"type": kind, "id": record_id or record["id"], "change": change_type, "record": record}
+
+# --- LLM Setup ---
+class LLMUnavailable(RuntimeError):
+    """The model client cannot be built, e.g. no API key is configured."""
+
+# One pooled connection set per process, shared by every LLM call
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.environ.get("LLM_MAX_KEEPALIVE", "20"))
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "60"))
+
+def build_llm() -> ChatOpenAI:
+    """Configure OpenRouter-backed model from environment variables."""
+    base_url = os.environ.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+    api_key = os.environ.get("OPENROUTER_API_KEY")
+    model = os.environ.get("OPENROUTER_MODEL", "anthropic/claude-3.5-sonnet-20241022")
+
+    if not api_key:
+        raise LLMUnavailable(
+            "OPENROUTER_API_KEY is not set. Add it to your environment or .env.local."
+        )
+
+    headers = {}
+    referer = os.environ.get("OPENROUTER_REFERRER")
+    if referer:
+        headers["HTTP-Referer"] = referer
+    app_id = os.environ.get("OPENROUTER_APP_ID")
+    if app_id:
+        headers["X-Title"] = app_id
+
+    limits = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_KEEPALIVE)
+    timeout = httpx.Timeout(LLM_TIMEOUT, connect=10.0)
+    return ChatOpenAI(
+        model=model,
+        api_key=api_key,
+        base_url=base_url,
+        temperature=0,
+        default_headers=headers or None,
+        http_client=httpx.Client(limits=limits, timeout=timeout),
+        http_async_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+    )
+
+# Built on first use so startup needs neither credentials nor a model client
+llm: Optional[ChatOpenAI] = None
+_llm_lock = threading.Lock()
+
+def get_llm() -> ChatOpenAI:
+    """The shared model client, built on first call."""
+    global llm
+    if llm is None:
+        with _llm_lock:
+            if llm is None:
+                llm = build_llm()
+    return llm
+
+async def close_llm() -> None:
+    """Release the pooled HTTP connections."""
+    if llm is not None and isinstance(llm, ChatOpenAI):
+        llm.http_client.close()
+        await llm.http_async_client.aclose()
+
+shutdown_hooks.append(close_llm)
+
+@app.exception_handler(LLMUnavailable)
+async def llm_unavailable_handler(request: Request, exc: LLMUnavailable):
+    return JSONResponse(status_code=503, content={"detail": f"AI features unavailable: {exc}"})
+
+# Categorization prompts list the candidate projects they were built from and
+# replies are resolved against the current catalog, so the prompt alone keys
+# the cache: a project edit only misses for prompts that showed that project.
+llm_cache = build_llm_cache()
+
+def invoke_llm(messages: list, call_site: str, fingerprint: str = ""):
+    """llm.invoke through the response cache."""
+    return llm_cache.invoke(get_llm(), messages, call_site, fingerprint)
+
+async def ainvoke_llm(messages: list, call_site: str, fingerprint: str = ""):
+    """llm.ainvoke through the response cache."""
+    return await llm_cache.ainvoke(get_llm(), messages, call_site, fingerprint)
+
+# --- Node Functions ---
+NL_NODE_SECONDS = REGISTRY.histogram("nl_node_seconds", "Duration of each LangGraph node", ("node",))
+NL_PARSE = REGISTRY.counter(
+    "nl_parse_total", "How parse_intent resolved a command: local, keyword, llm_single_call or llm_classify", ("path",))
+
+VALID_INTENTS = ["add_idea", "add_project", "add_task", "list_all", "complete_task", "delete_task", "help"]
+
+# One structured LLM call returns intent + arguments instead of classify-then-extract
+NL_SINGLE_CALL = os.environ.get("NL_SINGLE_CALL", "0") == "1"
+
+# Rule-based extraction for common command shapes, skipping the LLM entirely
+NL_LOCAL_PARSER = os.environ.get("NL_LOCAL_PARSER", "1") == "1"
+
+def keyword_intent(user_text: str) -> Optional[str]:
+    """Keyword guardrails for common phrasings; None when nothing matches."""
+    if not user_text:
+        return "help"
+
+    if "help" in user_text:
+        return "help"
+
+    # Ideas
+    if "idea" in user_text and any(kw in user_text for kw in ["add", "create", "new"]):
+        return "add_idea"
+
+    # Projects
+    if "project" in user_text and any(kw in user_text for kw in ["add", "create", "new"]):
+        return "add_project"
+
+    # Tasks
+    if any(kw in user_text for kw in ["list", "show"]):
+        return "list_all"
+
+    if any(kw in user_text for kw in ["complete", "done", "finish", "check off"]):
+        return "complete_task"
+
+    if any(kw in user_text for kw in ["delete", "remove", "rm", "trash"]):
+        return "delete_task"
+
+    if any(kw in user_text for kw in ["add", "create", "new task", "todo"]):
+        return "add_task"
+
+    return None
+
+def parse_command_messages(user_input: str) -> list:
+    """Prompt classifying the intent and extracting its arguments in one call."""
+    today = datetime.utcnow().date().isoformat()
+    return [
+        SystemMessage(content=f"""You are the command parser for a productivity app with Ideas, Inbox, and Projects.
+Classify the user's intent into exactly one of these categories:
+- add_idea: User wants to add/create a new idea
+- add_project: User wants to create a new project
+- add_task: User wants to add/create a new task
+- list_all: User wants to see their items (tasks, ideas, or projects)
+- complete_task: User wants to mark a task as done
+- delete_task: User wants to remove a task
+- help: User needs help or is confused
+
+Then extract the arguments for that intent. Today is {today}.
+
+Respond with ONLY a JSON object in this exact format:
+{{
+  "intent": "add_task",
+  "text": "the task or idea text, or the new project name, or null",
+  "project": "the existing project a new task should go to, or null",
+  "taskId": "the task ID (UUID, or a prefix of at least {MIN_ID_PREFIX} characters) to complete/delete, or null",
+  "priority": "low, medium, high or null",
+  "dueDate": "YYYY-MM-DD or null"
+}}"""),
+        HumanMessage(content=user_input)
+    ]
+
+def parse_command_reply(content: str) -> Optional[dict]:
+    """Turn the structured reply into {"intent", "args"}, or None if unusable."""
+    try:
+        data = parse_json_content(content)
+        intent = str(data.get("intent", "")).strip().lower()
+    except (json.JSONDecodeError, AttributeError) as e:
+        log.error("parse_command reply unusable", error=str(e))
+        return None
+    if intent not in VALID_INTENTS:
+        return None
+
+    args = {
+        key: str(data[key]).strip()
+        for key in ("text", "project", "taskId", "priority", "dueDate")
+        if data.get(key) not in (None, "", "null")
+    }
+    return {"intent": intent, "args": args}
+
+CLASSIFY_INTENT_PROMPT = """You are an intent classifier for a productivity app with Ideas, Inbox, and Projects.
+Classify the user's intent into exactly one of these categories:
+- add_idea: User wants to add/create a new idea
+- add_project: User wants to create a new project
+- add_task: User wants to add/create a new task
+- list_all: User wants to see their items (tasks, ideas, or projects)
+- complete_task: User wants to mark a task as done
+- delete_task: User wants to remove a task
+- help: User needs help or is confused
+
+Respond with ONLY the category name, nothing else."""
+
+# Per-node prompts used when parse_intent did not extract the argument already
+EXTRACTION_PROMPTS = {
+    "add_idea": """Extract the idea description from the user's message.
+Return ONLY the idea text, nothing else. Keep it concise.""",
+    "add_project": """Extract the project name from the user's message.
+Return ONLY the project name, nothing else. Keep it concise.""",
+    "add_task": """Extract the task description from the user's message.
+Return ONLY the task text, nothing else. Keep it concise.""",
+    "complete_task": """Extract the task ID (UUID format) from the user's message.
+Return ONLY the ID, nothing else. If you see a number instead of UUID, return that number.""",
+    "delete_task": """Extract the task ID from the user's message.
+Return ONLY the ID, nothing else.""",
+}
+
+def extraction_messages(call_site: str, user_input: str) -> list:
+    return [SystemMessage(content=EXTRACTION_PROMPTS[call_site]), HumanMessage(content=user_input)]
+
+def extracted_argument(state: AppState, keys: tuple) -> Optional[str]:
+    """First of ``keys`` already extracted by parse_intent, if any."""
+    args = state.get("args") or {}
+    return next((args[key] for key in keys if args.get(key)), None)
+
+def extract_argument(state: AppState, call_site: str, *keys: str) -> str:
+    """Argument from parse_intent, or a dedicated LLM extraction call."""
+    value = extracted_argument(state, keys)
+    if value:
+        return value
+    result = invoke_llm(extraction_messages(call_site, state["user_input"]), call_site)
+    return result.content.strip()
+
+async def aextract_argument(state: AppState, call_site: str, *keys: str) -> str:
+    """Async counterpart of ``extract_argument``."""
+    value = extracted_argument(state, keys)
+    if value:
+        return value
+    result = await ainvoke_llm(extraction_messages(call_site, state["user_input"]), call_site)
+    return result.content.strip()
+
+def find_project_by_name(name: str) -> Optional[dict]:
+    """Case-insensitive project lookup by name."""
+    wanted = name.strip().lower()
+    return next((p for p in load_projects() if p["name"].strip().lower() == wanted), None)
+
+def task_fields_from_args(args: dict) -> dict:
+    """Task fields (projectId, priority, dueDate) carried by extracted arguments."""
+    fields = {}
+    if args.get("project"):
+        project = find_project_by_name(args["project"])
+        if project:
+            fields["projectId"] = project["id"]
+    if args.get("priority", "").lower() in ("low", "medium", "high"):
+        fields["priority"] = args["priority"].lower()
+    due_date = args.get("dueDate", "")
+    try:
+        fields["dueDate"] = datetime.strptime(due_date, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        pass
+    return fields
+
+def prepare_intent(state: AppState) -> tuple[dict, Optional[str], Optional[dict]]:
+    """Everything parse_intent does before the LLM.
+
+    Returns (base state update, keyword intent, finished update or None
+    when the LLM still has to be asked).
+    """
+    user_text = state["user_input"].strip().lower()
+    data = {"args": {}, "changes": []}
+
+    # Fast heuristics for common patterns
+    intent = keyword_intent(user_text)
+    log.debug("intent.keyword", input=state["user_input"], intent=intent)
+
+    # help/list need no arguments
+    if intent in ("help", "list_all"):
+        return data, intent, {**data, "intent": intent, "parsed_by": "local"}
+
+    if NL_LOCAL_PARSER and intent is not None:
+        args = parse_local(
+            intent,
+            state["user_input"],
+            [project["name"] for project in load_projects()] if intent == "add_task" else [],
+            lambda prefix: store.ids_with_prefix("tasks", prefix),
+        )
+        if args is not None:
+            log.debug("intent.local", intent=intent, args=args)
+            return data, intent, {**data, "intent": intent, "args": args, "parsed_by": "local"}
+        log.debug("intent.local_declined", intent=intent)
+
+    return data, intent, None
+
+def single_call_update(data: dict, intent: Optional[str], parsed: dict) -> dict:
+    # Keyword matches stay authoritative for the intent
+    intent = intent or parsed["intent"]
+    log.debug("intent.llm", intent=intent, args=parsed["args"], mode="single_call")
+    NL_PARSE.inc(path="llm_single_call")
+    return {**data, "intent": intent, "args": parsed["args"], "parsed_by": "llm"}
+
+def classified_update(data: dict, content: str) -> dict:
+    intent = content.strip().lower()
+
+    if intent not in VALID_INTENTS:
+        intent = "help"
+
+    log.debug("intent.llm", intent=intent, mode="classify")
+    NL_PARSE.inc(path="llm_classify")
+    return {**data, "intent": intent, "parsed_by": "llm"}
+
+def parse_intent(state: AppState) -> dict:
+    """Use lightweight keyword guardrails first, then LLM as fallback."""
+    data, intent, update = prepare_intent(state)
+    if update:
+        NL_PARSE.inc(path="local")
+        return update
+
+    # Everything else gets intent + args in one call
+    if NL_SINGLE_CALL:
+        result = invoke_llm(parse_command_messages(state["user_input"]), "parse_command")
+        parsed = parse_command_reply(result.content)
+        if parsed:
+            return single_call_update(data, intent, parsed)
+
+    if intent:
+        NL_PARSE.inc(path="keyword")
+        return {**data, "intent": intent, "parsed_by": "keyword"}
+
+    # Fallback to LLM classification for ambiguous phrasing
+    messages = [SystemMessage(content=CLASSIFY_INTENT_PROMPT), HumanMessage(content=state["user_input"])]
+    result = invoke_llm(messages, "classify_intent")
+    return classified_update(data, result.content)
+
+async def aparse_intent(state: AppState) -> dict:
+    """Async counterpart of ``parse_intent`` using ``ainvoke``."""
+    data, intent, update = await store.run(prepare_intent, state)
+    if update:
+        NL_PARSE.inc(path="local")
+        return update
+
+    if NL_SINGLE_CALL:
+        result = await ainvoke_llm(parse_command_messages(state["user_input"]), "parse_command")
+        parsed = parse_command_reply(result.content)
+        if parsed:
+            return single_call_update(data, intent, parsed)
+
+    if intent:
+        NL_PARSE.inc(path="keyword")
+        return {**data, "intent": intent, "parsed_by": "keyword"}
+
+    messages = [SystemMessage(content=CLASSIFY_INTENT_PROMPT), HumanMessage(content=state["user_input"])]
+    result = await ainvoke_llm(messages, "classify_intent")
+    return classified_update(data, result.content)
+
+def insert_idea(state: AppState, idea_text: str) -> dict:
+    new_idea = store.insert("ideas", Idea(text=idea_text).model_dump())
+    log.debug("idea.created", id=new_idea["id"])
+
+    return {
+        "changes": [change("ideas", "created", new_idea)],
+        "response": f"💡 Added idea: {idea_text}"
+    }
+
+def add_idea(state: AppState) -> dict:
+    """Extract idea from input and add it"""
+    return insert_idea(state, extract_argument(state, "add_idea", "text"))
+
+async def aadd_idea(state: AppState) -> dict:
+    return await store.run(insert_idea, state, await aextract_argument(state, "add_idea", "text"))
+
+def insert_project(state: AppState, project_name: str) -> dict:
+    new_project = store.insert("projects", Project(name=project_name).model_dump())
+    log.debug("project.created", id=new_project["id"])
+
+    return {
+        "changes": [change("projects", "created", new_project)],
+        "response": f"📁 Created project: {project_name}"
+    }
+
+def add_project(state: AppState) -> dict:
+    """Extract project name from input and create it"""
+    return insert_project(state, extract_argument(state, "add_project", "text", "project"))
+
+async def aadd_project(state: AppState) -> dict:
+    return await store.run(insert_project, state, await aextract_argument(state, "add_project", "text", "project"))
+
+def insert_task(state: AppState, task_text: str) -> dict:
+    fields = task_fields_from_args(state.get("args") or {})
+    new_task = store.insert("tasks", Task(text=task_text, **fields).model_dump())
+    log.debug("task.created", id=new_task["id"], project_id=new_task.get("projectId"))
+
+    project = store.get("projects", fields["projectId"]) if fields.get("projectId") else None
+    destination = project["name"] if project else "inbox"
+    return {
+        "changes": [change("tasks", "created", new_task)],
+        "response": f"✅ Added task to {destination}: {task_text}"
+    }
+
+def add_task(state: AppState) -> dict:
+    """Extract task from input and add it to inbox (or the named project)"""
+    return insert_task(state, extract_argument(state, "add_task", "text"))
+
+async def aadd_task(state: AppState) -> dict:
+    return await store.run(insert_task, state, await aextract_argument(state, "add_task", "text"))
+
+def list_all(state: AppState) -> dict:
+    """List all ideas, inbox tasks, and projects"""
+    # Only the first five of each are shown; query() also returns the totals
+    ideas, idea_count, _ = store.query("ideas", limit=5)
+    inbox_tasks, inbox_count, _ = store.query("tasks", where={"projectId": None}, limit=5)
+    projects, project_count, _ = store.query("projects", limit=5)
+
+    lines = []
+
+    # Ideas
+    if ideas:
+        lines.append("💡 Ideas:")
+        for idea in ideas:
+            lines.append(f"  • {idea['text']}")
+        if idea_count > 5:
+            lines.append(f"  ... and {idea_count - 5} more")
+    else:
+        lines.append("💡 No ideas yet")
+
+    lines.append("")
+
+    # Inbox tasks
+    if inbox_tasks:
+        lines.append("📥 Inbox:")
+        for task in inbox_tasks:
+            status = "✓" if task["status"] == "completed" else "○"
+            lines.append(f"  {status} {task['text']}")
+        if inbox_count > 5:
+            lines.append(f"  ... and {inbox_count - 5} more")
+    else:
+        lines.append("📥 Inbox is empty")
+
+    lines.append("")
+
+    # Projects
+    if projects:
+        lines.append("📁 Projects:")
+        for project in projects:
+            task_count = task_stats.counts(project["id"])["total"]
+            lines.append(f"  • {project['name']} ({task_count} tasks)")
+        if project_count > 5:
+            lines.append(f"  ... and {project_count - 5} more")
+    else:
+        lines.append("📁 No projects yet")
+
+    return {"response": "\n".join(lines)}
+
+async def alist_all(state: AppState) -> dict:
+    return await store.run(list_all, state)
+
+def resolve_task_argument(task_id: str) -> str:
+    """Full id for a unique prefix the user (or the LLM) gave; anything else unchanged."""
+    return resolve_task_id(task_id, lambda prefix: store.ids_with_prefix("tasks", prefix)) or task_id
+
+def complete_task_by_id(state: AppState, task_id: str) -> dict:
+    task_id = resolve_task_argument(task_id)
+    task = store.update("tasks", task_id, {
+        "status": "completed",
+        "completedAt": datetime.utcnow().isoformat() + "Z",
+    }, op="complete")
+
+    if task:
+        log.debug("task.completed", id=task_id)
+
+        return {
+            "changes": [change("tasks", "updated", task)],
+            "response": f"✅ Completed task: {task['text']}"
+        }
+
+    return {"response": f"❌ Task not found"}
+
+def complete_task(state: AppState) -> dict:
+    """Mark a task as complete by ID"""
+    return complete_task_by_id(state, extract_argument(state, "complete_task", "taskId"))
+
+async def acomplete_task(state: AppState) -> dict:
+    return await store.run(complete_task_by_id, state, await aextract_argument(state, "complete_task", "taskId"))
+
+def delete_task_by_id(state: AppState, task_id: str) -> dict:
+    task_id = resolve_task_argument(task_id)
+    deleted = store.delete("tasks", task_id)
+    if deleted:
+        log.debug("task.deleted", id=task_id)
+
+        return {
+            "changes": [change("tasks", "deleted", None, deleted["id"])],
+            "response": f"🗑️ Deleted task"
+        }
+
+    return {"response": f"❌ Task not found"}
+
+def delete_task(state: AppState) -> dict:
+    """Delete a task by ID"""
+    return delete_task_by_id(state, extract_argument(state, "delete_task", "taskId"))
+
+async def adelete_task(state: AppState) -> dict:
+    return await store.run(delete_task_by_id, state, await aextract_argument(state, "delete_task", "taskId"))
+
+def show_help(state: AppState) -> dict:
+    """Show help message"""
+    return {
+        "response": """🤖 Productivity Manager Help:
+
+Ideas:
+  • "add idea [text]" - Brainstorm a new idea
+
+Inbox (Quick Tasks):
+  • "add [task]" - Add task to inbox
+  • "complete [id]" - Mark task as done
+  • "delete [id]" - Remove task
+
+Projects:
+  • "create project [name]" - Create a new project
+  • "add to [project] [task]" - Add task to project (via web UI)
+
+General:
+  • "list" or "show" - See all items
+  • "help" - Show this message
+
+Examples:
+  • "add idea mobile app for tasks"
+  • "create project Work"
+  • "add buy groceries"
+  • "list"
+"""
+    }
+
+def respond(state: AppState) -> dict:
+    """Attach the full collections for output="full" (the default); delta output stops here."""
+    if state.get("output", "full") == "delta":
+        return {}
+    return {"tasks": load_tasks(), "ideas": load_ideas(), "projects": load_projects()}
+
+async def arespond(state: AppState) -> dict:
+    return await store.run(respond, state)
+
+# --- Router ---
+def route_intent(state: AppState) -> Literal["add_idea", "add_project", "add_task", "list_all", "complete_task", "delete_task", "help"]:
+    """Route to the appropriate node based on intent"""
+    return state["intent"]
+
+# --- Build the Graph ---
+def node(func, afunc=None) -> RunnableLambda:
+    """Graph node usable from both ``invoke`` and ``ainvoke``.
+
+    ``afunc`` awaits the LLM instead of blocking a worker thread; nodes
+    without one do no I/O and run inline on the event loop. Every run is
+    timed into the nl_node_seconds histogram.
+    """
+    name = func.__name__
+
+    def timed(state: AppState) -> dict:
+        with NL_NODE_SECONDS.time(node=name):
+            return func(state)
+
+    async def atimed(state: AppState) -> dict:
+        with NL_NODE_SECONDS.time(node=name):
+            return await afunc(state) if afunc else func(state)
+
+    return RunnableLambda(timed, afunc=atimed, name=name)
+
+graph = StateGraph(AppState)
+
+# Add nodes
+graph.add_node("parse_intent", node(parse_intent, aparse_intent))
+graph.add_node("add_idea", node(add_idea, aadd_idea))
+graph.add_node("add_project", node(add_project, aadd_project))
+graph.add_node("add_task", node(add_task, aadd_task))
+graph.add_node("list_all", node(list_all, alist_all))
+graph.add_node("complete_task", node(complete_task, acomplete_task))
+graph.add_node("delete_task", node(delete_task, adelete_task))
+graph.add_node("help", node(show_help))
+graph.add_node("respond", node(respond, arespond))
+
+# Set entry point
+graph.set_entry_point("parse_intent")
+
+# Add conditional routing
+graph.add_conditional_edges(
+    "parse_intent",
+    route_intent,
+    {
+        "add_idea": "add_idea",
+        "add_project": "add_project",
+        "add_task": "add_task",
+        "list_all": "list_all",
+        "complete_task": "complete_task",
+        "delete_task": "delete_task",
+        "help": "help"
+    }
+)
+
+# All action nodes finish through respond
+graph.add_edge("add_idea", "respond")
+graph.add_edge("add_project", "respond")
+graph.add_edge("add_task", "respond")
+graph.add_edge("list_all", "respond")
+graph.add_edge("complete_task", "respond")
+graph.add_edge("delete_task", "respond")
+graph.add_edge("help", "respond")
+graph.add_edge("respond", END)
+
+# Compile
+app_graph = graph.compile()
+
+# --- Input/Output schemas for LangServe ---
+class NLInput(BaseModel):
+    user_input: str
+    output: Literal["full", "delta"] = "full"  # "delta": only the response and changed records
+
+class NLOutput(BaseModel):
+    response: str
+    intent: str
+    changes: list[dict] = []
+    tasks: Optional[list[dict]] = None
+    ideas: Optional[list[dict]] = None
+    projects: Optional[list[dict]] = None
+    parsed_by: Optional[str] = None
+
+# Add the LangGraph app as a route for natural language processing
+add_routes(
+    app,
+    app_graph,
+    path="/nl",
+    input_type=NLInput,
+    output_type=NLOutput,
+)
+
+# --- AI Suggestion Endpoints ---
+AI_CONCURRENCY = int(os.environ.get("AI_CONCURRENCY", "8"))
+AI_BATCH_SIZE = int(os.environ.get("AI_BATCH_SIZE", "1"))
+
+# Local classifier answers at or above this confidence; below it the LLM is asked
+AI_LOCAL_CLASSIFIER = os.environ.get("AI_LOCAL_CLASSIFIER", "1") == "1"
+AI_LOCAL_THRESHOLD = float(os.environ.get("AI_LOCAL_THRESHOLD", "0.8"))
+classifier_outcomes = {"local": 0, "escalated": 0}
+
+# Prompts list at most this many candidate projects, however large the catalog
+AI_TOP_K_PROJECTS = int(os.environ.get("AI_TOP_K_PROJECTS", "12"))
+PROJECT_DESCRIPTION_CHARS = 200
+
+class SuggestProjectRequest(BaseModel):
+    taskText: str
+    taskId: Optional[str] = None
+
+def projects_prompt_info(projects: list[dict]) -> str:
+    """One line per project for the categorization prompts."""
+    lines = []
+    for p in projects:
+        description = (p.get("description") or "No description")[:PROJECT_DESCRIPTION_CHARS]
+        lines.append(f"- {p['name']}: {description}")
+    return "\n".join(lines)
+
+def candidate_projects(projects: list[dict], texts: list[str], limit: int = AI_TOP_K_PROJECTS) -> list[dict]:
+    """The ``limit`` projects most relevant to ``texts``, best first.
+
+    With several texts (a batch) the per-text rankings are interleaved so
+    every task contributes its best candidates before anyone's runners-up.
+    """
+    if len(projects) <= limit:
+        return projects
+    by_id = {p["id"]: p for p in projects}
+    rankings = [project_retriever.rank(text, list(by_id), limit) for text in texts]
+    chosen: dict[str, None] = {}
+    for position in range(limit):
+        for ranking in rankings:
+            if position < len(ranking):
+                chosen.setdefault(ranking[position])
+            if len(chosen) == limit:
+                return [by_id[project_id] for project_id in chosen]
+    return [by_id[project_id] for project_id in chosen]
+
+# System prompts are static so provider-side prompt caching can reuse the
+# prefix; the candidate projects and tasks go in the human message.
+SUGGEST_PROJECT_PROMPT = """You are helping categorize a task into one of the user's projects.
+
+You will be given the candidate projects (most relevant first) and a task. Analyze the task and suggest which project it belongs to. Consider the task description and project names/descriptions.
+
+Respond with ONLY a JSON object in this exact format:
+{
+  "projectId": "the-project-id-or-null",
+  "projectName": "the project name",
+  "confidence": 0.85,
+  "reasoning": "Brief explanation of why this project fits"
+}
+
+If no project is a good match, set projectId to null and confidence to 0."""
+
+CATEGORIZE_BATCH_PROMPT = """You are helping categorize tasks into the user's projects.
+
+You will be given the candidate projects (most relevant first) and numbered tasks. For each numbered task, suggest which project it belongs to. Consider the task description and project names/descriptions.
+
+Respond with ONLY a JSON array with one object per task, in this exact format:
+[
+  {
+    "task": 1,
+    "projectName": "the project name or null",
+    "confidence": 0.85,
+    "reasoning": "Brief explanation of why this project fits"
+  }
+]
+
+If no project is a good match for a task, set projectName to null and confidence to 0."""
+
+def suggest_project_messages(projects: list[dict], task_text: str) -> list:
+    """Prompt asking the LLM to place a single task."""
+    candidates = candidate_projects(projects, [task_text])
+    return [
+        SystemMessage(content=SUGGEST_PROJECT_PROMPT),
+        HumanMessage(content=f"Candidate projects:\n{projects_prompt_info(candidates)}\n\nTask: {task_text}")
+    ]
+
+def categorize_batch_messages(projects: list[dict], tasks: list[dict]) -> list:
+    """Prompt asking the LLM to place several tasks in one round-trip."""
+    candidates = candidate_projects(projects, [task["text"] for task in tasks])
+    task_lines = "\n".join(f"{i}. {task['text']}" for i, task in enumerate(tasks, start=1))
+    return [
+        SystemMessage(content=CATEGORIZE_BATCH_PROMPT),
+        HumanMessage(content=f"Candidate projects:\n{projects_prompt_info(candidates)}\n\nTasks:\n{task_lines}")
+    ]
+
+def parse_json_content(content: str):
+    """Parse an LLM JSON reply, tolerating a surrounding ```json fence."""
+    text = content.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return json.loads(text)
+
+def resolve_project_id(projects: list[dict], project_id: Optional[str], project_name: Optional[str]) -> Optional[str]:
+    """Map the LLM's project id/name answer onto an existing project id."""
+    if not project_id or project_id == "null":
+        return None
+    if any(p["id"] == project_id for p in projects):
+        return project_id
+    # The prompt only shows names, so the "id" is often a name; find by name
+    matching_project = next((p for p in projects if p["name"] == project_name), None)
+    return matching_project["id"] if matching_project else None
+
+def failed_suggestion(task_id: Optional[str], reasoning: str = "Failed to analyze task") -> Suggestion:
+    return Suggestion(
+        taskId=task_id or "unknown",
+        suggestedProjectId=None,
+        confidence=0.0,
+        reasoning=reasoning
+    )
+
+def parse_suggestion(content: str, projects: list[dict], task_id: Optional[str]) -> Suggestion:
+    """Turn a single-task LLM reply into a Suggestion."""
+    try:
+        response_data = parse_json_content(content)
+        return Suggestion(
+            taskId=task_id or "unknown",
+            suggestedProjectId=resolve_project_id(projects, response_data.get("projectId"), response_data.get("projectName")),
+            confidence=float(response_data.get("confidence", 0.5)),
+            reasoning=response_data.get("reasoning", "AI suggestion")
+        )
+    except (json.JSONDecodeError, KeyError, AttributeError, TypeError, ValueError) as e:
+        log.error("suggest_project reply unusable", error=str(e))
+        return failed_suggestion(task_id)
+
+def parse_batch_suggestions(content: str, projects: list[dict], tasks: list[dict]) -> list[Suggestion]:
+    """Turn a batched LLM reply into one Suggestion per task, in task order."""
+    suggestions = [failed_suggestion(task["id"]) for task in tasks]
+    try:
+        entries = parse_json_content(content)
+        for entry in entries:
+            position = int(entry.get("task", 0)) - 1
+            if not 0 <= position < len(tasks):
+                continue
+            suggestions[position] = Suggestion(
+                taskId=tasks[position]["id"],
+                suggestedProjectId=resolve_project_id(projects, entry.get("projectName"), entry.get("projectName")),
+                confidence=float(entry.get("confidence", 0.5)),
+                reasoning=entry.get("reasoning", "AI suggestion")
+            )
+    except (json.JSONDecodeError, KeyError, AttributeError, TypeError, ValueError) as e:
+        log.error("categorize_batch reply unusable", error=str(e))
+    return suggestions
+
+def local_suggestion(task_text: str, task_id: Optional[str], projects: list[dict]) -> Optional[Suggestion]:
+    """Suggestion from the local classifier, or None to escalate to the LLM."""
+    if not AI_LOCAL_CLASSIFIER:
+        return None
+    project_id, confidence, evidence = project_classifier.predict(task_text, [p["id"] for p in projects])
+    if project_id is None or confidence < AI_LOCAL_THRESHOLD:
+        classifier_outcomes["escalated"] += 1
+        return None
+
+    classifier_outcomes["local"] += 1
+    project_name = next(p["name"] for p in projects if p["id"] == project_id)
+    return Suggestion(
+        taskId=task_id or "unknown",
+        suggestedProjectId=project_id,
+        confidence=round(confidence, 3),
+        reasoning=f"Similar to tasks already in {project_name} ({', '.join(evidence[:3])})",
+        source="local",
+    )
+
+@app.post("/ai/suggest-project", response_model=Suggestion)
+async def suggest_project(request: SuggestProjectRequest):
+    """Use AI to suggest which project a task should belong to"""
+    projects = await store.aall("projects")
+
+    if not projects:
+        return failed_suggestion(request.taskId, "No projects available. Task will stay in inbox.")
+
+    suggestion = local_suggestion(request.taskText, request.taskId, projects)
+    if suggestion:
+        return suggestion
+
+    result = await ainvoke_llm(suggest_project_messages(projects, request.taskText), "suggest_project")
+    return parse_suggestion(result.content, projects, request.taskId)
+
+async def categorize_tasks(tasks: list[dict], projects: list[dict], batch_size: int = 1,
+                           concurrency: int = AI_CONCURRENCY, on_result=None) -> list[Suggestion]:
+    """Suggest projects for many tasks with concurrent (optionally batched) LLM calls.
+
+    Tasks the local classifier is confident about are answered directly.
+    The rest are split into batches of ``batch_size``; at most
+    ``concurrency`` batches are in flight at once. ``on_result(suggestion)``
+    is called as each suggestion arrives. Returns suggestions in task
+    order. A failed batch yields zero-confidence suggestions rather than
+    failing the run.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    local = {}
+    for task in tasks:
+        suggestion = local_suggestion(task["text"], task["id"], projects)
+        if suggestion:
+            local[task["id"]] = suggestion
+            if on_result:
+                on_result(suggestion)
+    remaining = [task for task in tasks if task["id"] not in local]
+    batches = [remaining[i:i + batch_size] for i in range(0, len(remaining), batch_size)]
+    if batches:
+        get_llm()  # fail the whole run with LLMUnavailable rather than per task
+
+    async def run_batch(batch: list[dict]) -> list[Suggestion]:
+        async with semaphore:
+            try:
+                if len(batch) == 1:
+                    result = await ainvoke_llm(suggest_project_messages(projects, batch[0]["text"]), "suggest_project")
+                    suggestions = [parse_suggestion(result.content, projects, batch[0]["id"])]
+                else:
+                    result = await ainvoke_llm(categorize_batch_messages(projects, batch), "categorize_batch")
+                    suggestions = parse_batch_suggestions(result.content, projects, batch)
+            except Exception as e:
+                log.error("categorization call failed", tasks=len(batch), error=str(e))
+                suggestions = [failed_suggestion(task["id"]) for task in batch]
+        if on_result:
+            for suggestion in suggestions:
+                on_result(suggestion)
+        return suggestions
+
+    results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+    escalated = {suggestion.taskId: suggestion for batch in results for suggestion in batch}
+    return [local.get(task["id"]) or escalated[task["id"]] for task in tasks]
+
+@app.post("/ai/categorize-inbox")
+async def categorize_inbox(
+    batch_size: int = Query(AI_BATCH_SIZE, ge=1, le=50, description="Tasks packed into one LLM prompt"),
+    concurrency: int = Query(AI_CONCURRENCY, ge=1, le=64, description="LLM calls in flight at once"),
+):
+    """Analyze all inbox tasks and suggest project categorization"""
+    projects = await store.aall("projects")
+    inbox_tasks = await store.afind("tasks", projectId=None)
+
+    if not inbox_tasks:
+        return {"message": "Inbox is empty", "suggestions": []}
+
+    if not projects:
+        return {"message": "No projects available. Create projects first.", "suggestions": []}
+
+    suggestions = await categorize_tasks(inbox_tasks, projects, batch_size=batch_size, concurrency=concurrency)
+    return {"suggestions": [suggestion.model_dump() for suggestion in suggestions]}
+
+@app.get("/ai/classifier")
+async def get_classifier_stats():
+    """Local classifier size, threshold and how often it answered vs escalated"""
+    return {
+        **project_classifier.snapshot(),
+        "enabled": AI_LOCAL_CLASSIFIER,
+        "threshold": AI_LOCAL_THRESHOLD,
+        "outcomes": dict(classifier_outcomes),
+    }
+
+# LLM response cache
+@app.get("/ai/cache")
+async def get_llm_cache_stats():
+    """LLM cache size and hit/miss counters per call site"""
+    return llm_cache.snapshot()
+
+@app.delete("/ai/cache")
+async def clear_llm_cache():
+    """Drop every cached LLM response"""
+    llm_cache.clear()
+    return {"message": "LLM cache cleared"}
+
+@app.post("/jobs/categorize-inbox", status_code=202)
+async def submit_categorize_inbox(
+    batch_size: int = Query(AI_BATCH_SIZE, ge=1, le=50, description="Tasks packed into one LLM prompt"),
+    concurrency: int = Query(AI_CONCURRENCY, ge=1, le=64, description="LLM calls in flight at once"),
+):
+    """Start inbox categorization in the background and return the job immediately"""
+    projects = await store.aall("projects")
+    inbox_tasks = await store.afind("tasks", projectId=None)
+
+    async def work(job):
+        if not inbox_tasks:
+            return {"message": "Inbox is empty", "suggestions": []}
+        if not projects:
+            return {"message": "No projects available. Create projects first.", "suggestions": []}
+        suggestions = await categorize_tasks(
+            inbox_tasks, projects, batch_size=batch_size, concurrency=concurrency,
+            on_result=lambda suggestion: job.add_result(suggestion.model_dump()),
+        )
+        return {"suggestions": [suggestion.model_dump() for suggestion in suggestions]}
+
+    job = job_manager.submit("categorize-inbox", work, total=len(inbox_tasks))
+    return job.to_dict()
@@ -0,0 +1,109 @@
+"""Deterministic stand-in for the chat model.
+
+``FakeChatModel`` answers every prompt the assistant sends (command
+parsing, intent classification, argument extraction, project suggestion
+and batch categorization) with a canned reply derived from the prompt,
+after a configurable latency. Install it in place of the OpenRouter
+client with ``install(assistant)`` so benchmarks run offline and measure
+the app rather than the provider.
+"""
+from typing import Optional
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+
+from langchain_core.messages import AIMessage
+
+INTENT_KEYWORDS = [
+    ("help", ("help", "what can you do")),
+    ("list_all", ("list", "show", "what do i have")),
+    ("add_project", ("project",)),
+    ("add_idea", ("idea",)),
+    ("complete_task", ("complete", "done", "finish")),
+    ("delete_task", ("delete", "remove")),
+]
+TASK_ID = re.compile(r"[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12}|\b[0-9a-f]{4,8}\b")
+CANDIDATE = re.compile(r"^- (.+?)(?::|$)", re.M)
+
+
+def guess_intent(text: str) -> str:
+    lowered = text.lower()
+    for intent, keywords in INTENT_KEYWORDS:
+        if any(keyword in lowered for keyword in keywords):
+            return intent
+    return "add_task"
+
+
+class FakeChatModel:
+    """Answers prompts with canned replies after ``latency`` (± ``jitter``) seconds."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0,
+                 replies: Optional[dict[str, str]] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.replies = replies or {}  # prompt kind -> fixed reply, overriding the derived one
+        self.calls: dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay(self) -> float:
+        with self._lock:
+            return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    def reply(self, messages: list) -> str:
+        system, human = str(messages[0].content), str(messages[-1].content)
+        kind, content = self._derive(system, human)
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+        return self.replies.get(kind, content)
+
+    def _derive(self, system: str, human: str) -> tuple[str, str]:
+        if "command parser" in system:
+            intent = guess_intent(human)
+            task_id = TASK_ID.search(human.lower())
+            return "parse_command", json.dumps({
+                "intent": intent,
+                "text": human if intent.startswith("add_") else None,
+                "project": None,
+                "taskId": task_id.group(0) if task_id and intent in ("complete_task", "delete_task") else None,
+                "priority": None,
+                "dueDate": None,
+            })
+        if "intent classifier" in system:
+            return "classify_intent", guess_intent(human)
+        if system.startswith("Extract the"):
+            task_id = TASK_ID.search(human.lower())
+            return "extract", task_id.group(0) if "ID" in system and task_id else human
+
+        candidates = CANDIDATE.findall(human)
+        best = candidates[0] if candidates else None
+        if "numbered tasks" in system:
+            count = len(re.findall(r"^\d+\. ", human, re.M))
+            return "categorize_batch", json.dumps([
+                {"task": i, "projectName": best, "confidence": 0.9 if best else 0, "reasoning": "benchmark"}
+                for i in range(1, count + 1)
+            ])
+        if "categorize a task" in system:
+            return "suggest_project", json.dumps({
+                "projectId": best, "projectName": best, "confidence": 0.9 if best else 0, "reasoning": "benchmark",
+            })
+        return "other", ""
+
+    # --- ChatOpenAI surface used by the assistant ---
+    def invoke(self, messages: list) -> AIMessage:
+        time.sleep(self._delay())
+        return AIMessage(content=self.reply(messages))
+
+    async def ainvoke(self, messages: list) -> AIMessage:
+        await asyncio.sleep(self._delay())
+        return AIMessage(content=self.reply(messages))
+
+
+def install(assistant_module, **kwargs) -> FakeChatModel:
+    """Make ``assistant_module.get_llm()`` return a fake model."""
+    model = FakeChatModel(**kwargs)
+    assistant_module.llm = model
+    return model
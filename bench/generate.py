@@ -0,0 +1,114 @@
+"""Synthetic ideas/projects/tasks files for benchmarking.
+
+Records match the server's models. Each project gets its own small
+vocabulary, so task texts cluster by project the way real ones do, which
+keeps the search index, the retriever and the classifier honest. Output
+is deterministic for a given seed.
+
+    python bench/generate.py --tasks 100000 --out /tmp/data
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+import argparse
+import json
+import os
+import random
+import uuid
+
+VERBS = ["fix", "write", "review", "plan", "call", "email", "buy", "book", "update", "clean", "prepare", "check"]
+TOPICS = [
+    "invoice", "budget", "report", "roadmap", "release", "server", "garden", "groceries", "dentist", "flight",
+    "hotel", "slides", "contract", "backlog", "kitchen", "bike", "taxes", "newsletter", "interview", "workshop",
+    "migration", "database", "playlist", "recipe", "insurance", "passport", "laptop", "website", "launch", "survey",
+]
+FILLER = ["for", "with", "before", "after", "about", "the", "new", "old", "next", "weekly", "quick", "final"]
+PROJECT_NAMES = ["Work", "Personal", "Home", "Health", "Finance", "Travel", "Learning", "Side Project", "Garden", "Admin"]
+COLORS = ["#3b82f6", "#ef4444", "#10b981", "#f59e0b", "#8b5cf6", "#ec4899"]
+
+
+def _timestamp(start: datetime, rng: random.Random, span_days: int) -> datetime:
+    return start + timedelta(seconds=rng.randrange(span_days * 86400))
+
+
+def _iso(moment: datetime) -> str:
+    return moment.isoformat() + "Z"
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def generate(tasks: int, projects: int = 20, ideas: Optional[int] = None, inbox_ratio: float = 0.2,
+             completed_ratio: float = 0.5, seed: int = 0, now: Optional[datetime] = None) -> dict[str, list[dict]]:
+    """Build the three collections in memory."""
+    rng = random.Random(seed)
+    now = now or datetime(2025, 1, 1)
+    start = now - timedelta(days=365)
+    ideas = tasks // 10 if ideas is None else ideas
+
+    project_records, vocabularies = [], []
+    for i in range(projects):
+        name = PROJECT_NAMES[i % len(PROJECT_NAMES)] + (f" {i // len(PROJECT_NAMES) + 1}" if i >= len(PROJECT_NAMES) else "")
+        vocabulary = rng.sample(TOPICS, 4)
+        vocabularies.append(vocabulary)
+        project_records.append({
+            "id": _uuid(rng),
+            "name": name,
+            "description": f"{name} work: " + ", ".join(vocabulary),
+            "color": rng.choice(COLORS),
+            "createdAt": _iso(_timestamp(start, rng, 30)),
+            "archived": False,
+        })
+
+    task_records = []
+    for _ in range(tasks):
+        in_inbox = not project_records or rng.random() < inbox_ratio
+        project_index = None if in_inbox else rng.randrange(len(project_records))
+        topic = rng.choice(TOPICS if project_index is None else vocabularies[project_index])
+        created = _timestamp(start, rng, 360)
+        completed = rng.random() < completed_ratio
+        due = created + timedelta(days=rng.randrange(-5, 30)) if rng.random() < 0.4 else None
+        task_records.append({
+            "id": _uuid(rng),
+            "text": f"{rng.choice(VERBS)} {rng.choice(FILLER)} {topic} {rng.randrange(1000)}",
+            "status": "completed" if completed else "pending",
+            "projectId": None if project_index is None else project_records[project_index]["id"],
+            "dueDate": due.date().isoformat() if due else None,
+            "priority": rng.choice([None, None, "low", "medium", "high"]),
+            "createdAt": _iso(created),
+            "completedAt": _iso(created + timedelta(hours=rng.randrange(1, 24 * 14))) if completed else None,
+        })
+    task_records.sort(key=lambda task: task["createdAt"])
+
+    idea_records = [
+        {
+            "id": _uuid(rng),
+            "text": f"{rng.choice(VERBS)} {rng.choice(TOPICS)} idea {i}",
+            "description": None,
+            "createdAt": _iso(_timestamp(start, rng, 360)),
+            "tags": rng.sample(TOPICS, 2) if rng.random() < 0.3 else None,
+        }
+        for i in range(ideas)
+    ]
+    return {"ideas": idea_records, "projects": project_records, "tasks": task_records}
+
+
+def write_dataset(directory: str, **kwargs) -> dict[str, int]:
+    """Write ideas.json, projects.json and tasks.json into ``directory``."""
+    os.makedirs(directory, exist_ok=True)
+    collections = generate(**kwargs)
+    for kind, records in collections.items():
+        with open(os.path.join(directory, f"{kind}.json"), 'w') as f:
+            json.dump(records, f, indent=2)
+    return {kind: len(records) for kind, records in collections.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset")
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--ideas", type=int, default=None, help="defaults to tasks / 10")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=".")
+    args = parser.parse_args()
+    print(write_dataset(args.out, tasks=args.tasks, projects=args.projects, ideas=args.ideas, seed=args.seed))
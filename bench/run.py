@@ -0,0 +1,454 @@
+"""Benchmark runner for storage, the REST API, concurrent load and /nl.
+
+Each (dataset size, storage backend) pair runs in a fresh subprocess,
+since the server binds its store at import time. A run generates a
+synthetic dataset in a temporary directory, starts the app in-process
+(requests go through httpx's ASGI transport, so no sockets are involved
+and the numbers are the app's own), swaps the LLM for the fake model
+and records:
+
+- startup: store load plus derived-index builds, and resident memory
+- storage: ``load_tasks``/``save_tasks`` latency and bytes written
+- rest: latency percentiles per endpoint, and bytes written per mutation
+  (for the journal backend, appends and compaction apart)
+- concurrent: throughput and latency of a mixed read/write workload
+  driven by ``--concurrency`` clients on the one event loop
+- nl: ``/nl`` latency per command shape and fake-LLM call counts
+
+Results are written as JSON; ``--compare`` prints the change against an
+earlier results file.
+
+    python bench/run.py --tasks 1000,100000 --backends json,sqlite
+    python bench/run.py --tasks 1000 --compare bench/results/baseline.json
+"""
+from datetime import datetime
+from typing import Optional
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+NL_COMMANDS = {
+    # Shapes the local parser handles, then ones that need the model
+    "add_task_local": "add review {topic} slides to {project}",
+    "add_idea_local": "new idea: {topic} newsletter",
+    "complete_local": "complete {prefix}",
+    "list": "list everything",
+    "add_task_llm": "I should really sort out the {topic} sometime",
+    "add_project_llm": "I want to start tracking a project for {topic}",
+}
+
+
+# --- Measurement helpers ---
+def summarize(samples: list[float]) -> dict:
+    """Latency summary in milliseconds."""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+
+    def percentile(q: float) -> float:
+        position = (len(ordered) - 1) * q / 100
+        low = int(position)
+        high = min(low + 1, len(ordered) - 1)
+        return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+    return {
+        "n": len(ordered),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50": round(percentile(50) * 1000, 3),
+        "p90": round(percentile(90) * 1000, 3),
+        "p99": round(percentile(99) * 1000, 3),
+        "max": round(ordered[-1] * 1000, 3),
+    }
+
+
+def rss_bytes() -> int:
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def bytes_written() -> Optional[int]:
+    """Bytes this process has handed to write(2) so far, if the OS reports it."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class WriteMeter:
+    """Bytes written per mutation between ``start`` and ``stop``.
+
+    ``stop`` returns (durable, compaction). For write-behind stores the
+    flush is what makes the changes durable, so it counts towards
+    ``durable``. The journal's appends are durable on their own and its
+    flush is a compaction, so ``durable`` counts only the store's journal
+    and intent bytes, and the compaction it forces is reported apart
+    (None for other backends).
+    """
+
+    def __init__(self, store):
+        from storage import JournalStore
+
+        self.store = store
+        self.compacts = isinstance(store, JournalStore)
+
+    def _store_bytes(self, *targets: str) -> float:
+        from storage import STORE_WRITTEN_BYTES
+
+        kinds = [*self.store.files, "*"]
+        return sum(STORE_WRITTEN_BYTES.value(kind=kind, target=target) for kind in kinds for target in targets)
+
+    def _snapshot(self) -> tuple:
+        if self.compacts:
+            return self._store_bytes("journal", "intent"), self._store_bytes("snapshot")
+        return bytes_written(), None
+
+    def start(self) -> None:
+        self.store.flush()
+        self.before = self._snapshot()
+
+    def stop(self, mutations: int) -> tuple[Optional[float], Optional[float]]:
+        self.store.flush()
+        after = self._snapshot()
+        if self.before[0] is None or after[0] is None or not mutations:
+            return None, None
+        durable = round((after[0] - self.before[0]) / mutations, 1)
+        if not self.compacts:
+            return durable, None
+        return durable, round((after[1] - self.before[1]) / mutations, 1)
+
+
+# --- Worker: one dataset size on one backend ---
+async def timed(client, method: str, url: str, samples: list, **kwargs):
+    started = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    samples.append(time.perf_counter() - started)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{method} {url} -> {response.status_code}: {response.text[:200]}")
+    return response
+
+
+async def bench_storage(server, options) -> dict:
+    samples_load, samples_save = [], []
+    meter = WriteMeter(server.store)
+    meter.start()
+    for _ in range(options.heavy_requests):
+        started = time.perf_counter()
+        tasks = server.load_tasks()
+        samples_load.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        server.save_tasks(tasks)
+        server.store.flush()
+        samples_save.append(time.perf_counter() - started)
+    save_bytes, compaction_bytes = meter.stop(options.heavy_requests)
+    return {
+        "load_tasks": summarize(samples_load),
+        "save_tasks": summarize(samples_save),
+        "saveBytes": save_bytes,
+        "saveCompactionBytes": compaction_bytes,
+    }
+
+
+async def bench_rest(server, client, options, rng: random.Random) -> dict:
+    projects = server.store.all("projects")
+    project_id = projects[0]["id"] if projects else "inbox"
+    reads = {
+        "GET /data": ("/data", options.heavy_requests),
+        "GET /tasks/inbox": ("/tasks/inbox", options.heavy_requests),
+        "GET /tasks?limit=50": ("/tasks?limit=50", options.requests),
+        "GET /tasks?projectId&status&limit=50": (f"/tasks?projectId={project_id}&status=pending&limit=50", options.requests),
+        "GET /tasks?sort=dueDate&limit=50": ("/tasks?sort=dueDate&order=desc&limit=50", options.requests),
+        "GET /search": ("/search?q=budget&limit=20", options.requests),
+        "GET /stats": ("/stats", options.requests),
+        "GET /projects": ("/projects", options.requests),
+    }
+    results = {}
+    for name, (url, count) in reads.items():
+        samples = []
+        for _ in range(count):
+            await timed(client, "GET", url, samples)
+        results[name] = summarize(samples)
+
+    meter = WriteMeter(server.store)
+    created = []
+
+    async def write(name: str, count: int, request, mutations_per_request: int = 1) -> None:
+        samples = []
+        meter.start()
+        for i in range(count):
+            await request(i, samples)
+        durable, compaction = meter.stop(count * mutations_per_request)
+        results[name] = {**summarize(samples), "bytesPerMutation": durable, "compactionBytesPerMutation": compaction}
+
+    async def create(i, samples):
+        response = await timed(client, "POST", "/tasks", samples, json={"text": f"bench task {i}", "projectId": project_id})
+        created.append(response.json()["id"])
+
+    async def move(i, samples):
+        target = rng.choice(projects)["id"] if projects else ""
+        await timed(client, "PUT", f"/tasks/{created[i]}/move?project_id={target}", samples)
+
+    async def complete(i, samples):
+        await timed(client, "PUT", f"/tasks/{created[i]}/complete", samples)
+
+    async def delete(i, samples):
+        await timed(client, "DELETE", f"/tasks/{created[i]}", samples)
+
+    async def batch(i, samples):
+        operations = [{"op": "create", "task": {"text": f"batch {i}.{j}"}} for j in range(options.batch_size)]
+        await timed(client, "POST", "/tasks/batch", samples, json={"operations": operations, "output": "summary"})
+
+    await write("POST /tasks", options.requests, create)
+    await write("PUT /tasks/{id}/move", options.requests, move)
+    await write("PUT /tasks/{id}/complete", options.requests, complete)
+    await write("DELETE /tasks/{id}", options.requests, delete)
+    await write(f"POST /tasks/batch ({options.batch_size} creates)", max(1, options.requests // 10), batch, options.batch_size)
+    return results
+
+
+async def bench_concurrent(server, client, options, rng: random.Random) -> dict:
+    projects = server.store.all("projects")
+    tasks = server.store.all("tasks")
+    ids = [task["id"] for task in rng.sample(tasks, min(1000, len(tasks)))]
+    mix = [
+        (0.35, lambda: ("GET", "/tasks?limit=50", None)),
+        (0.15, lambda: ("GET", f"/tasks?projectId={rng.choice(projects)['id']}&limit=50" if projects else "/tasks?limit=50", None)),
+        (0.15, lambda: ("GET", "/search?q=" + rng.choice(["budget", "invoice", "garden", "slides"]), None)),
+        (0.10, lambda: ("GET", "/stats", None)),
+        (0.15, lambda: ("POST", "/tasks", {"text": "concurrent task"})),
+        (0.10, lambda: ("PUT", f"/tasks/{rng.choice(ids)}/complete", None)),
+    ]
+    weights = [weight for weight, _ in mix]
+    samples: list[float] = []
+    remaining = [options.concurrent_requests]
+
+    async def client_loop():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            method, url, body = rng.choices(mix, weights)[0][1]()
+            await timed(client, method, url, samples, json=body)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(options.concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "clients": options.concurrency,
+        "requests": len(samples),
+        "perSecond": round(len(samples) / elapsed, 1),
+        "latency": summarize(samples),
+    }
+
+
+async def bench_nl(server, client, options, model) -> dict:
+    import assistant
+
+    projects = server.store.all("projects")
+    tasks = server.store.find("tasks", status="pending")
+    results = {}
+    for name, template in NL_COMMANDS.items():
+        samples = []
+        calls_before = sum(model.calls.values())
+        for i in range(options.nl_requests):
+            command = template.format(
+                topic=f"budget {i}",
+                project=projects[0]["name"] if projects else "inbox",
+                prefix=tasks[i % len(tasks)]["id"][:8] if tasks else "0000",
+            )
+            await timed(client, "POST", "/nl/invoke", samples, json={"input": {"user_input": command, "output": "delta"}})
+        results[name] = {**summarize(samples), "llmCalls": (sum(model.calls.values()) - calls_before) / options.nl_requests}
+
+    samples = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        timed(client, "POST", "/nl/invoke", samples, json={"input": {"user_input": f"remember to sort out the invoice {i}", "output": "delta"}})
+        for i in range(options.concurrency * options.nl_requests)
+    ))
+    elapsed = time.perf_counter() - started
+    results["concurrent"] = {"perSecond": round(len(samples) / elapsed, 1), "latency": summarize(samples)}
+
+    samples = []
+    for i in range(options.nl_requests):
+        await timed(client, "POST", "/ai/suggest-project", samples, json={"taskText": f"review the budget report {i}"})
+    results["POST /ai/suggest-project"] = summarize(samples)
+    results["llmCallsBySite"] = dict(model.calls)
+    results["cache"] = assistant.llm_cache.snapshot()["callSites"]
+    return results
+
+
+async def run_worker(options) -> dict:
+    from generate import write_dataset
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    counts = write_dataset(workdir, tasks=options.tasks, projects=options.projects, seed=options.seed)
+    os.chdir(workdir)
+    os.environ["STORAGE_BACKEND"] = options.backend
+    os.environ.setdefault("LLM_CACHE", "1" if options.llm_cache else "0")
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+    if options.backend == "sqlite":
+        from storage import migrate_json_to_sqlite
+        os.environ["STORAGE_SQLITE_PATH"] = os.path.join(workdir, "bench.db")
+        migrate_json_to_sqlite({kind: f"{kind}.json" for kind in counts}, os.environ["STORAGE_SQLITE_PATH"])
+    if options.skip_nl:
+        os.environ["REST_ONLY"] = "1"
+
+    import httpx
+
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    import server
+    import_seconds = time.perf_counter() - started
+
+    model = None
+    if not options.skip_nl:
+        import assistant
+        from fake_llm import install
+        model = install(assistant, latency=options.llm_latency, jitter=options.llm_jitter, seed=options.seed)
+
+    rng = random.Random(options.seed)
+    result = {"tasks": options.tasks, "backend": options.backend, "dataset": counts}
+    started = time.perf_counter()
+    async with server.lifespan(server.app):
+        result["startup"] = {
+            "importSeconds": round(import_seconds, 3),
+            "loadSeconds": round(time.perf_counter() - started, 3),
+            "rssBytes": rss_bytes() - rss_before,
+            "datasetBytes": sum(os.path.getsize(f"{kind}.json") for kind in counts),
+        }
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            result["storage"] = await bench_storage(server, options)
+            result["rest"] = await bench_rest(server, client, options, rng)
+            result["concurrent"] = await bench_concurrent(server, client, options, rng)
+            if model is not None:
+                result["nl"] = await bench_nl(server, client, options, model)
+    result["peakRssBytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return result
+
+
+# --- Driver ---
+def flatten(value, prefix: str = "") -> dict[str, float]:
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+        return flat
+    return {prefix: value} if isinstance(value, (int, float)) and not isinstance(value, bool) else {}
+
+
+COMPARED = (".p50", ".p99", ".perSecond", ".bytesPerMutation", ".compactionBytesPerMutation",
+            "saveBytes", "saveCompactionBytes", "rssBytes", "loadSeconds")
+
+
+def compare(baseline: dict, current: dict) -> None:
+    """Print the relative change of the headline metrics per (size, backend)."""
+    previous = {(run["tasks"], run["backend"]): flatten(run) for run in baseline["runs"]}
+    for run in current["runs"]:
+        old = previous.get((run["tasks"], run["backend"]))
+        if old is None:
+            continue
+        print(f"\n== {run['tasks']} tasks, {run['backend']} ==")
+        for metric, value in flatten(run).items():
+            if not metric.endswith(COMPARED) or not old.get(metric):
+                continue
+            change = (value - old[metric]) / old[metric] * 100
+            print(f"  {metric:<70} {old[metric]:>12.3f} -> {value:>12.3f}  ({change:+.1f}%)")
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark storage, REST endpoints and /nl")
+    parser.add_argument("--tasks", default="1000", help="comma-separated dataset sizes")
+    parser.add_argument("--backends", default="json", help="comma-separated: json, journal, shared, sqlite")
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200, help="requests per cheap endpoint")
+    parser.add_argument("--heavy-requests", type=int, default=5, help="requests per whole-collection call")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--concurrent-requests", type=int, default=2000)
+    parser.add_argument("--nl-requests", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake LLM seconds per call")
+    parser.add_argument("--llm-jitter", type=float, default=0.05)
+    parser.add_argument("--llm-cache", action="store_true", help="keep the LLM response cache on")
+    parser.add_argument("--skip-nl", action="store_true", help="REST only; do not import the LLM stack")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="results file (default bench/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--backend", default="json", help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.worker:
+        options.tasks = int(options.tasks)
+        print(json.dumps(asyncio.run(run_worker(options))))
+        return
+
+    # Every option except the driver's own is forwarded to the workers
+    passthrough = []
+    for key, value in vars(options).items():
+        if key in ("tasks", "backends", "out", "compare", "worker", "backend") or value in (None, False):
+            continue
+        flag = "--" + key.replace("_", "-")
+        passthrough.extend([flag] if value is True else [flag, str(value)])
+
+    runs = []
+    for size in options.tasks.split(","):
+        for backend in options.backends.split(","):
+            print(f"[bench] {size} tasks on {backend} ...", file=sys.stderr)
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", "--tasks", size, "--backend", backend, *passthrough],
+                capture_output=True, text=True,
+            )
+            if completed.returncode != 0:
+                print(completed.stderr, file=sys.stderr)
+                raise SystemExit(f"[bench] run failed: {size} tasks on {backend}")
+            runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    results = {
+        "meta": {
+            "createdAt": datetime.utcnow().isoformat() + "Z",
+            "revision": git_revision(),
+            "python": sys.version.split()[0],
+            "options": {key: value for key, value in vars(options).items() if key not in ("worker", "backend", "out", "compare")},
+        },
+        "runs": runs,
+    }
+    out = options.out or os.path.join(BENCH_DIR, "results", datetime.utcnow().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"[bench] results written to {out}", file=sys.stderr)
+
+    if options.compare:
+        with open(options.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
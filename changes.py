@@ -0,0 +1,182 @@
+"""Monotonic change versioning for delta sync and push notifications.
+
+Every store mutation bumps a process-wide version and appends an entry to
+a bounded in-memory log. Clients remember the version they last saw and
+ask for everything after it; when that version has fallen out of the log
+(or the server restarted, which changes the epoch) they are told to
+resync from ``/data`` instead.
+
+``EventBroker`` pushes the same entries to live subscribers (the SSE
+endpoint). Each subscriber has a bounded queue; one that falls behind has
+its backlog replaced by a single resync marker rather than buffering
+without limit.
+"""
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+import asyncio
+import threading
+import uuid
+
+
+class ChangeLog:
+    """Bounded log of store mutations keyed by a monotonically increasing version."""
+
+    def __init__(self, capacity: int = 10000):
+        # Versions restart with the process; the epoch tells clients apart.
+        self.epoch = uuid.uuid4().hex[:12]
+        self.version = 0
+        self._entries: deque = deque(maxlen=capacity)
+        # Oldest version a client may hold and still be served a delta.
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def listener(self, kind: str, op: str, before: Optional[dict], after: Optional[dict]) -> None:
+        """Store listener recording one entry per mutation."""
+        with self._lock:
+            self.version += 1
+            if op == "reset":
+                # A whole collection was swapped out; older clients must resync.
+                self._entries.clear()
+                self._floor = self.version
+                return
+            if op == "create" and before is not None:
+                op = "replace"  # insert over an existing id
+            if len(self._entries) == self._entries.maxlen:
+                self._floor = self._entries[0]["version"]
+            record_id = (after or before)["id"]
+            self._entries.append({
+                "version": self.version,
+                "type": kind,
+                "op": op,
+                "id": record_id,
+                "record": after,
+            })
+
+    def since(self, version: int) -> Optional[tuple[int, list[dict]]]:
+        """Return (current version, changes after ``version``) or None to resync.
+
+        Changes are collapsed to one entry per record: "created", "updated"
+        or "deleted" with the latest record image. Records created and
+        deleted within the window are dropped entirely.
+        """
+        with self._lock:
+            if version < self._floor or version > self.version:
+                return None
+            entries = [entry for entry in self._entries if entry["version"] > version]
+            current = self.version
+
+        collapsed: dict[tuple[str, str], dict] = {}
+        for entry in entries:
+            key = (entry["type"], entry["id"])
+            previous = collapsed.get(key)
+            created = entry["op"] == "create" if previous is None else previous["change"] == "created"
+            if entry["op"] == "delete":
+                if created:
+                    collapsed.pop(key, None)
+                    continue
+                change = "deleted"
+            else:
+                change = "created" if created else "updated"
+            collapsed.pop(key, None)  # re-insert so output follows latest version
+            collapsed[key] = {
+                "type": entry["type"],
+                "id": entry["id"],
+                "change": change,
+                "version": entry["version"],
+                "record": entry["record"],
+            }
+        return current, list(collapsed.values())
+
+
+RESYNC = {"event": "resync"}
+
+
+class Subscription:
+    """One subscriber's bounded event queue, owned by its event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def offer(self, event: dict) -> None:
+        """Queue an event; runs on the subscriber's loop."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too slow: drop the backlog and tell the client to resync.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            self.overflowed = True
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next event, or None if ``timeout`` passes first."""
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event is RESYNC:
+            self.overflowed = False
+        return event
+
+
+class EventBroker:
+    """Fans store mutations out to live subscribers.
+
+    Register ``listener`` on the store after the ChangeLog so events carry
+    the version the change was recorded under.
+    """
+
+    def __init__(self, change_log: ChangeLog, queue_size: int = 256):
+        self.change_log = change_log
+        self.queue_size = queue_size
+        self._subscriptions: set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def listener(self, kind: str, op: str, before: Optional[dict], after: Optional[dict]) -> None:
+        """Store listener publishing one event per mutation."""
+        if op == "reset":
+            self.publish(RESYNC)
+            return
+        self.publish({
+            "event": "change",
+            "version": self.change_log.version,
+            "type": kind,
+            "op": op,
+            "id": (after or before)["id"],
+            "record": after,
+        })
+
+    def publish(self, event: dict) -> None:
+        """Offer an event to every subscriber; safe to call from any thread."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The subscriber's loop is gone.
+                self._discard(subscription)
+
+    def _discard(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    @asynccontextmanager
+    async def subscribe(self):
+        """Yield a Subscription that receives events until the block exits."""
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
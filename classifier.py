@@ -0,0 +1,140 @@
+"""Local project classifier trained on tasks already filed into projects.
+
+A multinomial naive Bayes model over task-text tokens, with one class per
+project. It is built once from the store and then kept current through a
+store listener: creating, moving, editing or deleting a task subtracts its
+old contribution and adds the new one, so there is never a full retrain.
+
+Predictions return a project id and a confidence. The confidence is the
+posterior of the best project scaled by the share of the task's tokens
+the model has seen before. Callers escalate to the LLM when it falls
+below their threshold.
+"""
+from collections import Counter
+from typing import Iterable, Optional
+import math
+import threading
+
+from search import tokenize
+
+STOPWORDS = frozenset(
+    "a an and are as at be by do for from get go i in is it me my of on or so the this to up we with".split()
+)
+
+
+def features(text: str) -> set[str]:
+    """Distinct informative tokens of a task text."""
+    return {token for token in tokenize(text) if token not in STOPWORDS and not token.isdigit()}
+
+
+class ProjectClassifier:
+    """Incrementally updated naive Bayes over (task text → projectId)."""
+
+    def __init__(self, alpha: float = 1.0, min_examples: int = 3):
+        self.alpha = alpha
+        self.min_examples = min_examples
+
+        self._examples: dict[str, tuple[str, frozenset[str]]] = {}  # task id -> (project id, tokens)
+        self._class_docs: Counter = Counter()                        # project id -> task count
+        self._class_tokens: dict[str, Counter] = {}                   # project id -> token counts
+        self._class_totals: Counter = Counter()                      # project id -> token total
+        self._vocabulary: Counter = Counter()                        # token -> examples containing it
+        self._lock = threading.Lock()
+
+    # --- Maintenance ---
+    def build(self, store) -> None:
+        """Learn from every task that has a project."""
+        with self._lock:
+            self._examples.clear()
+            self._class_docs.clear()
+            self._class_tokens.clear()
+            self._class_totals.clear()
+            self._vocabulary.clear()
+            for task in store.all("tasks"):
+                self._add(task)
+
+    def listener(self, store):
+        """Return a store listener that keeps the model current."""
+        def on_change(kind: str, op: str, before: Optional[dict], after: Optional[dict]) -> None:
+            if kind != "tasks":
+                return
+            if op == "reset":
+                self.build(store)
+                return
+            with self._lock:
+                if before is not None:
+                    self._remove(before["id"])
+                if after is not None:
+                    self._add(after)
+        return on_change
+
+    def _add(self, task: dict) -> None:
+        project_id = task.get("projectId")
+        tokens = frozenset(features(task.get("text") or ""))
+        if not project_id or not tokens:
+            return
+        self._remove(task["id"])
+        self._examples[task["id"]] = (project_id, tokens)
+        self._class_docs[project_id] += 1
+        self._class_tokens.setdefault(project_id, Counter()).update(tokens)
+        self._class_totals[project_id] += len(tokens)
+        self._vocabulary.update(tokens)
+
+    def _remove(self, task_id: str) -> None:
+        example = self._examples.pop(task_id, None)
+        if example is None:
+            return
+        project_id, tokens = example
+        self._class_docs[project_id] -= 1
+        self._class_tokens[project_id].subtract(tokens)
+        self._class_totals[project_id] -= len(tokens)
+        self._vocabulary.subtract(tokens)
+        if self._class_docs[project_id] <= 0:
+            del self._class_docs[project_id], self._class_tokens[project_id], self._class_totals[project_id]
+        for token in tokens:
+            if self._vocabulary[token] <= 0:
+                del self._vocabulary[token]
+
+    # --- Prediction ---
+    def predict(self, text: str, project_ids: Iterable[str]) -> tuple[Optional[str], float, list[str]]:
+        """Best project among ``project_ids`` for ``text``.
+
+        Returns (project id or None, confidence, tokens that supported it).
+        Projects without examples still compete through the smoothing
+        terms, so a new project keeps confidence down for the others, but
+        it is never predicted itself.
+        """
+        tokens = features(text)
+        with self._lock:
+            candidates = list(dict.fromkeys(project_ids))
+            total_docs = sum(self._class_docs.get(project_id, 0) for project_id in candidates)
+            known = [token for token in tokens if token in self._vocabulary]
+            if total_docs < self.min_examples or not known:
+                return None, 0.0, []
+
+            vocabulary_size = len(self._vocabulary)
+            scores = {}
+            for project_id in candidates:
+                counts = self._class_tokens.get(project_id, Counter())
+                denominator = math.log(self._class_totals.get(project_id, 0) + self.alpha * vocabulary_size)
+                score = math.log((self._class_docs.get(project_id, 0) + 1) / (total_docs + len(candidates)))
+                for token in known:
+                    score += math.log(counts[token] + self.alpha) - denominator
+                scores[project_id] = score
+
+            best = max(scores, key=scores.get)
+            if not self._class_docs.get(best):
+                return None, 0.0, []
+            posterior = 1.0 / sum(math.exp(score - scores[best]) for score in scores.values())
+            evidence = sorted(token for token in known if self._class_tokens[best][token] > 0)
+
+        # Unseen words carry no evidence, so they dilute the confidence.
+        return best, posterior * len(known) / len(tokens), evidence
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "examples": len(self._examples),
+                "projects": len(self._class_docs),
+                "vocabulary": len(self._vocabulary),
+            }
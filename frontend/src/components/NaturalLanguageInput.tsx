@@ -1,13 +1,12 @@
 import React, { useState } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import toast from 'react-hot-toast';
+import type { Change } from '../types';
 
 interface NLResponse {
   response: string;
-  tasks: any[];
-  ideas: any[];
-  projects: any[];
   intent: string;
+  changes: Omit<Change, 'version'>[];
 }
 
 interface Props {
@@ -50,7 +49,7 @@ const NaturalLanguageInput: React.FC<Props> = ({ onSuccess }) => {
       const response = await fetch('http://localhost:8000/nl/invoke', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ input: { user_input: input } }),
+        body: JSON.stringify({ input: { user_input: input, output: 'delta' } }),
       });
 
       if (!response.ok) throw new Error('Failed to process command');
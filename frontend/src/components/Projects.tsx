@@ -2,7 +2,7 @@ import React, { useState } from 'react';
 import { useApp } from '../contexts/AppContext';
 
 const Projects: React.FC = () => {
-  const { projects, tasks, addProject, deleteProject, addTask, completeTask, deleteTask } = useApp();
+  const { projects, tasks, stats, addProject, deleteProject, addTask, completeTask, deleteTask } = useApp();
   const [showProjectForm, setShowProjectForm] = useState(false);
   const [newProjectName, setNewProjectName] = useState('');
   const [newProjectDesc, setNewProjectDesc] = useState('');
@@ -113,7 +113,7 @@ const Projects: React.FC = () => {
           ) : (
             <div className="space-y-2">
               {projects.map((project) => {
-                const taskCount = tasks.filter(t => t.projectId === project.id).length;
+                const taskCount = stats?.projects[project.id]?.total ?? 0;
                 const isSelected = selectedProjectId === project.id;
 
                 return (
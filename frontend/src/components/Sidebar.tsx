@@ -3,11 +3,11 @@ import { useApp } from '../contexts/AppContext';
 import type { Section } from '../types';
 
 const Sidebar: React.FC = () => {
-  const { activeSection, setActiveSection, ideas, inboxTasks, projects, darkMode, toggleDarkMode } = useApp();
+  const { activeSection, setActiveSection, ideas, stats, projects, darkMode, toggleDarkMode } = useApp();
 
   const sections: { id: Section; icon: string; label: string; count: number }[] = [
     { id: 'ideas', icon: '💡', label: 'Ideas', count: ideas.length },
-    { id: 'inbox', icon: '📥', label: 'Inbox', count: inboxTasks.filter(t => t.status === 'pending').length },
+    { id: 'inbox', icon: '📥', label: 'Inbox', count: stats?.inbox.pending ?? 0 },
     { id: 'projects', icon: '📁', label: 'Projects', count: projects.length },
   ];
 
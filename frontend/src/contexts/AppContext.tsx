@@ -1,5 +1,5 @@
-import React, { createContext, useContext, useState, useEffect, ReactNode } from 'react';
-import type { Idea, Project, Task, Section } from '../types';
+import React, { createContext, useContext, useState, useEffect, useRef, ReactNode } from 'react';
+import type { Idea, Project, Task, Section, Change, Stats } from '../types';
 import * as api from '../services/api';
 
 interface AppContextType {
@@ -8,6 +8,7 @@ interface AppContextType {
   projects: Project[];
   tasks: Task[];
   inboxTasks: Task[];
+  stats: Stats | null;
 
   // UI State
   activeSection: Section;
@@ -54,6 +55,7 @@ export const AppProvider: React.FC<AppProviderProps> = ({ children }) => {
   const [ideas, setIdeas] = useState<Idea[]>([]);
   const [projects, setProjects] = useState<Project[]>([]);
   const [tasks, setTasks] = useState<Task[]>([]);
+  const [stats, setStats] = useState<Stats | null>(null);
   const [activeSection, setActiveSection] = useState<Section>('inbox');
   const [darkMode, setDarkMode] = useState(() => {
     const saved = localStorage.getItem('darkMode');
@@ -61,6 +63,8 @@ export const AppProvider: React.FC<AppProviderProps> = ({ children }) => {
   });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  // Last change version seen, so refreshes only fetch what changed
+  const syncPoint = useRef<{ version: number; epoch: string } | null>(null);
 
   // Apply dark mode class to document
   useEffect(() => {
@@ -77,14 +81,58 @@ export const AppProvider: React.FC<AppProviderProps> = ({ children }) => {
     refreshData();
   }, []);
 
+  // Pick up changes made in other tabs or through /nl as they happen
+  useEffect(() => {
+    let pending: ReturnType<typeof setTimeout> | undefined;
+    const unsubscribe = api.subscribeToChanges(() => {
+      // Coalesce bursts of events into one delta fetch
+      clearTimeout(pending);
+      pending = setTimeout(() => refreshData(), 100);
+    });
+    return () => {
+      clearTimeout(pending);
+      unsubscribe();
+    };
+  }, []);
+
+  const applyChanges = <T extends { id: string }>(items: T[], changes: Change[]): T[] => {
+    if (changes.length === 0) return items;
+    const byId = new Map(items.map(item => [item.id, item]));
+    for (const change of changes) {
+      if (change.change === 'deleted') {
+        byId.delete(change.id);
+      } else {
+        byId.set(change.id, change.record as unknown as T);
+      }
+    }
+    return Array.from(byId.values());
+  };
+
   const refreshData = async () => {
     try {
-      setLoading(true);
       setError(null);
-      const data = await api.getAllData();
+      if (syncPoint.current) {
+        const delta = await api.getChanges(syncPoint.current.version, syncPoint.current.epoch);
+        if (!delta.resync) {
+          if (delta.changes.some(c => c.type !== 'ideas')) {
+            setStats(await api.getStats());
+          }
+          const ofType = (type: Change['type']) => delta.changes.filter(c => c.type === type);
+          setIdeas(current => applyChanges(current, ofType('ideas')));
+          setProjects(current => applyChanges(current, ofType('projects')));
+          setTasks(current => applyChanges(current, ofType('tasks')));
+          syncPoint.current = { version: delta.version, epoch: delta.epoch };
+          return;
+        }
+      }
+
+      setLoading(true);
+      const [data, counts] = await Promise.all([api.getAllData(), api.getStats()]);
+      setStats(counts);
       setIdeas(data.ideas);
       setProjects(data.projects);
       setTasks(data.tasks);
+      syncPoint.current = { version: data.version, epoch: data.epoch };
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to load data');
       console.error('Error loading data:', err);
@@ -200,6 +248,7 @@ export const AppProvider: React.FC<AppProviderProps> = ({ children }) => {
     projects,
     tasks,
     inboxTasks,
+    stats,
     activeSection,
     setActiveSection,
     darkMode,
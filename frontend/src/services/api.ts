@@ -1,4 +1,4 @@
-import type { Idea, Project, Task, AppData, Suggestion } from '../types';
+import type { Idea, Project, Task, AppData, ChangeSet, Stats, Suggestion, TaskOperation, TaskBatchResult } from '../types';
 
 const API_BASE_URL = 'http://localhost:8000';
 
@@ -24,6 +24,19 @@ export const getAllData = (): Promise<AppData> => {
   return fetchAPI<AppData>('/data');
 };
 
+// Get records changed since a version returned by getAllData/getChanges
+export const getChanges = (since: number, epoch: string): Promise<ChangeSet> => {
+  return fetchAPI<ChangeSet>(`/changes?since=${since}&epoch=${encodeURIComponent(epoch)}`);
+};
+
+// Subscribe to server-pushed change notifications
+export const subscribeToChanges = (onChange: () => void): (() => void) => {
+  const source = new EventSource(`${API_BASE_URL}/events`);
+  source.addEventListener('change', onChange);
+  source.addEventListener('resync', onChange);
+  return () => source.close();
+};
+
 // Ideas API
 export const getIdeas = (): Promise<Idea[]> => {
   return fetchAPI<Idea[]>('/ideas');
@@ -84,6 +97,11 @@ export const getProjectTasks = (id: string): Promise<Task[]> => {
   return fetchAPI<Task[]>(`/projects/${id}/tasks`);
 };
 
+// Task counts per project and for the inbox, maintained by the server
+export const getStats = (): Promise<Stats> => {
+  return fetchAPI<Stats>('/stats');
+};
+
 // Tasks API
 export const getTasks = (): Promise<Task[]> => {
   return fetchAPI<Task[]>('/tasks');
@@ -125,6 +143,14 @@ export const deleteTask = (id: string): Promise<{ message: string }> => {
   });
 };
 
+// Apply many task operations with a single commit; atomic rolls back on any failure
+export const batchTasks = (operations: TaskOperation[], atomic = false): Promise<TaskBatchResult> => {
+  return fetchAPI<TaskBatchResult>('/tasks/batch', {
+    method: 'POST',
+    body: JSON.stringify({ operations, atomic }),
+  });
+};
+
 // AI Suggestions API
 export const suggestProject = (taskText: string, taskId?: string): Promise<Suggestion> => {
   return fetchAPI<Suggestion>('/ai/suggest-project', {
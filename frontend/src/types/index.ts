@@ -31,12 +31,66 @@ export interface Suggestion {
   suggestedProjectId: string | null;
   confidence: number;
   reasoning: string;
+  source?: 'local' | 'llm';
 }
 
 export interface AppData {
   ideas: Idea[];
   projects: Project[];
   tasks: Task[];
+  version: number;
+  epoch: string;
+}
+
+export interface Change {
+  type: 'ideas' | 'projects' | 'tasks';
+  id: string;
+  change: 'created' | 'updated' | 'deleted';
+  version: number;
+  record: Idea | Project | Task | null;
+}
+
+export interface ChangeSet {
+  epoch: string;
+  version: number;
+  resync: boolean;
+  changes: Change[];
+}
+
+export interface TaskCounts {
+  total: number;
+  pending: number;
+  completed: number;
+  pendingByPriority: Record<'high' | 'medium' | 'low' | 'none', number>;
+  overdue: number;
+  completedToday: number;
+}
+
+export interface Stats {
+  totals: TaskCounts;
+  inbox: TaskCounts;
+  projects: Record<string, TaskCounts>;
+}
+
+export interface TaskOperation {
+  op: 'create' | 'update' | 'move' | 'complete' | 'delete';
+  id?: string;
+  task?: Partial<Task>;
+  projectId?: string | null;
+}
+
+export interface TaskOperationResult {
+  index: number;
+  ok: boolean;
+  task?: Task;
+  status?: number;
+  error?: string;
+}
+
+export interface TaskBatchResult {
+  applied: number;
+  failed: number;
+  results: TaskOperationResult[];
 }
 
 export type Section = 'ideas' | 'inbox' | 'projects';
@@ -0,0 +1,151 @@
+"""In-process background jobs for long-running AI operations.
+
+A job wraps a coroutine that runs on the server's event loop behind a
+bounded worker pool, so submitting returns immediately with a job id. The
+coroutine reports per-item results as they complete; clients poll or
+stream them, can cancel the job, and read the final result once it
+finishes. Finished jobs are dropped after a TTL.
+"""
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
+import time
+import uuid
+
+from telemetry import get_logger
+
+log = get_logger("jobs")
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def utc_now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+class Job:
+    """State of one submitted job."""
+
+    def __init__(self, kind: str, total: Optional[int] = None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.status = "queued"
+        self.total = total
+        self.results: list = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.createdAt = utc_now()
+        self.startedAt: Optional[str] = None
+        self.finishedAt: Optional[str] = None
+        self.finished_monotonic: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def add_result(self, item) -> None:
+        """Record one per-item result and wake any streaming readers."""
+        self.results.append(item)
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _finish(self, status: str) -> None:
+        self.status = status
+        self.finishedAt = utc_now()
+        self.finished_monotonic = time.monotonic()
+        self._notify()
+
+    @property
+    def done(self) -> bool:
+        return self.status not in ACTIVE_STATUSES
+
+    async def wait_for_change(self, timeout: Optional[float] = None) -> None:
+        """Block until the job records a result or changes status."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def to_dict(self, after: int = 0) -> dict:
+        """Public view; ``after`` skips results the client already has."""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": {"completed": len(self.results), "total": self.total},
+            "results": self.results[after:],
+            "nextAfter": len(self.results),
+            "result": self.result,
+            "error": self.error,
+            "createdAt": self.createdAt,
+            "startedAt": self.startedAt,
+            "finishedAt": self.finishedAt,
+        }
+
+
+class JobManager:
+    """Runs jobs on the current event loop with at most ``max_workers`` at once."""
+
+    def __init__(self, max_workers: int = 2, ttl_seconds: float = 3600):
+        self.max_workers = max_workers
+        self.ttl_seconds = ttl_seconds
+        self._jobs: dict[str, Job] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def submit(self, kind: str, work: Callable[[Job], Awaitable[Any]], total: Optional[int] = None) -> Job:
+        """Queue ``work(job)``; must be called from the event loop.
+
+        The coroutine's return value becomes the job's final result.
+        """
+        self.purge()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+        job = Job(kind, total=total)
+        self._jobs[job.id] = job
+        job._task = asyncio.create_task(self._run(job, work))
+        return job
+
+    async def _run(self, job: Job, work: Callable[[Job], Awaitable[Any]]) -> None:
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.startedAt = utc_now()
+                job._notify()
+                job.result = await work(job)
+            job._finish("completed")
+        except asyncio.CancelledError:
+            job._finish("cancelled")
+        except Exception as e:
+            job.error = str(e)
+            job._finish("failed")
+            log.error("job failed", job_id=job.id, kind=job.kind, error=str(e), exc_info=True)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.purge()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job. Returns the job, or None if unknown."""
+        job = self.get(job_id)
+        if job is not None and not job.done and job._task is not None:
+            job._task.cancel()
+        return job
+
+    def purge(self) -> None:
+        """Forget finished jobs older than the TTL."""
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_monotonic is not None and job.finished_monotonic < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def shutdown(self) -> None:
+        """Cancel every unfinished job and wait for them to stop."""
+        tasks = [job._task for job in self._jobs.values() if not job.done and job._task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
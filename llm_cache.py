@@ -0,0 +1,239 @@
+"""Response cache in front of the chat model.
+
+Entries are keyed on the call site, the normalized prompt and an optional
+fingerprint of any state the reply depends on that the prompt text does
+not show. Prompts that spell out their inputs (the categorization prompts
+list their candidate projects) need none, so an edit only stops matching
+the entries whose prompts it changed.
+
+The memory tier is an LRU with a TTL. An optional SQLite file adds a
+second tier that survives restarts; expired rows are purged when it opens
+and every ``PURGE_EVERY`` writes, and the async wrappers reach it from a
+worker thread.
+"""
+from collections import OrderedDict
+from typing import Optional
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.messages import AIMessage
+
+from telemetry import REGISTRY
+
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "llm_request_seconds", "Latency of chat model calls that missed the cache", ("call_site",))
+LLM_ERRORS = REGISTRY.counter("llm_errors_total", "Chat model calls that raised", ("call_site",))
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "Tokens reported by the provider", ("call_site", "type"))
+LLM_CACHE_REQUESTS = REGISTRY.counter("llm_cache_requests_total", "Cache lookups by outcome", ("call_site", "outcome"))
+
+# Writes to the SQLite tier between purges of its expired rows
+PURGE_EVERY = 1000
+
+
+def normalize(text: str) -> str:
+    """Collapse whitespace so trivially different phrasings share an entry."""
+    return " ".join(text.split())
+
+
+def record_usage(response, call_site: str) -> None:
+    """Count the prompt/completion tokens the provider reported, if any."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.inc(usage[kind], call_site=call_site, type=kind.removesuffix("_tokens"))
+
+
+class LLMCache:
+    """Two-tier (memory LRU + optional SQLite) cache of LLM reply text."""
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 86400, disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.RLock()
+        self._disk: Optional[sqlite3.Connection] = None
+        self._disk_writes = 0
+        self.stats: dict[str, dict[str, int]] = {}
+
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False, isolation_level=None)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, content TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self._disk.execute("CREATE INDEX IF NOT EXISTS llm_cache_expires ON llm_cache (expires)")
+            self.purge_expired()
+
+    @staticmethod
+    def key(messages: list, call_site: str, fingerprint: str = "") -> str:
+        payload = [call_site, fingerprint, [(message.type, normalize(str(message.content))) for message in messages]]
+        return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+    def _count(self, call_site: str, outcome: str) -> None:
+        counters = self.stats.setdefault(call_site, {"hit": 0, "disk_hit": 0, "miss": 0})
+        counters[outcome] += 1
+        LLM_CACHE_REQUESTS.inc(call_site=call_site, outcome=outcome)
+
+    def get(self, key: str, call_site: str = "") -> Optional[str]:
+        content = self._get_memory(key, call_site)
+        if content is None:
+            content = self._get_disk(key, call_site)
+        return content
+
+    async def aget(self, key: str, call_site: str = "") -> Optional[str]:
+        """``get`` with the SQLite lookup, if any, off the event loop."""
+        if self._disk is None:
+            return self.get(key, call_site)
+        content = self._get_memory(key, call_site)
+        if content is None:
+            content = await asyncio.to_thread(self._get_disk, key, call_site)
+        return content
+
+    def _get_memory(self, key: str, call_site: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, content = entry
+            if expires <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self._count(call_site, "hit")
+            return content
+
+    def _get_disk(self, key: str, call_site: str) -> Optional[str]:
+        """The SQLite tier's entry (counting the lookup as a disk hit or a miss)."""
+        with self._lock:
+            if self._disk is not None:
+                row = self._disk.execute("SELECT content, expires FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row and row[1] > time.time():
+                    self._remember(key, row[1], row[0])
+                    self._count(call_site, "disk_hit")
+                    return row[0]
+            self._count(call_site, "miss")
+            return None
+
+    def put(self, key: str, content: str) -> None:
+        expires = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires, content)
+        self._put_disk(key, content, expires)
+
+    async def aput(self, key: str, content: str) -> None:
+        """``put`` with the SQLite write, if any, off the event loop."""
+        if self._disk is None:
+            return self.put(key, content)
+        expires = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires, content)
+        await asyncio.to_thread(self._put_disk, key, content, expires)
+
+    def _put_disk(self, key: str, content: str, expires: float) -> None:
+        with self._lock:
+            if self._disk is None:
+                return
+            self._disk.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, content, expires) VALUES (?, ?, ?)",
+                (key, content, expires),
+            )
+            self._disk_writes += 1
+            if self._disk_writes % PURGE_EVERY == 0:
+                self.purge_expired()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the SQLite tier; returns how many went."""
+        with self._lock:
+            if self._disk is None:
+                return 0
+            return self._disk.execute("DELETE FROM llm_cache WHERE expires <= ?", (time.time(),)).rowcount
+
+    def _remember(self, key: str, expires: float, content: str) -> None:
+        self._entries[key] = (expires, content)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM llm_cache")
+
+    def snapshot(self) -> dict:
+        """Sizes and per-call-site hit/miss counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl_seconds,
+                "disk": self.disk_path,
+                "callSites": {site: dict(counters) for site, counters in self.stats.items()},
+            }
+
+    # --- Model wrappers ---
+    def invoke(self, llm, messages: list, call_site: str, fingerprint: str = "") -> AIMessage:
+        """``llm.invoke(messages)`` unless an identical prompt is cached."""
+        key = self.key(messages, call_site, fingerprint)
+        content = self.get(key, call_site)
+        if content is None:
+            started = time.perf_counter()
+            try:
+                response = llm.invoke(messages)
+            except Exception:
+                LLM_ERRORS.inc(call_site=call_site)
+                raise
+            finally:
+                LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, call_site=call_site)
+            record_usage(response, call_site)
+            content = response.content
+            self.put(key, content)
+        return AIMessage(content=content)
+
+    async def ainvoke(self, llm, messages: list, call_site: str, fingerprint: str = "") -> AIMessage:
+        """Async counterpart of ``invoke`` using ``llm.ainvoke``."""
+        key = self.key(messages, call_site, fingerprint)
+        content = await self.aget(key, call_site)
+        if content is None:
+            started = time.perf_counter()
+            try:
+                response = await llm.ainvoke(messages)
+            except Exception:
+                LLM_ERRORS.inc(call_site=call_site)
+                raise
+            finally:
+                LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, call_site=call_site)
+            record_usage(response, call_site)
+            content = response.content
+            await self.aput(key, content)
+        return AIMessage(content=content)
+
+
+class NullCache(LLMCache):
+    """Pass-through used when caching is disabled; still counts calls."""
+
+    def get(self, key: str, call_site: str = "") -> Optional[str]:
+        with self._lock:
+            self._count(call_site, "miss")
+        return None
+
+    def put(self, key: str, content: str) -> None:
+        pass
+
+
+def build_llm_cache() -> LLMCache:
+    """Configure the LLM cache from environment variables."""
+    if os.environ.get("LLM_CACHE", "1") == "0":
+        return NullCache(max_entries=0)
+    return LLMCache(
+        max_entries=int(os.environ.get("LLM_CACHE_SIZE", "2048")),
+        ttl_seconds=float(os.environ.get("LLM_CACHE_TTL", "86400")),
+        disk_path=os.environ.get("LLM_CACHE_PATH") or None,
+    )
@@ -0,0 +1,191 @@
+"""Rule-based argument extraction for common /nl commands.
+
+Once the keyword rules have picked an intent, most commands follow a few
+fixed shapes: "add buy groceries to Work by friday", "new idea: ...",
+"complete 8d974b68". This module pulls the arguments out of those shapes
+without calling the model. It returns None whenever the input does not
+fit a known shape (verb not leading, leftover "priority"/"due" words, no
+text beyond a filler word, an id that is not the whole argument or
+matches nothing or more than one task), and the caller then falls back
+to the LLM.
+
+Arguments use the same keys as the structured LLM parser: text, project,
+taskId, priority and dueDate.
+"""
+from datetime import date, timedelta
+from typing import Callable, Iterable, Optional
+import re
+
+_PLEASE = r"^(?:please\s+|pls\s+)?"
+_ARTICLE = r"(?:\s+(?:a|an))?(?:\s+new)?"
+_SEPARATOR = r"(?:\s*[:\-]\s*|\s+)"
+
+VERB_PATTERNS = {
+    "add_task": re.compile(_PLEASE + r"(?:add|create|new|todo)" + _ARTICLE + r"(?:\s+(?:task|todo))?" + _SEPARATOR, re.I),
+    "add_idea": re.compile(_PLEASE + r"(?:add|create|new)" + _ARTICLE + r"\s+idea" + _SEPARATOR + r"(?:about\s+)?", re.I),
+    "add_project": re.compile(_PLEASE + r"(?:add|create|new|start)" + _ARTICLE + r"\s+project" + _SEPARATOR + r"(?:(?:called|named)\s+)?", re.I),
+}
+
+# "complete [task] <id> [as done]" / "delete [task] <id>": the id must be the whole argument,
+# so words that happen to be hex ("cafe", "dead", "2025") are never taken for one.
+_ID_ARGUMENT = r"(?:\s+(?:the\s+)?task)?\s+(?:id\s+|#)?(?P<id>\S+?)(?:\s+as\s+(?:done|complete|completed|finished))?\s*[.!]?$"
+ID_COMMANDS = {
+    "complete_task": re.compile(_PLEASE + r"(?:complete|finish|done|check\s+off|mark)" + _ID_ARGUMENT, re.I),
+    "delete_task": re.compile(_PLEASE + r"(?:delete|remove|rm|trash)" + _ID_ARGUMENT, re.I),
+}
+FULL_ID = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+# A prefix as the UI shows it, optionally with a trailing "-" or ellipsis
+SHORT_ID = re.compile(r"([0-9a-f]{8,}(?:-[0-9a-f]+)*)-?(?:…|\.\.\.)?")
+MIN_ID_PREFIX = 8
+
+PRIORITY_PATTERNS = [
+    (re.compile(r"\b(?:with\s+|as\s+)?(high|medium|low)[\s-]+priority\b", re.I), None),
+    (re.compile(r"\b(?:with\s+)?priority\s*[:=]?\s*(high|medium|low)\b", re.I), None),
+    (re.compile(r"(?<!\w)p([123])\b", re.I), {"1": "high", "2": "medium", "3": "low"}),
+    # Bare words only as a tag: leading with a separator ("urgent: ...") or
+    # trailing, so "urgent care appointment" keeps its text.
+    (re.compile(r"^\s*(urgent|asap)\s*[:,!\-]", re.I), {"urgent": "high", "asap": "high"}),
+    (re.compile(r"[\s,(\-]+(urgent|asap)\W*$", re.I), {"urgent": "high", "asap": "high"}),
+]
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+DUE_PATTERN = re.compile(
+    r"\b(?:(?:due|by|on|before)\s+(?:(?:next\s+)?(?P<weekday>" + "|".join(WEEKDAYS) + r")"
+    r"|(?P<iso>\d{4}-\d{2}-\d{2})|(?P<next_week>next week))"
+    r"|(?:(?:due|by|on|before)\s+)?(?P<relative>today|tonight|tomorrow)"
+    r"|(?:due\s+)?in\s+(?P<days>\d{1,3})\s+days?)(?![\w'’])",
+    re.I,
+)
+
+# Words that mean the input carried details the rules did not understand.
+UNPARSED_DETAIL = re.compile(r"\b(?:priority|due|deadline)\b", re.I)
+
+PROJECT_PREPOSITION = re.compile(r"\s+(?:to|in|into|for|under)\s+", re.I)
+INBOX_NAMES = ("inbox", "the inbox", "my inbox")
+
+# A remainder this vague ("new task", "add something") is not a title.
+FILLER_WORDS = {"task", "todo", "idea", "project", "item", "thing", "something", "it", "this", "that", "one"}
+
+
+def _clean(text: str) -> str:
+    text = " ".join(text.split()).strip(" ,;:-")
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        text = text[1:-1].strip()
+    return text
+
+
+def _strip_verb(intent: str, user_input: str) -> Optional[str]:
+    match = VERB_PATTERNS[intent].match(user_input.strip())
+    if not match:
+        return None
+    return user_input.strip()[match.end():]
+
+
+def extract_priority(text: str) -> tuple[str, Optional[str]]:
+    """Remove a priority phrase; return (remaining text, priority or None)."""
+    for pattern, mapping in PRIORITY_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            value = match.group(1).lower()
+            priority = mapping[value] if mapping else value
+            return text[:match.start()] + " " + text[match.end():], priority
+    return text, None
+
+
+def extract_due_date(text: str, today: date) -> tuple[str, Optional[str]]:
+    """Remove a due-date phrase; return (remaining text, YYYY-MM-DD or None)."""
+    match = DUE_PATTERN.search(text)
+    if not match:
+        return text, None
+
+    if match.group("iso"):
+        try:
+            due = date.fromisoformat(match.group("iso"))
+        except ValueError:
+            return text, None
+    elif match.group("weekday"):
+        target = WEEKDAYS.index(match.group("weekday").lower())
+        due = today + timedelta(days=(target - today.weekday()) % 7 or 7)
+    elif match.group("next_week"):
+        due = today + timedelta(days=7)
+    elif match.group("days"):
+        due = today + timedelta(days=int(match.group("days")))
+    else:
+        due = today + timedelta(days=1 if match.group("relative").lower() == "tomorrow" else 0)
+
+    return text[:match.start()] + " " + text[match.end():], due.isoformat()
+
+
+def extract_project(text: str, project_names: Iterable[str]) -> tuple[str, Optional[str], bool]:
+    """Remove a trailing "to <project>" phrase.
+
+    Returns (remaining text, project name or None, matched). Only names of
+    existing projects (or the inbox) are taken, so "call mom to say hi"
+    keeps its text.
+    """
+    names = {name.strip().lower(): name for name in project_names}
+    for match in PROJECT_PREPOSITION.finditer(text):
+        target = _clean(text[match.end():]).lower()
+        target = re.sub(r"^(?:the|my)\s+", "", target)
+        target = re.sub(r"^project\s+|\s+project$", "", target)
+        if target in names:
+            return text[:match.start()], names[target], True
+        if target in INBOX_NAMES or f"the {target}" in INBOX_NAMES:
+            return text[:match.start()], None, True
+    return text, None, False
+
+
+def resolve_task_id(argument: str, ids_with_prefix: Callable[[str], list[str]]) -> Optional[str]:
+    """Resolve an id argument: a full UUID, or a prefix of at least MIN_ID_PREFIX hex characters matching one task."""
+    token = argument.strip().lower()
+    if FULL_ID.fullmatch(token):
+        return token
+    match = SHORT_ID.fullmatch(token)
+    if not match:
+        return None
+    matches = ids_with_prefix(match.group(1))
+    return matches[0] if len(matches) == 1 else None
+
+
+def parse_local(intent: str, user_input: str, project_names: Iterable[str],
+                ids_with_prefix: Callable[[str], list[str]], today: Optional[date] = None) -> Optional[dict]:
+    """Extract arguments for ``intent`` without the LLM.
+
+    Returns an args dict, or None when the input is not confidently
+    understood and the model should handle it.
+    """
+    today = today or date.today()
+
+    if intent in ID_COMMANDS:
+        match = ID_COMMANDS[intent].match(user_input.strip())
+        task_id = resolve_task_id(match.group("id"), ids_with_prefix) if match else None
+        return {"taskId": task_id} if task_id else None
+
+    if intent not in VERB_PATTERNS:
+        return None
+    rest = _strip_verb(intent, user_input)
+    if rest is None:
+        return None
+
+    args = {}
+    if intent == "add_task":
+        rest, priority = extract_priority(rest)
+        rest, due_date = extract_due_date(rest, today)
+        rest, project, _ = extract_project(rest, project_names)
+        if priority is None:
+            # A trailing "asap" may have sat before the due or project phrase.
+            rest, priority = extract_priority(rest)
+        if UNPARSED_DETAIL.search(rest):
+            return None
+        if priority:
+            args["priority"] = priority
+        if due_date:
+            args["dueDate"] = due_date
+        if project:
+            args["project"] = project
+
+    text = _clean(rest)
+    if not text or text.lower() in FILLER_WORDS:
+        return None
+    args["text"] = text
+    return args
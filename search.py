@@ -0,0 +1,342 @@
+"""In-process inverted index for full-text search across collections.
+
+The index is built once from the store and then kept current through a
+store listener, so each create/update/delete only re-tokenizes the record
+that changed. Queries AND their terms together, expand the last term as a
+prefix for type-ahead, and rank matches with BM25.
+"""
+from bisect import bisect_left, insort
+from typing import Optional
+import heapq
+import math
+import re
+import threading
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens."""
+    return TOKEN_RE.findall(text.lower())
+
+
+class SearchIndex:
+    """Inverted index over configured fields of several collections.
+
+    ``fields`` maps a collection kind to {field name: weight}. A field may
+    hold a string or a list of strings (e.g. idea tags). Documents are keyed
+    by (kind, id).
+    """
+
+    def __init__(self, fields: dict[str, dict[str, float]], max_expansions: int = 64, min_prefix: int = 2):
+        self.fields = fields
+        self.max_expansions = max_expansions
+        self.min_prefix = min_prefix
+
+        self._postings: dict[str, dict[tuple[str, str], float]] = {}
+        self._vocabulary: list[str] = []  # sorted, for prefix lookups
+        self._doc_terms: dict[tuple[str, str], dict[str, float]] = {}
+        self._doc_lengths: dict[tuple[str, str], float] = {}
+        self._total_length = 0.0
+        self._lock = threading.RLock()
+
+    # --- Maintenance ---
+    def build(self, store) -> None:
+        """Index every record of the configured collections."""
+        with self._lock:
+            for kind in self.fields:
+                self.rebuild_kind(store, kind)
+
+    def rebuild_kind(self, store, kind: str) -> None:
+        """Drop and re-index one collection."""
+        with self._lock:
+            for doc in [doc for doc in self._doc_terms if doc[0] == kind]:
+                self._remove(doc)
+            for record in store.all(kind):
+                self._add(kind, record)
+
+    def listener(self, store):
+        """Return a store listener that keeps this index current."""
+        def on_change(kind: str, op: str, before: Optional[dict], after: Optional[dict]) -> None:
+            if kind not in self.fields:
+                return
+            if op == "reset":
+                self.rebuild_kind(store, kind)
+                return
+            with self._lock:
+                if before is not None:
+                    self._remove((kind, before["id"]))
+                if after is not None:
+                    self._add(kind, after)
+        return on_change
+
+    def _terms(self, kind: str, record: dict) -> dict[str, float]:
+        terms: dict[str, float] = {}
+        for field, weight in self.fields[kind].items():
+            value = record.get(field)
+            if not value:
+                continue
+            text = " ".join(value) if isinstance(value, list) else str(value)
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0.0) + weight
+        return terms
+
+    def _add(self, kind: str, record: dict) -> None:
+        doc = (kind, record["id"])
+        terms = self._terms(kind, record)
+        if not terms:
+            return
+        for term, weight in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._vocabulary, term)
+            postings[doc] = weight
+        length = sum(terms.values())
+        self._doc_terms[doc] = terms
+        self._doc_lengths[doc] = length
+        self._total_length += length
+
+    def _remove(self, doc: tuple[str, str]) -> None:
+        terms = self._doc_terms.pop(doc, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(doc, None)
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect_left(self._vocabulary, term)]
+        self._total_length -= self._doc_lengths.pop(doc)
+
+    # --- Queries ---
+    def _expand(self, prefix: str) -> list[str]:
+        start = bisect_left(self._vocabulary, prefix)
+        expansions = []
+        for term in self._vocabulary[start:start + self.max_expansions]:
+            if not term.startswith(prefix):
+                break
+            expansions.append(term)
+        return expansions
+
+    def search(self, query: str, kinds=None, limit: int = 20, prefix: bool = True) -> list[tuple[str, str, float]]:
+        """Return up to ``limit`` (kind, id, score) tuples, best first.
+
+        Every query term must match. With ``prefix`` the last term also
+        matches any indexed term it is a prefix of, once it is at least
+        ``min_prefix`` characters long.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            doc_count = len(self._doc_terms)
+            if not doc_count:
+                return []
+            average_length = self._total_length / doc_count
+
+            # One posting map per query token; a prefix token merges its expansions.
+            token_postings = []
+            for position, token in enumerate(tokens):
+                if prefix and position == len(tokens) - 1 and len(token) >= self.min_prefix:
+                    terms = self._expand(token)
+                else:
+                    terms = [token] if token in self._postings else []
+                if not terms:
+                    return []
+                token_postings.append([(term, self._postings[term]) for term in terms])
+
+            def size(entry) -> int:
+                return sum(len(postings) for _, postings in entry)
+
+            # Intersect starting from the rarest token.
+            ordered = sorted(token_postings, key=size)
+            candidates = set()
+            for _, postings in ordered[0]:
+                candidates.update(postings)
+            for entry in ordered[1:]:
+                candidates = {doc for doc in candidates if any(doc in postings for _, postings in entry)}
+                if not candidates:
+                    return []
+            if kinds:
+                candidates = {doc for doc in candidates if doc[0] in kinds}
+
+            def score(doc) -> float:
+                total = 0.0
+                norm = K1 * (1 - B + B * self._doc_lengths[doc] / average_length)
+                for entry in token_postings:
+                    best = 0.0
+                    for _, postings in entry:
+                        tf = postings.get(doc)
+                        if tf:
+                            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                            best = max(best, idf * tf * (K1 + 1) / (tf + norm))
+                    total += best
+                return total
+
+            ranked = heapq.nlargest(limit, ((score(doc), doc) for doc in candidates))
+            return [(kind, record_id, round(value, 4)) for value, (kind, record_id) in ranked]
+
+
+class ProjectRetriever:
+    """Ranks projects against a task text for prompt prefiltering.
+
+    Each project is one profile document built from its name, description
+    and the text of tasks filed under it, weighted by ``weights``. Unlike
+    ``SearchIndex.search`` any query term may match (OR semantics), since
+    a new task rarely shares every word with its project. Kept current
+    through a store listener on both projects and tasks.
+    """
+
+    def __init__(self, weights: Optional[dict[str, float]] = None):
+        self.weights = weights or {"name": 3.0, "description": 2.0, "tasks": 1.0}
+
+        self._profiles: dict[str, dict[str, float]] = {}  # project id -> term weights
+        self._lengths: dict[str, float] = {}  # project id -> sum of its profile's weights
+        self._task_terms: dict[str, tuple[str, list[str]]] = {}  # task id -> (project id, tokens)
+        self._project_terms: dict[str, dict[str, float]] = {}  # project id -> name/description terms
+        self._document_frequency: dict[str, int] = {}
+        self._task_counts: dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    # --- Maintenance ---
+    def build(self, store) -> None:
+        """Profile every project and the tasks filed under it."""
+        with self._lock:
+            self._profiles.clear()
+            self._lengths.clear()
+            self._document_frequency.clear()
+            self._task_terms.clear()
+            self._project_terms.clear()
+            self._task_counts.clear()
+            for project in store.all("projects"):
+                self._add_project(project)
+            for task in store.all("tasks"):
+                self._add_task(task)
+
+    def listener(self, store):
+        """Return a store listener that keeps project profiles current."""
+        def on_change(kind: str, op: str, before: Optional[dict], after: Optional[dict]) -> None:
+            if kind not in ("projects", "tasks"):
+                return
+            if op == "reset":
+                self.build(store)
+                return
+            with self._lock:
+                if kind == "projects":
+                    if before is not None:
+                        self._remove_project(before["id"])
+                    if after is not None:
+                        self._add_project(after)
+                else:
+                    if before is not None:
+                        self._remove_task(before["id"])
+                    if after is not None:
+                        self._add_task(after)
+        return on_change
+
+    def _adjust(self, project_id: str, terms: dict[str, float], sign: float) -> None:
+        profile = self._profiles.get(project_id)
+        if profile is None:
+            profile = self._profiles[project_id] = {}
+        length = self._lengths.get(project_id, 0.0)
+        for term, weight in terms.items():
+            previous = profile.get(term, 0.0)
+            value = previous + sign * weight
+            if value > 1e-9:
+                if term not in profile:
+                    self._document_frequency[term] = self._document_frequency.get(term, 0) + 1
+                profile[term] = value
+                length += value - previous
+            elif term in profile:
+                del profile[term]
+                length -= previous
+                self._document_frequency[term] -= 1
+                if not self._document_frequency[term]:
+                    del self._document_frequency[term]
+        self._lengths[project_id] = length if profile else 0.0
+
+    def _drop_profile(self, project_id: str) -> None:
+        self._lengths.pop(project_id, None)
+        for term in self._profiles.pop(project_id, {}):
+            self._document_frequency[term] -= 1
+            if not self._document_frequency[term]:
+                del self._document_frequency[term]
+
+    def _add_project(self, project: dict) -> None:
+        terms: dict[str, float] = {}
+        for field in ("name", "description"):
+            for token in tokenize(str(project.get(field) or "")):
+                terms[token] = terms.get(token, 0.0) + self.weights[field]
+        self._project_terms[project["id"]] = terms
+        self._adjust(project["id"], terms, 1)
+
+    def _remove_project(self, project_id: str) -> None:
+        self._adjust(project_id, self._project_terms.pop(project_id, {}), -1)
+        if project_id not in self._task_counts:
+            self._drop_profile(project_id)
+
+    def _add_task(self, task: dict) -> None:
+        project_id = task.get("projectId")
+        if not project_id:
+            return
+        tokens = tokenize(task.get("text") or "")
+        self._task_terms[task["id"]] = (project_id, tokens)
+        self._task_counts[project_id] = self._task_counts.get(project_id, 0) + 1
+        terms: dict[str, float] = {}
+        for token in tokens:
+            terms[token] = terms.get(token, 0.0) + self.weights["tasks"]
+        self._adjust(project_id, terms, 1)
+
+    def _remove_task(self, task_id: str) -> None:
+        entry = self._task_terms.pop(task_id, None)
+        if entry is None:
+            return
+        project_id, tokens = entry
+        terms: dict[str, float] = {}
+        for token in tokens:
+            terms[token] = terms.get(token, 0.0) + self.weights["tasks"]
+        self._adjust(project_id, terms, -1)
+        self._task_counts[project_id] -= 1
+        if not self._task_counts[project_id]:
+            del self._task_counts[project_id]
+            if project_id not in self._project_terms:
+                self._drop_profile(project_id)
+
+    # --- Queries ---
+    def rank(self, text: str, project_ids: list[str], limit: int) -> list[str]:
+        """Up to ``limit`` of ``project_ids``, most similar to ``text`` first.
+
+        Projects sharing no term with the text fill any remaining slots,
+        busiest first, so the result only shrinks when the catalog does.
+        """
+        tokens = set(tokenize(text))
+        with self._lock:
+            lengths = {project_id: self._lengths.get(project_id, 0.0) for project_id in project_ids}
+            average_length = (sum(lengths.values()) / len(lengths)) if lengths else 0.0
+            doc_count = max(len(self._profiles), 1)
+
+            def score(project_id: str) -> float:
+                profile = self._profiles.get(project_id)
+                if not profile:
+                    return 0.0
+                total = 0.0
+                norm = K1 * (1 - B + B * lengths[project_id] / (average_length or 1.0))
+                for token in tokens:
+                    tf = profile.get(token)
+                    if tf:
+                        df = self._document_frequency[token]
+                        idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                        total += idf * tf * (K1 + 1) / (tf + norm)
+                return total
+
+            ranked = sorted(
+                project_ids,
+                key=lambda project_id: (-score(project_id), -self._task_counts.get(project_id, 0)),
+            )
+        return ranked[:limit]
@@ -1,23 +1,48 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from langserve import add_routes
-from langgraph.graph import StateGraph, END
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
-from typing import TypedDict, Literal, Optional
-from pydantic import BaseModel, Field
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, ValidationError
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
 from datetime import datetime
+from archive import UNSET, ArchiveDamaged, TaskArchive
+from changes import ChangeLog, EventBroker
+from jobs import JobManager
+from search import SearchIndex
+from stats import TaskStats
+from storage import build_store
+from telemetry import REGISTRY, configure_logging, get_logger
+import asyncio
+import base64
+import binascii
+import hashlib
 import json
 import os
+import sys
+import time
 import uuid
 
+if __name__ == "__main__":
+    # assistant.py imports from "server"; make that this module rather than a second copy
+    sys.modules.setdefault("server", sys.modules["__main__"])
+
 load_dotenv()
+configure_logging()
+log = get_logger("server")
+
+# Serve only the REST routes, without importing the LLM stack (langchain, langgraph, langserve)
+REST_ONLY = os.environ.get("REST_ONLY", "0") == "1"
 
 # --- File Storage Configuration ---
 IDEAS_FILE = "ideas.json"
 PROJECTS_FILE = "projects.json"
 TASKS_FILE = "tasks.json"
+ARCHIVE_FILE = os.environ.get("ARCHIVE_PATH", "tasks.archive.jsonl.gz")
+
+# Move tasks completed more than this many days ago to the archive (0 = only on request)
+ARCHIVE_AFTER_DAYS = float(os.environ.get("ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_INTERVAL_SECONDS = float(os.environ.get("ARCHIVE_INTERVAL_SECONDS", "3600"))
 
 # --- Pydantic Models ---
 class Idea(BaseModel):
@@ -45,790 +70,758 @@ class Task(BaseModel):
     createdAt: str = Field(default_factory=lambda: datetime.utcnow().isoformat() + "Z")
     completedAt: Optional[str] = None
 
-class Suggestion(BaseModel):
-    taskId: str
-    suggestedProjectId: Optional[str] = None
-    confidence: float
-    reasoning: str
-
-# --- File Storage Functions ---
-def load_json_file(filepath: str, default=None):
-    """Generic JSON file loader."""
-    if default is None:
-        default = []
-
-    if not os.path.exists(filepath):
-        return default
-
-    try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-            return data if data else default
-    except (json.JSONDecodeError, IOError):
-        return default
-
-def save_json_file(filepath: str, data) -> None:
-    """Generic JSON file saver."""
-    try:
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
-    except IOError as e:
-        print(f"[ERROR] Failed to save {filepath}: {e}")
-
-def load_ideas() -> list[dict]:
-    """Load ideas from JSON file."""
-    return load_json_file(IDEAS_FILE, [])
-
-def save_ideas(ideas: list[dict]) -> None:
-    """Save ideas to JSON file."""
-    save_json_file(IDEAS_FILE, ideas)
-
-def load_projects() -> list[dict]:
-    """Load projects from JSON file."""
-    return load_json_file(PROJECTS_FILE, [])
-
-def save_projects(projects: list[dict]) -> None:
-    """Save projects to JSON file."""
-    save_json_file(PROJECTS_FILE, projects)
-
-def load_tasks() -> list[dict]:
-    """Load tasks from JSON file."""
-    return load_json_file(TASKS_FILE, [])
-
-def save_tasks(tasks: list[dict]) -> None:
-    """Save tasks to JSON file."""
-    save_json_file(TASKS_FILE, tasks)
-
-# --- State Definition ---
-class AppState(TypedDict):
-    user_input: str
-    intent: str
-    tasks: list[dict]
-    ideas: list[dict]
-    projects: list[dict]
-    response: str
-
-# --- LLM Setup ---
-def build_llm() -> ChatOpenAI:
-    """Configure OpenRouter-backed model from environment variables."""
-    base_url = os.environ.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
-    api_key = os.environ.get("OPENROUTER_API_KEY")
-    model = os.environ.get("OPENROUTER_MODEL", "anthropic/claude-3.5-sonnet-20241022")
-
-    if not api_key:
-        raise RuntimeError(
-            "OPENROUTER_API_KEY is not set. Add it to your environment or .env.local."
-        )
-
-    headers = {}
-    referer = os.environ.get("OPENROUTER_REFERRER")
-    if referer:
-        headers["HTTP-Referer"] = referer
-    app_id = os.environ.get("OPENROUTER_APP_ID")
-    if app_id:
-        headers["X-Title"] = app_id
-
-    return ChatOpenAI(
-        model=model,
-        api_key=api_key,
-        base_url=base_url,
-        temperature=0,
-        default_headers=headers or None,
-    )
-
-
-llm = build_llm()
-
-# --- Node Functions ---
-def parse_intent(state: AppState) -> dict:
-    """Use lightweight keyword guardrails first, then LLM as fallback."""
-    # Load all data from files at the start of each request
-    tasks = load_tasks()
-    ideas = load_ideas()
-    projects = load_projects()
-
-    print(f"[DEBUG] Loaded {len(tasks)} tasks, {len(ideas)} ideas, {len(projects)} projects")
-
-    user_text = state["user_input"].strip().lower()
-    print(f"[DEBUG] Raw input: {repr(state['user_input'])}")
-    print(f"[DEBUG] Processed input: {repr(user_text)}")
-
-    # Fast heuristics for common patterns
-    if not user_text:
-        print("[DEBUG] Empty input → help")
-        return {"intent": "help", "tasks": tasks, "ideas": ideas, "projects": projects}
-
-    if "help" in user_text:
-        print("[DEBUG] Keyword 'help' found → help")
-        return {"intent": "help", "tasks": tasks, "ideas": ideas, "projects": projects}
-
-    # Ideas
-    if "idea" in user_text and any(kw in user_text for kw in ["add", "create", "new"]):
-        print("[DEBUG] Add idea keyword found → add_idea")
-        return {"intent": "add_idea", "tasks": tasks, "ideas": ideas, "projects": projects}
-
-    # Projects
-    if "project" in user_text and any(kw in user_text for kw in ["add", "create", "new"]):
-        print("[DEBUG] Add project keyword found → add_project")
-        return {"intent": "add_project", "tasks": tasks, "ideas": ideas, "projects": projects}
-
-    # Tasks
-    if any(kw in user_text for kw in ["list", "show"]):
-        print("[DEBUG] List keyword found → list_all")
-        return {"intent": "list_all", "tasks": tasks, "ideas": ideas, "projects": projects}
-
-    if any(kw in user_text for kw in ["complete", "done", "finish", "check off"]):
-        print("[DEBUG] Complete keyword found → complete_task")
-        return {"intent": "complete_task", "tasks": tasks, "ideas": ideas, "projects": projects}
-
-    if any(kw in user_text for kw in ["delete", "remove", "rm", "trash"]):
-        print("[DEBUG] Delete keyword found → delete_task")
-        return {"intent": "delete_task", "tasks": tasks, "ideas": ideas, "projects": projects}
-
-    if any(kw in user_text for kw in ["add", "create", "new task", "todo"]):
-        print("[DEBUG] Add keyword found → add_task")
-        return {"intent": "add_task", "tasks": tasks, "ideas": ideas, "projects": projects}
-
-    # Fallback to LLM classification for ambiguous phrasing
-    print("[DEBUG] No keywords matched, using LLM fallback")
-    messages = [
-        SystemMessage(content="""You are an intent classifier for a productivity app with Ideas, Inbox, and Projects.
-Classify the user's intent into exactly one of these categories:
-- add_idea: User wants to add/create a new idea
-- add_project: User wants to create a new project
-- add_task: User wants to add/create a new task
-- list_all: User wants to see their items (tasks, ideas, or projects)
-- complete_task: User wants to mark a task as done
-- delete_task: User wants to remove a task
-- help: User needs help or is confused
-
-Respond with ONLY the category name, nothing else."""),
-        HumanMessage(content=state["user_input"])
-    ]
-
-    result = llm.invoke(messages)
-    intent = result.content.strip().lower()
-
-    valid_intents = ["add_idea", "add_project", "add_task", "list_all", "complete_task", "delete_task", "help"]
-    if intent not in valid_intents:
-        intent = "help"
-
-    print(f"[DEBUG] Determined intent: {intent}")
-    return {"intent": intent, "tasks": tasks, "ideas": ideas, "projects": projects}
-
-def add_idea(state: AppState) -> dict:
-    """Extract idea from input and add it"""
-    messages = [
-        SystemMessage(content="""Extract the idea description from the user's message.
-Return ONLY the idea text, nothing else. Keep it concise."""),
-        HumanMessage(content=state["user_input"])
-    ]
-
-    result = llm.invoke(messages)
-    idea_text = result.content.strip()
+# Upper bound on operations per /tasks/batch request
+BATCH_MAX_OPERATIONS = int(os.environ.get("BATCH_MAX_OPERATIONS", "1000"))
 
-    ideas = state.get("ideas", [])
-    new_idea = Idea(text=idea_text).model_dump()
-    ideas.append(new_idea)
+class TaskOperation(BaseModel):
+    op: Literal["create", "update", "move", "complete", "delete"]
+    id: Optional[str] = None         # target task; every op but create
+    task: Optional[dict] = None      # create/update: the task body, validated per item
+    projectId: Optional[str] = None  # move: target project, None = inbox
 
-    save_ideas(ideas)
-    print(f"[DEBUG] Saved {len(ideas)} ideas to file")
+class TaskBatch(BaseModel):
+    operations: list[TaskOperation] = Field(..., min_length=1, max_length=BATCH_MAX_OPERATIONS)
+    atomic: bool = False                          # all-or-nothing: any failure rolls back the batch
+    output: Literal["full", "summary"] = "full"   # summary: counts plus failed items only
 
-    return {
-        "ideas": ideas,
-        "tasks": state.get("tasks", []),
-        "projects": state.get("projects", []),
-        "response": f"💡 Added idea: {idea_text}"
-    }
+# --- File Storage Functions ---
+store = build_store({
+    "ideas": IDEAS_FILE,
+    "projects": PROJECTS_FILE,
+    "tasks": TASKS_FILE,
+})
 
-def add_project(state: AppState) -> dict:
-    """Extract project name from input and create it"""
-    messages = [
-        SystemMessage(content="""Extract the project name from the user's message.
-Return ONLY the project name, nothing else. Keep it concise."""),
-        HumanMessage(content=state["user_input"])
-    ]
+# Full-text index kept current by a store listener; field weights favour titles
+search_index = SearchIndex({
+    "tasks": {"text": 1.0},
+    "ideas": {"text": 1.0, "description": 0.5, "tags": 0.75},
+    "projects": {"name": 1.0},
+})
 
-    result = llm.invoke(messages)
-    project_name = result.content.strip()
+# Structures derived from the store: built at startup, then kept current by their listeners
+derived_indexes = []
 
-    projects = state.get("projects", [])
-    new_project = Project(name=project_name).model_dump()
-    projects.append(new_project)
+def register_index(index) -> None:
+    """Keep ``index`` (anything with build(store)/listener(store)) in sync with the store."""
+    store.add_listener(index.listener(store))
+    derived_indexes.append(index)
 
-    save_projects(projects)
-    print(f"[DEBUG] Saved {len(projects)} projects to file")
+register_index(search_index)
 
-    return {
-        "projects": projects,
-        "tasks": state.get("tasks", []),
-        "ideas": state.get("ideas", []),
-        "response": f"📁 Created project: {project_name}"
-    }
+# Task counts per project/inbox by status, priority and due date, for /stats and list_all
+task_stats = TaskStats()
+register_index(task_stats)
 
-def add_task(state: AppState) -> dict:
-    """Extract task from input and add it to inbox"""
-    messages = [
-        SystemMessage(content="""Extract the task description from the user's message.
-Return ONLY the task text, nothing else. Keep it concise."""),
-        HumanMessage(content=state["user_input"])
-    ]
+# Cold tier for old completed tasks, outside the store
+task_archive = TaskArchive(ARCHIVE_FILE)
 
-    result = llm.invoke(messages)
-    task_text = result.content.strip()
+# Version counter + bounded log of recent mutations for delta sync
+change_log = ChangeLog(capacity=int(os.environ.get("CHANGELOG_CAPACITY", "10000")))
+store.add_listener(change_log.listener)
 
-    tasks = state.get("tasks", [])
-    new_task = Task(text=task_text).model_dump()
-    tasks.append(new_task)
+# Push channel for /events; registered after change_log so events carry its version
+event_broker = EventBroker(change_log, queue_size=int(os.environ.get("EVENTS_QUEUE_SIZE", "256")))
+store.add_listener(event_broker.listener)
 
-    save_tasks(tasks)
-    print(f"[DEBUG] Saved {len(tasks)} tasks to file")
+def load_ideas() -> list[dict]:
+    """Load ideas from the resident store."""
+    return store.all("ideas")
 
-    return {
-        "tasks": tasks,
-        "ideas": state.get("ideas", []),
-        "projects": state.get("projects", []),
-        "response": f"✅ Added task to inbox: {task_text}"
-    }
+def save_ideas(ideas: list[dict]) -> None:
+    """Replace all ideas in the resident store."""
+    store.replace_all("ideas", ideas)
 
-def list_all(state: AppState) -> dict:
-    """List all ideas, inbox tasks, and projects"""
-    ideas = state.get("ideas", [])
-    tasks = state.get("tasks", [])
-    projects = state.get("projects", [])
-
-    lines = []
-
-    # Ideas
-    if ideas:
-        lines.append("💡 Ideas:")
-        for idea in ideas[:5]:  # Show first 5
-            lines.append(f"  • {idea['text']}")
-        if len(ideas) > 5:
-            lines.append(f"  ... and {len(ideas) - 5} more")
-    else:
-        lines.append("💡 No ideas yet")
-
-    lines.append("")
-
-    # Inbox tasks
-    inbox_tasks = [t for t in tasks if not t.get("projectId")]
-    if inbox_tasks:
-        lines.append("📥 Inbox:")
-        for task in inbox_tasks[:5]:
-            status = "✓" if task["status"] == "completed" else "○"
-            lines.append(f"  {status} {task['text']}")
-        if len(inbox_tasks) > 5:
-            lines.append(f"  ... and {len(inbox_tasks) - 5} more")
-    else:
-        lines.append("📥 Inbox is empty")
-
-    lines.append("")
-
-    # Projects
-    if projects:
-        lines.append("📁 Projects:")
-        for project in projects[:5]:
-            project_tasks = [t for t in tasks if t.get("projectId") == project["id"]]
-            lines.append(f"  • {project['name']} ({len(project_tasks)} tasks)")
-        if len(projects) > 5:
-            lines.append(f"  ... and {len(projects) - 5} more")
-    else:
-        lines.append("📁 No projects yet")
+def load_projects() -> list[dict]:
+    """Load projects from the resident store."""
+    return store.all("projects")
 
-    return {
-        "response": "\n".join(lines),
-        "tasks": tasks,
-        "ideas": ideas,
-        "projects": projects
-    }
+def save_projects(projects: list[dict]) -> None:
+    """Replace all projects in the resident store."""
+    store.replace_all("projects", projects)
 
-def complete_task(state: AppState) -> dict:
-    """Mark a task as complete by ID"""
-    messages = [
-        SystemMessage(content="""Extract the task ID (UUID format) from the user's message.
-Return ONLY the ID, nothing else. If you see a number instead of UUID, return that number."""),
-        HumanMessage(content=state["user_input"])
-    ]
+def load_tasks() -> list[dict]:
+    """Load tasks from the resident store."""
+    return store.all("tasks")
 
-    result = llm.invoke(messages)
-    task_id = result.content.strip()
+def save_tasks(tasks: list[dict]) -> None:
+    """Replace all tasks in the resident store."""
+    store.replace_all("tasks", tasks)
 
-    tasks = state.get("tasks", [])
+# --- FastAPI App ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the resident store on startup and flush it on shutdown."""
+    store.start()
+    for index in derived_indexes:
+        index.build(store)
+    archiver = asyncio.create_task(archive_periodically()) if ARCHIVE_AFTER_DAYS > 0 else None
+    yield
+    if archiver is not None:
+        archiver.cancel()
+    await job_manager.shutdown()
+    for hook in shutdown_hooks:
+        await hook()
+    task_archive.close()
+    store.close()
+
+async def archive_periodically() -> None:
+    """Archive tasks past ARCHIVE_AFTER_DAYS at startup and every ARCHIVE_INTERVAL_SECONDS."""
+    while True:
+        try:
+            await asyncio.to_thread(task_archive.archive, store, ARCHIVE_AFTER_DAYS)
+        except Exception as e:
+            log.error("archive run failed", error=str(e))
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+# Coroutines run on shutdown, e.g. closing the LLM's HTTP connection pool
+shutdown_hooks = []
 
-    for task in tasks:
-        if task["id"] == task_id or str(task.get("id")) == task_id:
-            task["status"] = "completed"
-            task["completedAt"] = datetime.utcnow().isoformat() + "Z"
+app = FastAPI(
+    title="Productivity Manager API",
+    description="A comprehensive productivity manager with Ideas, Inbox, and Projects powered by LangGraph and AI",
+    version="2.0",
+    lifespan=lifespan,
+)
 
-            save_tasks(tasks)
-            print(f"[DEBUG] Saved {len(tasks)} tasks to file")
+# CORS Middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # In production, specify exact origins
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "ETag"],
+)
 
-            return {
-                "tasks": tasks,
-                "ideas": state.get("ideas", []),
-                "projects": state.get("projects", []),
-                "response": f"✅ Completed task: {task['text']}"
-            }
+# --- Request Metrics ---
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_seconds", "Time until the response starts, by route template", ("method", "route", "status"))
 
-    return {
-        "response": f"❌ Task not found",
-        "tasks": tasks,
-        "ideas": state.get("ideas", []),
-        "projects": state.get("projects", [])
-    }
+class RequestMetricsMiddleware:
+    """Times every HTTP request into http_request_seconds.
 
-def delete_task(state: AppState) -> dict:
-    """Delete a task by ID"""
-    messages = [
-        SystemMessage(content="""Extract the task ID from the user's message.
-Return ONLY the ID, nothing else."""),
-        HumanMessage(content=state["user_input"])
-    ]
+    A plain ASGI middleware rather than @app.middleware("http"), which adds
+    a task hop per request and buffers streaming responses such as /events.
+    """
 
-    result = llm.invoke(messages)
-    task_id = result.content.strip()
+    def __init__(self, app):
+        self.app = app
 
-    tasks = state.get("tasks", [])
-    original_len = len(tasks)
-    tasks = [t for t in tasks if t["id"] != task_id and str(t.get("id")) != task_id]
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
 
-    if len(tasks) < original_len:
-        save_tasks(tasks)
-        print(f"[DEBUG] Saved {len(tasks)} tasks to file")
+        started = time.perf_counter()
+        observed = False
 
-        return {
-            "tasks": tasks,
-            "ideas": state.get("ideas", []),
-            "projects": state.get("projects", []),
-            "response": f"🗑️ Deleted task"
-        }
+        def observe(status: int) -> None:
+            nonlocal observed
+            observed = True
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"], route=getattr(route, "path", "unmatched"), status=status,
+            )
 
-    return {
-        "response": f"❌ Task not found",
-        "tasks": tasks,
-        "ideas": state.get("ideas", []),
-        "projects": state.get("projects", [])
-    }
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                observe(message["status"])
+            await send(message)
 
-def show_help(state: AppState) -> dict:
-    """Show help message"""
-    return {
-        "response": """🤖 Productivity Manager Help:
-
-Ideas:
-  • "add idea [text]" - Brainstorm a new idea
-
-Inbox (Quick Tasks):
-  • "add [task]" - Add task to inbox
-  • "complete [id]" - Mark task as done
-  • "delete [id]" - Remove task
-
-Projects:
-  • "create project [name]" - Create a new project
-  • "add to [project] [task]" - Add task to project (via web UI)
-
-General:
-  • "list" or "show" - See all items
-  • "help" - Show this message
-
-Examples:
-  • "add idea mobile app for tasks"
-  • "create project Work"
-  • "add buy groceries"
-  • "list"
-""",
-        "tasks": state.get("tasks", []),
-        "ideas": state.get("ideas", []),
-        "projects": state.get("projects", [])
-    }
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            if not observed:
+                observe(500)
 
-# --- Router ---
-def route_intent(state: AppState) -> Literal["add_idea", "add_project", "add_task", "list_all", "complete_task", "delete_task", "help"]:
-    """Route to the appropriate node based on intent"""
-    return state["intent"]
-
-# --- Build the Graph ---
-graph = StateGraph(AppState)
-
-# Add nodes
-graph.add_node("parse_intent", parse_intent)
-graph.add_node("add_idea", add_idea)
-graph.add_node("add_project", add_project)
-graph.add_node("add_task", add_task)
-graph.add_node("list_all", list_all)
-graph.add_node("complete_task", complete_task)
-graph.add_node("delete_task", delete_task)
-graph.add_node("help", show_help)
-
-# Set entry point
-graph.set_entry_point("parse_intent")
-
-# Add conditional routing
-graph.add_conditional_edges(
-    "parse_intent",
-    route_intent,
-    {
-        "add_idea": "add_idea",
-        "add_project": "add_project",
-        "add_task": "add_task",
-        "list_all": "list_all",
-        "complete_task": "complete_task",
-        "delete_task": "delete_task",
-        "help": "help"
-    }
-)
+app.add_middleware(RequestMetricsMiddleware)
 
-# All action nodes go to END
-graph.add_edge("add_idea", END)
-graph.add_edge("add_project", END)
-graph.add_edge("add_task", END)
-graph.add_edge("list_all", END)
-graph.add_edge("complete_task", END)
-graph.add_edge("delete_task", END)
-graph.add_edge("help", END)
-
-# Compile
-app_graph = graph.compile()
-
-# --- Input/Output schemas for LangServe ---
-class NLInput(BaseModel):
-    user_input: str
-
-class NLOutput(BaseModel):
-    response: str
-    tasks: list[dict]
-    ideas: list[dict]
-    projects: list[dict]
-    intent: str
+# --- Query Helpers ---
+SortOrder = Literal["asc", "desc"]
+PageLimit = Query(None, ge=1, le=500, description="Page size; omit to return every match")
 
-# --- FastAPI App ---
-app = FastAPI(
-    title="Productivity Manager API",
-    description="A comprehensive productivity manager with Ideas, Inbox, and Projects powered by LangGraph and AI",
-    version="2.0"
-)
+def cursor_scope(*query) -> str:
+    """Fingerprint of everything that defines a result order (collection, filters, sort, order)."""
+    return hashlib.sha256(json.dumps(query, sort_keys=True, default=str).encode()).hexdigest()[:16]
 
-# CORS Middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def encode_cursor(key: list, scope: str) -> str:
+    """Encode a sort key as an opaque pagination cursor, bound to the query that produced it."""
+    return base64.urlsafe_b64encode(json.dumps({"key": key, "scope": scope}).encode()).decode()
 
-# Add the LangGraph app as a route for natural language processing
-add_routes(
-    app,
-    app_graph,
-    path="/nl",
-    input_type=NLInput,
-    output_type=NLOutput,
-)
+def decode_cursor(cursor: str, scope: str) -> list:
+    """Decode a pagination cursor, rejecting anything malformed or issued for a different query."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    key = payload.get("key") if isinstance(payload, dict) else None
+    if not isinstance(key, list) or len(key) != 3:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get("scope") != scope:
+        raise HTTPException(status_code=400, detail="Cursor does not match this query's filters, sort and order")
+    return key
+
+async def query_page(kind: str, response: Response, where: dict, ranges: dict, search: Optional[str],
+               search_fields: tuple, sort: Optional[str], order: Optional[SortOrder],
+               cursor: Optional[str], limit: Optional[int]) -> list[dict]:
+    """Run a filtered, sorted, paginated query against the store.
+
+    With no parameters at all the whole collection comes back in insertion
+    order, as before. The total match count and the cursor for the next
+    page are returned in the X-Total-Count and X-Next-Cursor headers so the
+    body stays a plain list.
+    """
+    if not (where or ranges or search or sort or order or cursor or limit):
+        records = await store.aall(kind)
+        response.headers["X-Total-Count"] = str(len(records))
+        return records
+
+    sort, descending = sort or "createdAt", order == "desc"
+    scope = cursor_scope(kind, where, ranges, search, sort, descending)
+    after = decode_cursor(cursor, scope) if cursor else None
+    # The key's shape is [present, value, id]; anything else would fail mid-comparison.
+    if after is not None and not (isinstance(after[0], bool) and isinstance(after[2], str)
+                                  and isinstance(after[1], (str, int, float)) and not isinstance(after[1], bool)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    page, total, next_key = await store.aquery(
+        kind,
+        where=where,
+        ranges=ranges,
+        search=search,
+        search_fields=search_fields,
+        sort=sort,
+        descending=descending,
+        after=after,
+        limit=limit,
+    )
+    response.headers["X-Total-Count"] = str(total)
+    if next_key is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(next_key, scope)
+    return page
 
 # --- REST API Endpoints ---
 
 # Health check
 @app.get("/")
-def root():
+async def root():
     return {
         "status": "running",
         "version": "2.0",
+        "mode": "rest-only" if REST_ONLY else "full",
         "endpoints": {
-            "nl_playground": "http://localhost:8000/nl/playground",
+            **({} if REST_ONLY else {"nl_playground": "http://localhost:8000/nl/playground"}),
             "api_docs": "http://localhost:8000/docs",
             "ideas": "http://localhost:8000/ideas",
             "projects": "http://localhost:8000/projects",
-            "tasks": "http://localhost:8000/tasks"
+            "tasks": "http://localhost:8000/tasks",
+            "search": "http://localhost:8000/search?q=",
+            "events": "http://localhost:8000/events"
         }
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition of the process's metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+async def sync_point() -> tuple[str, int]:
+    """The (epoch, version) a client holds for /changes.
+
+    With a shared store the other workers' writes never pass through this
+    process's change log, so every worker names the state by the shared
+    files instead: the epoch is the store's revalidation token and the
+    version stays 0. A client then hears "unchanged" or "resync", never a
+    delta.
+    """
+    shared = await store.arevalidate()
+    if shared is not None:
+        return shared, 0
+    return change_log.epoch, change_log.version
+
 # Get all data
 @app.get("/data")
-def get_all_data():
-    """Get all ideas, projects, and tasks"""
+async def get_all_data(request: Request, response: Response):
+    """Get all ideas, projects, and tasks
+
+    The ETag tracks the change version, so a poll with a matching
+    If-None-Match is answered with 304 without copying the store. The
+    returned version/epoch seed GET /changes.
+    """
+    # Read the version first: anything changed while we copy is re-sent by /changes.
+    epoch, version = await sync_point()
+    etag = f'W/"{epoch}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
     return {
-        "ideas": load_ideas(),
-        "projects": load_projects(),
-        "tasks": load_tasks()
+        "ideas": await store.aall("ideas"),
+        "projects": await store.aall("projects"),
+        "tasks": await store.aall("tasks"),
+        "version": version,
+        "epoch": epoch,
     }
 
+# Delta sync
+@app.get("/changes")
+async def get_changes(since: int = Query(..., ge=0), epoch: Optional[str] = None):
+    """Get records created, updated or deleted after a change version
+
+    If the version is too old for the change log, or the epoch belongs to
+    an earlier server process, the response has resync=true and the client
+    should reload /data. With a shared store, any change since the epoch
+    is a resync.
+    """
+    current, version = await sync_point()
+    if store.shared:
+        resync = epoch != current or since != version
+        return {"epoch": current, "version": version, "resync": resync, "changes": []}
+
+    result = None if epoch and epoch != change_log.epoch else change_log.since(since)
+    if result is None:
+        return {"epoch": change_log.epoch, "version": change_log.version, "resync": True, "changes": []}
+
+    version, entries = result
+    return {"epoch": change_log.epoch, "version": version, "resync": False, "changes": entries}
+
+# Full-text search
+@app.get("/search")
+async def search_all(
+    q: str,
+    types: Optional[list[Literal["tasks", "ideas", "projects"]]] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    prefix: bool = True,
+):
+    """Ranked search over task text, idea text/description/tags and project names"""
+    await store.arevalidate()  # another worker's writes reach the index as a reset
+    hits = search_index.search(q, kinds=types, limit=limit, prefix=prefix)
+    records = await store.run(lambda: [store.get(kind, record_id) for kind, record_id, _ in hits])
+    return [
+        {"type": kind, "score": score, "record": record}
+        for (kind, _, score), record in zip(hits, records)
+        if record
+    ]
+
+# Change notifications
+SSE_KEEPALIVE_SECONDS = 15
+# How often /events checks a shared store's files for other workers' writes
+SHARED_POLL_SECONDS = float(os.environ.get("SHARED_POLL_SECONDS", "1"))
+
+def format_sse(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    """Serialize one Server-Sent Event."""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+@app.get("/events")
+async def stream_events():
+    """Stream change events (type, op, record) as Server-Sent Events
+
+    The first event ("ready") carries the current epoch and version. A
+    client that falls too far behind receives a single "resync" event and
+    should catch up through /changes or /data. With a shared store every
+    change, from whichever worker, is announced as a "resync" carrying the
+    new epoch.
+    """
+    async def event_stream():
+        async with event_broker.subscribe() as subscription:
+            if store.shared:
+                async for chunk in shared_event_stream(subscription):
+                    yield chunk
+                return
+
+            yield format_sse("ready", {"epoch": change_log.epoch, "version": change_log.version})
+            while True:
+                event = await subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+                if event is None:
+                    yield ": keepalive\n\n"
+                elif event["event"] == "resync":
+                    yield format_sse("resync", {"epoch": change_log.epoch, "version": change_log.version})
+                else:
+                    payload = {key: value for key, value in event.items() if key != "event"}
+                    yield format_sse("change", payload, event_id=event["version"])
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def shared_event_stream(subscription):
+    """/events for a shared store: poll the files, since other workers' writes raise no events here."""
+    epoch, version = await sync_point()
+    yield format_sse("ready", {"epoch": epoch, "version": version})
+    idle = 0.0
+    while True:
+        event = await subscription.get(timeout=SHARED_POLL_SECONDS)
+        current, version = await sync_point()
+        if current != epoch:
+            epoch, idle = current, 0.0
+            yield format_sse("resync", {"epoch": epoch, "version": version})
+        elif event is None:
+            idle += SHARED_POLL_SECONDS
+            if idle >= SSE_KEEPALIVE_SECONDS:
+                idle = 0.0
+                yield ": keepalive\n\n"
+
+@app.get("/stats")
+async def get_stats():
+    """Task counts for the inbox, every project and overall (pending, completed, overdue, ...)"""
+    await store.arevalidate()
+    projects = await store.aall("projects")
+    return task_stats.snapshot(project["id"] for project in projects)
+
 # --- Ideas Endpoints ---
 @app.get("/ideas")
-def get_ideas():
-    """Get all ideas"""
-    return load_ideas()
+async def get_ideas(
+    response: Response,
+    q: Optional[str] = None,
+    sort: Optional[Literal["createdAt", "text"]] = None,
+    order: Optional[SortOrder] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = PageLimit,
+):
+    """Get ideas, optionally filtered by text, sorted and paginated"""
+    return await query_page("ideas", response, {}, {}, q, ("text", "description", "tags"), sort, order, cursor, limit)
 
 @app.post("/ideas")
-def create_idea(idea: Idea):
+async def create_idea(idea: Idea):
     """Create a new idea"""
-    ideas = load_ideas()
-    idea_dict = idea.model_dump()
-    ideas.append(idea_dict)
-    save_ideas(ideas)
-    return idea_dict
+    return await store.ainsert("ideas", idea.model_dump())
 
 @app.put("/ideas/{idea_id}")
-def update_idea(idea_id: str, updated_idea: Idea):
+async def update_idea(idea_id: str, updated_idea: Idea):
     """Update an existing idea"""
-    ideas = load_ideas()
-    for i, idea in enumerate(ideas):
-        if idea["id"] == idea_id:
-            updated_dict = updated_idea.model_dump()
-            updated_dict["id"] = idea_id  # Preserve original ID
-            ideas[i] = updated_dict
-            save_ideas(ideas)
-            return updated_dict
+    updated_dict = await store.areplace("ideas", idea_id, updated_idea.model_dump())  # Preserves original ID
+    if updated_dict:
+        return updated_dict
     raise HTTPException(status_code=404, detail="Idea not found")
 
 @app.delete("/ideas/{idea_id}")
-def delete_idea(idea_id: str):
+async def delete_idea(idea_id: str):
     """Delete an idea"""
-    ideas = load_ideas()
-    original_len = len(ideas)
-    ideas = [i for i in ideas if i["id"] != idea_id]
-    if len(ideas) < original_len:
-        save_ideas(ideas)
+    if await store.adelete("ideas", idea_id):
         return {"message": "Idea deleted"}
     raise HTTPException(status_code=404, detail="Idea not found")
 
+def convert_idea(idea_id: str) -> Optional[dict]:
+    """Replace an idea with a task in one commit, so a crash never leaves both or neither."""
+    with store.batch():
+        idea = store.get("ideas", idea_id)
+        if not idea:
+            return None
+        new_task = store.insert("tasks", Task(text=idea["text"]).model_dump())
+        store.delete("ideas", idea_id)
+    return new_task
+
 @app.post("/ideas/{idea_id}/to-task")
-def convert_idea_to_task(idea_id: str):
+async def convert_idea_to_task(idea_id: str):
     """Convert an idea to a task"""
-    ideas = load_ideas()
-    tasks = load_tasks()
-
-    idea = next((i for i in ideas if i["id"] == idea_id), None)
-    if not idea:
+    new_task = await store.run(convert_idea, idea_id)
+    if not new_task:
         raise HTTPException(status_code=404, detail="Idea not found")
-
-    new_task = Task(text=idea["text"]).model_dump()
-    tasks.append(new_task)
-    save_tasks(tasks)
-
-    # Optionally remove the idea
-    ideas = [i for i in ideas if i["id"] != idea_id]
-    save_ideas(ideas)
-
     return new_task
 
 # --- Projects Endpoints ---
 @app.get("/projects")
-def get_projects():
-    """Get all projects"""
-    return load_projects()
+async def get_projects(
+    response: Response,
+    archived: Optional[bool] = None,
+    q: Optional[str] = None,
+    sort: Optional[Literal["createdAt", "name"]] = None,
+    order: Optional[SortOrder] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = PageLimit,
+):
+    """Get projects, optionally filtered, sorted and paginated"""
+    where = {} if archived is None else {"archived": archived}
+    return await query_page("projects", response, where, {}, q, ("name", "description"), sort, order, cursor, limit)
 
 @app.post("/projects")
-def create_project(project: Project):
+async def create_project(project: Project):
     """Create a new project"""
-    projects = load_projects()
-    project_dict = project.model_dump()
-    projects.append(project_dict)
-    save_projects(projects)
-    return project_dict
+    return await store.ainsert("projects", project.model_dump())
 
 @app.put("/projects/{project_id}")
-def update_project(project_id: str, updated_project: Project):
+async def update_project(project_id: str, updated_project: Project):
     """Update an existing project"""
-    projects = load_projects()
-    for i, project in enumerate(projects):
-        if project["id"] == project_id:
-            updated_dict = updated_project.model_dump()
-            updated_dict["id"] = project_id  # Preserve original ID
-            projects[i] = updated_dict
-            save_projects(projects)
-            return updated_dict
+    updated_dict = await store.areplace("projects", project_id, updated_project.model_dump())  # Preserves original ID
+    if updated_dict:
+        return updated_dict
     raise HTTPException(status_code=404, detail="Project not found")
 
+def remove_project(project_id: str) -> Optional[dict]:
+    """Move a project's tasks to the inbox and delete it, all in one commit."""
+    with store.batch():
+        project = store.get("projects", project_id)
+        if not project:
+            return None
+        for task in store.find("tasks", projectId=project_id):
+            store.update("tasks", task["id"], {"projectId": None}, op="move")
+        store.delete("projects", project_id)
+    return project
+
 @app.delete("/projects/{project_id}")
-def delete_project(project_id: str):
+async def delete_project(project_id: str):
     """Delete/archive a project"""
-    projects = load_projects()
-    tasks = load_tasks()
-
-    # Check if project exists
-    project = next((p for p in projects if p["id"] == project_id), None)
-    if not project:
+    if not await store.run(remove_project, project_id):
         raise HTTPException(status_code=404, detail="Project not found")
-
-    # Remove projectId from all tasks in this project (move to inbox)
-    for task in tasks:
-        if task.get("projectId") == project_id:
-            task["projectId"] = None
-    save_tasks(tasks)
-
-    # Remove project
-    projects = [p for p in projects if p["id"] != project_id]
-    save_projects(projects)
-
     return {"message": "Project deleted, tasks moved to inbox"}
 
 @app.get("/projects/{project_id}/tasks")
-def get_project_tasks(project_id: str):
+async def get_project_tasks(project_id: str):
     """Get all tasks for a specific project"""
-    tasks = load_tasks()
-    project_tasks = [t for t in tasks if t.get("projectId") == project_id]
-    return project_tasks
+    return await store.afind("tasks", projectId=project_id)
 
 # --- Tasks Endpoints ---
 @app.get("/tasks")
-def get_tasks():
-    """Get all tasks"""
-    return load_tasks()
+async def get_tasks(
+    response: Response,
+    status: Optional[Literal["pending", "completed"]] = None,
+    priority: Optional[Literal["low", "medium", "high"]] = None,
+    projectId: Optional[str] = Query(None, description='Project id, or "inbox" for tasks without a project'),
+    dueAfter: Optional[str] = None,
+    dueBefore: Optional[str] = None,
+    q: Optional[str] = None,
+    sort: Optional[Literal["createdAt", "dueDate", "priority", "completedAt", "text"]] = None,
+    order: Optional[SortOrder] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = PageLimit,
+):
+    """Get tasks, optionally filtered, sorted and paginated"""
+    where = {}
+    if status:
+        where["status"] = status
+    if priority:
+        where["priority"] = priority
+    if projectId:
+        where["projectId"] = None if projectId == "inbox" else projectId
+    ranges = {"dueDate": (dueAfter, dueBefore)} if dueAfter or dueBefore else {}
+    return await query_page("tasks", response, where, ranges, q, ("text",), sort, order, cursor, limit)
 
 @app.get("/tasks/inbox")
-def get_inbox_tasks():
+async def get_inbox_tasks():
     """Get inbox tasks (tasks without projectId)"""
-    tasks = load_tasks()
-    inbox = [t for t in tasks if not t.get("projectId")]
-    return inbox
+    return await store.afind("tasks", projectId=None)
 
 @app.post("/tasks")
-def create_task(task: Task):
+async def create_task(task: Task):
     """Create a new task"""
-    tasks = load_tasks()
-    task_dict = task.model_dump()
-    tasks.append(task_dict)
-    save_tasks(tasks)
-    return task_dict
+    return await store.ainsert("tasks", task.model_dump())
 
 @app.put("/tasks/{task_id}")
-def update_task(task_id: str, updated_task: Task):
+async def update_task(task_id: str, updated_task: Task):
     """Update an existing task"""
-    tasks = load_tasks()
-    for i, task in enumerate(tasks):
-        if task["id"] == task_id:
-            updated_dict = updated_task.model_dump()
-            updated_dict["id"] = task_id  # Preserve original ID
-            tasks[i] = updated_dict
-            save_tasks(tasks)
-            return updated_dict
+    updated_dict = await store.areplace("tasks", task_id, updated_task.model_dump())  # Preserves original ID
+    if updated_dict:
+        return updated_dict
     raise HTTPException(status_code=404, detail="Task not found")
 
 @app.put("/tasks/{task_id}/move")
-def move_task_to_project(task_id: str, project_id: Optional[str] = None):
+async def move_task_to_project(task_id: str, project_id: Optional[str] = None):
     """Move a task to a project (or back to inbox if project_id is None)"""
-    tasks = load_tasks()
-    for task in tasks:
-        if task["id"] == task_id:
-            task["projectId"] = project_id
-            save_tasks(tasks)
-            return task
+    # The web UI sends an empty project_id for "back to inbox"
+    task = await store.aupdate("tasks", task_id, {"projectId": project_id or None}, op="move")
+    if task:
+        return task
     raise HTTPException(status_code=404, detail="Task not found")
 
 @app.put("/tasks/{task_id}/complete")
-def mark_task_complete(task_id: str):
+async def mark_task_complete(task_id: str):
     """Mark a task as complete"""
-    tasks = load_tasks()
-    for task in tasks:
-        if task["id"] == task_id:
-            task["status"] = "completed"
-            task["completedAt"] = datetime.utcnow().isoformat() + "Z"
-            save_tasks(tasks)
-            return task
+    task = await store.aupdate("tasks", task_id, {
+        "status": "completed",
+        "completedAt": datetime.utcnow().isoformat() + "Z",
+    }, op="complete")
+    if task:
+        return task
     raise HTTPException(status_code=404, detail="Task not found")
 
 @app.delete("/tasks/{task_id}")
-def delete_task_endpoint(task_id: str):
+async def delete_task_endpoint(task_id: str):
     """Delete a task"""
-    tasks = load_tasks()
-    original_len = len(tasks)
-    tasks = [t for t in tasks if t["id"] != task_id]
-    if len(tasks) < original_len:
-        save_tasks(tasks)
+    if await store.adelete("tasks", task_id):
         return {"message": "Task deleted"}
     raise HTTPException(status_code=404, detail="Task not found")
 
-# --- AI Suggestion Endpoints ---
-class SuggestProjectRequest(BaseModel):
-    taskText: str
-    taskId: Optional[str] = None
-
-@app.post("/ai/suggest-project", response_model=Suggestion)
-def suggest_project(request: SuggestProjectRequest):
-    """Use AI to suggest which project a task should belong to"""
-    projects = load_projects()
-
-    if not projects:
-        return Suggestion(
-            taskId=request.taskId or "unknown",
-            suggestedProjectId=None,
-            confidence=0.0,
-            reasoning="No projects available. Task will stay in inbox."
-        )
-
-    projects_info = "\n".join([f"- {p['name']}: {p.get('description', 'No description')}" for p in projects])
-
-    messages = [
-        SystemMessage(content=f"""You are helping categorize a task into one of the user's projects.
-
-Available projects:
-{projects_info}
-
-Analyze the task and suggest which project it belongs to. Consider the task description and project names/descriptions.
-
-Respond with ONLY a JSON object in this exact format:
-{{
-  "projectId": "the-project-id-or-null",
-  "projectName": "the project name",
-  "confidence": 0.85,
-  "reasoning": "Brief explanation of why this project fits"
-}}
-
-If no project is a good match, set projectId to null and confidence to 0."""),
-        HumanMessage(content=f"Task: {request.taskText}")
-    ]
-
-    result = llm.invoke(messages)
+class BatchRejected(Exception):
+    """Raised inside an atomic batch to roll back every operation."""
+
+def apply_task_operation(operation: TaskOperation) -> dict:
+    """Apply one batch operation through the store; raises HTTPException on bad input."""
+    if operation.op == "create":
+        task = Task(**(operation.task or {})).model_dump()
+        # A client-chosen id must be new; overwriting is what "update" is for.
+        if store.get("tasks", task["id"]) is not None:
+            raise HTTPException(status_code=409, detail="A task with this id already exists")
+        return store.insert("tasks", task)
+
+    if not operation.id:
+        raise HTTPException(status_code=400, detail=f"'{operation.op}' needs an id")
+    if operation.op == "update":
+        task = store.replace("tasks", operation.id, Task(**(operation.task or {})).model_dump())
+    elif operation.op == "move":
+        task = store.update("tasks", operation.id, {"projectId": operation.projectId or None}, op="move")
+    elif operation.op == "complete":
+        task = store.update("tasks", operation.id, {
+            "status": "completed",
+            "completedAt": datetime.utcnow().isoformat() + "Z",
+        }, op="complete")
+    else:
+        task = store.delete("tasks", operation.id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+def apply_task_batch(batch: TaskBatch) -> tuple[list[dict], bool]:
+    """Run every operation inside one store batch, so the whole request persists once.
+
+    Operations apply in order and later ones see earlier results (create
+    then move works). Returns (per-item results, committed).
+    """
+    results = []
     try:
-        response_data = json.loads(result.content.strip())
-        project_id = response_data.get("projectId")
-
-        if project_id and project_id != "null":
-            # Verify project exists
-            if not any(p["id"] == project_id or p["name"] == response_data.get("projectName") for p in projects):
-                # Find by name
-                matching_project = next((p for p in projects if p["name"] == response_data.get("projectName")), None)
-                if matching_project:
-                    project_id = matching_project["id"]
-                else:
-                    project_id = None
+        with store.batch():
+            for index, operation in enumerate(batch.operations):
+                try:
+                    results.append({"index": index, "ok": True, "task": apply_task_operation(operation)})
+                except HTTPException as e:
+                    results.append({"index": index, "ok": False, "status": e.status_code, "error": e.detail})
+                except ValidationError as e:
+                    detail = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+                    results.append({"index": index, "ok": False, "status": 422, "error": detail})
+            if batch.atomic and not all(result["ok"] for result in results):
+                raise BatchRejected()
+    except BatchRejected:
+        return results, False
+    return results, True
+
+@app.post("/tasks/batch")
+async def batch_tasks(batch: TaskBatch):
+    """Create, update, move, complete or delete many tasks with a single commit"""
+    results, committed = await store.run(apply_task_batch, batch)
+    failed = [result for result in results if not result["ok"]]
+    if not committed:
+        raise HTTPException(status_code=409, detail={
+            "message": "Batch rolled back; no operation was applied",
+            "failed": failed,
+        })
+    return {
+        "applied": len(results) - len(failed),
+        "failed": len(failed),
+        "results": results if batch.output == "full" else failed,
+    }
 
-        return Suggestion(
-            taskId=request.taskId or "unknown",
-            suggestedProjectId=project_id,
-            confidence=float(response_data.get("confidence", 0.5)),
-            reasoning=response_data.get("reasoning", "AI suggestion")
-        )
-    except (json.JSONDecodeError, KeyError) as e:
-        print(f"[ERROR] Failed to parse AI response: {e}")
-        return Suggestion(
-            taskId=request.taskId or "unknown",
-            suggestedProjectId=None,
-            confidence=0.0,
-            reasoning="Failed to analyze task"
+# --- Archive ---
+@app.get("/tasks/archive")
+async def get_archived_tasks(
+    response: Response,
+    projectId: Optional[str] = Query(None, description='Project id, or "inbox" for tasks without a project'),
+    q: Optional[str] = None,
+    completedAfter: Optional[str] = None,
+    completedBefore: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = PageLimit,
+):
+    """Get archived tasks in the order they were archived, filtered and paginated"""
+    project_id = UNSET if projectId is None else (None if projectId == "inbox" else projectId)
+    scope = cursor_scope("archive", projectId, q, completedAfter, completedBefore)
+    after = decode_cursor(cursor, scope)[0] if cursor else None
+    if after is not None and (not isinstance(after, int) or isinstance(after, bool)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    try:
+        page, total, next_after = await asyncio.to_thread(
+            task_archive.query,
+            store,
+            project_id=project_id,
+            search=q,
+            completed_after=completedAfter,
+            completed_before=completedBefore,
+            after=after,
+            limit=limit,
         )
+    except ArchiveDamaged as e:
+        log.error("archive unreadable", error=str(e))
+        raise HTTPException(status_code=500, detail="Archive is damaged")
+    # Counting matches for q or date filters would take a scan of the whole archive
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    if next_after is not None:
+        last = page[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor([next_after, last["archivedAt"], last["id"]], scope)
+    return page
+
+@app.post("/tasks/archive")
+async def archive_tasks(olderThanDays: Optional[float] = Query(None, ge=0, description="Defaults to ARCHIVE_AFTER_DAYS")):
+    """Move tasks completed more than olderThanDays ago into the archive"""
+    if olderThanDays is None and not ARCHIVE_AFTER_DAYS:
+        raise HTTPException(status_code=400, detail="olderThanDays is required when ARCHIVE_AFTER_DAYS is not set")
+    days = ARCHIVE_AFTER_DAYS if olderThanDays is None else olderThanDays
+    return {"archived": await asyncio.to_thread(task_archive.archive, store, days)}
+
+@app.post("/tasks/{task_id}/unarchive")
+async def unarchive_task(task_id: str):
+    """Move an archived task back into the task list"""
+    task = await asyncio.to_thread(task_archive.unarchive, store, task_id)
+    if task:
+        return task
+    raise HTTPException(status_code=404, detail="Archived task not found")
+
+# --- Background Jobs ---
+job_manager = JobManager(
+    max_workers=int(os.environ.get("JOBS_MAX_WORKERS", "2")),
+    ttl_seconds=float(os.environ.get("JOBS_TTL_SECONDS", "3600")),
+)
 
-@app.post("/ai/categorize-inbox")
-def categorize_inbox():
-    """Analyze all inbox tasks and suggest project categorization"""
-    tasks = load_tasks()
-    projects = load_projects()
-    inbox_tasks = [t for t in tasks if not t.get("projectId")]
-
-    if not inbox_tasks:
-        return {"message": "Inbox is empty", "suggestions": []}
-
-    if not projects:
-        return {"message": "No projects available. Create projects first.", "suggestions": []}
-
-    suggestions = []
-    for task in inbox_tasks:
-        suggestion = suggest_project(SuggestProjectRequest(taskText=task["text"], taskId=task["id"]))
-        suggestions.append(suggestion.model_dump())
+def get_job_or_404(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, after: int = Query(0, ge=0, description="Skip results already received")):
+    """Poll a job's status, new per-item results and final result"""
+    return get_job_or_404(job_id).to_dict(after=after)
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job(job_id: str, after: int = Query(0, ge=0)):
+    """Stream a job's per-item results as Server-Sent Events, ending with "done" """
+    job = get_job_or_404(job_id)
+
+    async def event_stream():
+        sent = after
+        while True:
+            finished = job.done
+            for item in job.results[sent:]:
+                sent += 1
+                yield format_sse("result", item, event_id=sent)
+            if finished:
+                yield format_sse("done", job.to_dict(after=sent))
+                return
+            await job.wait_for_change(timeout=SSE_KEEPALIVE_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    return {"suggestions": suggestions}
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = get_job_or_404(job_id)
+    if job_manager.cancel(job_id) and not job.done:
+        await job.wait_for_change(timeout=5)
+    return job.to_dict()
+
+# Natural-language and AI routes (/nl, /ai/*, /jobs/categorize-inbox)
+if not REST_ONLY:
+    import assistant  # noqa: E402,F401
 
 if __name__ == "__main__":
     import uvicorn
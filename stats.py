@@ -0,0 +1,128 @@
+"""Task aggregates maintained incrementally from store mutations.
+
+Tasks are bucketed by project (the inbox is the None bucket). Each bucket
+keeps counters by status, by priority of its pending tasks, by due date of
+its pending tasks and by completion date. A store listener subtracts a
+task's old image and adds the new one, so every write costs O(1) and
+reading the counts for a project never touches its tasks.
+
+Overdue and completed-today depend on the date of the read rather than on
+any write, so they are answered from the date counters at read time: a
+task is overdue when it is pending with a due date before today (local
+calendar), and completed today when its UTC ``completedAt`` falls on the
+current UTC date, matching how the timestamp is stored.
+"""
+from collections import Counter
+from datetime import date, datetime
+from typing import Iterable, Optional
+import threading
+
+PRIORITIES = ("high", "medium", "low", "none")
+
+
+class _Bucket:
+    __slots__ = ("status", "priority", "due", "completed_on")
+
+    def __init__(self):
+        self.status: Counter = Counter()        # status -> tasks
+        self.priority: Counter = Counter()      # priority ("none" if unset) -> pending tasks
+        self.due: Counter = Counter()           # YYYY-MM-DD -> pending tasks due that day
+        self.completed_on: Counter = Counter()  # YYYY-MM-DD (UTC) -> tasks completed that day
+
+    def empty(self) -> bool:
+        return not +self.status
+
+
+class TaskStats:
+    """Per-project and inbox task counters kept current by a store listener."""
+
+    def __init__(self):
+        self._buckets: dict[Optional[str], _Bucket] = {}
+        self._lock = threading.Lock()
+
+    # --- Maintenance ---
+    def build(self, store) -> None:
+        """Count every task from scratch."""
+        with self._lock:
+            self._buckets.clear()
+            for task in store.all("tasks"):
+                self._apply(task, 1)
+
+    def listener(self, store):
+        """Return a store listener that keeps the counters current."""
+        def on_change(kind: str, op: str, before: Optional[dict], after: Optional[dict]) -> None:
+            if kind != "tasks":
+                return
+            if op == "reset":
+                self.build(store)
+                return
+            with self._lock:
+                if before is not None:
+                    self._apply(before, -1)
+                if after is not None:
+                    self._apply(after, 1)
+        return on_change
+
+    def _apply(self, task: dict, sign: int) -> None:
+        project_id = task.get("projectId") or None
+        bucket = self._buckets.get(project_id)
+        if bucket is None:
+            bucket = self._buckets[project_id] = _Bucket()
+
+        status = task.get("status") or "pending"
+        _bump(bucket.status, status, sign)
+        if status == "pending":
+            _bump(bucket.priority, task.get("priority") or "none", sign)
+            if task.get("dueDate"):
+                _bump(bucket.due, task["dueDate"][:10], sign)
+        elif task.get("completedAt"):
+            _bump(bucket.completed_on, task["completedAt"][:10], sign)
+
+        if bucket.empty():
+            del self._buckets[project_id]
+
+    # --- Reads ---
+    def counts(self, project_id: Optional[str], today: Optional[str] = None, utc_today: Optional[str] = None) -> dict:
+        """Counters for one project, or the inbox when ``project_id`` is None."""
+        with self._lock:
+            return self._counts(self._buckets.get(project_id), *_dates(today, utc_today))
+
+    def snapshot(self, project_ids: Iterable[str], today: Optional[str] = None, utc_today: Optional[str] = None) -> dict:
+        """Counters for the inbox, each of ``project_ids`` and all tasks together."""
+        today, utc_today = _dates(today, utc_today)
+        with self._lock:
+            totals = _Bucket()
+            for bucket in self._buckets.values():
+                for field in _Bucket.__slots__:
+                    getattr(totals, field).update(getattr(bucket, field))
+            return {
+                "totals": self._counts(totals, today, utc_today),
+                "inbox": self._counts(self._buckets.get(None), today, utc_today),
+                "projects": {
+                    project_id: self._counts(self._buckets.get(project_id), today, utc_today)
+                    for project_id in project_ids
+                },
+            }
+
+    @staticmethod
+    def _counts(bucket: Optional[_Bucket], today: str, utc_today: str) -> dict:
+        bucket = bucket or _Bucket()
+        pending, completed = bucket.status["pending"], bucket.status["completed"]
+        return {
+            "total": pending + completed,
+            "pending": pending,
+            "completed": completed,
+            "pendingByPriority": {priority: bucket.priority[priority] for priority in PRIORITIES},
+            "overdue": sum(count for due, count in bucket.due.items() if due < today),
+            "completedToday": bucket.completed_on[utc_today],
+        }
+
+
+def _bump(counter: Counter, key: str, sign: int) -> None:
+    counter[key] += sign
+    if counter[key] <= 0:
+        del counter[key]
+
+
+def _dates(today: Optional[str], utc_today: Optional[str]) -> tuple[str, str]:
+    return today or date.today().isoformat(), utc_today or datetime.utcnow().date().isoformat()
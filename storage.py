@@ -0,0 +1,1595 @@
+"""Storage backends for ideas, projects and tasks.
+
+``Store`` is the interface the server talks to. Four implementations exist:
+
+- ``JsonStore``: collections parsed from their JSON files once and served
+  from memory. Mutations mark the collection dirty and a background flusher
+  writes dirty collections back to disk, either after ``flush_interval``
+  seconds or as soon as ``flush_max_changes`` mutations have piled up.
+  ``close()`` always performs a final flush.
+- ``JournalStore``: the same resident collections, persisted as an
+  append-only journal with background snapshot compaction.
+- ``SharedJsonStore``: the JSON files shared by several worker processes,
+  with write-through under a cross-process file lock and a read cache that
+  is revalidated against each file's inode, size and mtime.
+- ``SqliteStore``: one SQLite table per collection with indexed columns, so
+  filters are index lookups and writes touch single rows.
+
+``Store.batch()`` groups many writes into one commit: a single file
+rewrite, journal line or SQLite transaction, rolled back as a whole if the
+block fails. Commits touching several collection files go through a
+``CommitIntent`` record, so they persist all-or-nothing across files too.
+
+JSON files are always written to a temp file and renamed into place, so a
+reader never sees a half-written collection.
+
+Run ``python storage.py migrate`` to import the JSON files into SQLite.
+"""
+from contextlib import contextmanager, suppress
+from typing import Optional
+import argparse
+import asyncio
+import atexit
+import hashlib
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so no SharedJsonStore
+    fcntl = None
+
+from telemetry import BYTE_BUCKETS, REGISTRY, get_logger
+
+log = get_logger("storage")
+
+STORE_LOAD_SECONDS = REGISTRY.histogram(
+    "store_load_seconds", "Time to load a collection into memory, including journal replay", ("kind",))
+STORE_SAVE_SECONDS = REGISTRY.histogram(
+    "store_save_seconds", "Time to write a collection snapshot file", ("kind",))
+STORE_SAVE_BYTES = REGISTRY.histogram(
+    "store_save_bytes", "Size of each collection snapshot written", ("kind",), buckets=BYTE_BUCKETS)
+STORE_WRITTEN_BYTES = REGISTRY.counter(
+    "store_written_bytes_total", "Bytes written by the store", ("kind", "target"))
+STORE_TRANSACTION_SECONDS = REGISTRY.histogram(
+    "store_transaction_seconds", "Duration of SQLite write transactions, from BEGIN to COMMIT", ("mode",))
+STORE_LOCK_WAIT_SECONDS = REGISTRY.histogram(
+    "store_lock_wait_seconds", "Time spent waiting for a collection's cross-process file lock", ("kind",))
+STORE_RELOADS = REGISTRY.counter(
+    "store_reloads_total", "Collections re-read because another process replaced the file", ("kind",))
+
+
+# --- File Helpers ---
+def _read_json(f, filepath: str):
+    """Parse an open JSON file; None if it is empty, and an error (not a default) if it is damaged."""
+    text = f.read()
+    if not text.strip():
+        return None
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        log.error("unreadable file", path=filepath, error=str(e))
+        raise
+
+
+def load_json_file(filepath: str, default=None):
+    """Generic JSON file loader.
+
+    A missing or empty file yields ``default``. A file that does not parse
+    raises instead, so it is never mistaken for an empty collection and then
+    overwritten by the next save.
+    """
+    if default is None:
+        default = []
+
+    try:
+        with open(filepath, 'r') as f:
+            data = _read_json(f, filepath)
+    except FileNotFoundError:
+        return default
+    return data if data else default
+
+def _write_temp(filepath: str, data, fsync: bool = False) -> tuple[str, int]:
+    """Write JSON to a temp file beside ``filepath``; returns (temp path, bytes written)."""
+    # Unique per writer thread, so concurrent writers never share a temp file.
+    tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+            return tmp_path, f.tell()
+    except BaseException:
+        with suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+def _fsync_dirs(paths) -> None:
+    """fsync the directories holding ``paths``, so renames into them are durable."""
+    for directory in {os.path.dirname(os.path.abspath(path)) for path in paths}:
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def write_json_file(filepath: str, data, fsync: bool = False) -> int:
+    """Write JSON to a temp file beside ``filepath`` and rename it into place.
+
+    Readers see the old file or the new one, never a mix. With ``fsync`` the
+    data reaches the disk before the rename and the rename before this
+    returns. Returns the bytes written and raises OSError on failure,
+    leaving the old file as it was.
+    """
+    tmp_path, written = _write_temp(filepath, data, fsync)
+    try:
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(tmp_path)
+        raise
+    if fsync:
+        _fsync_dirs([filepath])
+    return written
+
+def write_json_files(files: dict[str, object], intent: "CommitIntent", fsync: bool = False) -> dict[str, int]:
+    """Replace several JSON files as one commit (path -> data in, path -> bytes out).
+
+    Every file is staged to a temp file first, then a single intent record
+    listing the renames commits them. If anything fails before the intent
+    is written, no file changes; after it, ``intent.recover()`` finishes
+    the renames on the next start. With ``fsync`` the staged files, the
+    intent and the renames all reach the disk before the intent is removed.
+    """
+    staged = {}
+    try:
+        for path, data in files.items():
+            staged[path] = _write_temp(path, data, fsync)
+        intent.write([{"rename": tmp_path, "to": path} for path, (tmp_path, _) in staged.items()], fsync)
+    except BaseException:
+        for tmp_path, _ in staged.values():
+            with suppress(OSError):
+                os.remove(tmp_path)
+        raise
+
+    for path, (tmp_path, _) in staged.items():
+        os.replace(tmp_path, path)
+    if fsync:
+        _fsync_dirs(staged)
+    intent.clear()
+    return {path: written for path, (_, written) in staged.items()}
+
+def save_json_file(filepath: str, data) -> Optional[int]:
+    """Generic JSON file saver. Returns the bytes written, or None if the save failed."""
+    try:
+        return write_json_file(filepath, data)
+    except OSError as e:
+        log.error("save failed", path=filepath, error=str(e))
+        return None
+
+def truncate_torn_tail(filepath: str) -> int:
+    """Cut an append-only line file back to its last newline; returns the bytes removed.
+
+    A crash mid-append leaves a partial final line. Appending after it would
+    glue the next entry onto the fragment, so it goes before the file is
+    reopened for appending.
+    """
+    try:
+        f = open(filepath, 'rb+')
+    except FileNotFoundError:
+        return 0
+    with f:
+        size = end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
+        return size - end
+
+def file_signature(filepath: str) -> Optional[tuple[int, int, int]]:
+    """(inode, size, mtime_ns) of a file, or None if it does not exist.
+
+    Atomic saves give every version a new inode, so an equal signature
+    means the file has not been replaced since it was last read.
+    """
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class FileLock:
+    """Exclusive cross-process advisory lock (flock) on ``<path>.lock``.
+
+    The lock sits on a sidecar file because the data file is replaced on
+    every save, and a lock on a renamed-away inode guards nothing. flock
+    only excludes other processes; threads are serialized by the caller.
+    """
+
+    def __init__(self, path: str):
+        self.path = path + ".lock"
+        self._file = None
+
+    def acquire(self) -> None:
+        if self._file is None:
+            self._file = open(self.path, 'a')
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+
+    def release(self) -> None:
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class CommitIntent:
+    """Write-ahead record that makes a commit spanning several files all-or-nothing.
+
+    A commit is staged (snapshots in temp files, journal lines prepared),
+    then described as a list of idempotent actions in one small intent file,
+    which is the commit point. The actions are applied and the intent
+    removed. If the process dies in between, ``recover()`` replays the
+    intent before the files are next read; with no intent on disk nothing
+    of the commit was applied. Only the latest commit can be pending, since
+    each one holds the store's lock until its intent is removed.
+
+    Actions are ``{"rename": tmp, "to": path}`` (skipped once the temp file
+    is gone) and ``{"append": journal, "line": line}`` (skipped if the
+    journal already ends with that line).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, actions: list[dict], fsync: bool = False) -> None:
+        written = write_json_file(self.path, actions, fsync)
+        STORE_WRITTEN_BYTES.inc(written, kind="*", target="intent")
+
+    def clear(self) -> None:
+        with suppress(FileNotFoundError):
+            os.remove(self.path)
+
+    def pending(self) -> bool:
+        return os.path.exists(self.path)
+
+    def recover(self) -> int:
+        """Finish a commit interrupted after its intent was written; returns the actions replayed."""
+        actions = load_json_file(self.path, [])
+        if not actions:
+            self.clear()
+            return 0
+
+        log.warning("finishing interrupted commit", path=self.path, actions=len(actions))
+        for action in actions:
+            if "rename" in action:
+                if os.path.exists(action["rename"]):
+                    os.replace(action["rename"], action["to"])
+            else:
+                self._append_once(action["append"], action["line"])
+        _fsync_dirs(action["to"] for action in actions if "rename" in action)
+        self.clear()
+        return len(actions)
+
+    @staticmethod
+    def _append_once(path: str, line: str) -> None:
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        keep = data.rfind(b"\n") + 1  # drops a torn final line
+        encoded = line.encode()
+        if data[:keep].endswith(encoded):
+            return
+        with open(path, 'ab') as f:
+            f.truncate(keep)
+            f.write(encoded)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def default_intent_path(files: dict[str, str]) -> str:
+    """Intent file for a set of collection files: ``store.intent`` beside the first one."""
+    first = next(iter(files.values()))
+    return os.path.join(os.path.dirname(os.path.abspath(first)), "store.intent")
+
+
+def _matches(record: dict, criteria: dict) -> bool:
+    """Equality match where a None criterion also matches empty values."""
+    for field, value in criteria.items():
+        actual = record.get(field)
+        if value is None:
+            if actual:
+                return False
+        elif actual != value:
+            return False
+    return True
+
+def _in_ranges(record: dict, ranges: Optional[dict]) -> bool:
+    """Inclusive (low, high) bounds per field; records missing the field fail."""
+    for field, (low, high) in (ranges or {}).items():
+        value = record.get(field)
+        if value is None:
+            return False
+        if low is not None and value < low:
+            return False
+        if high is not None and value > high:
+            return False
+    return True
+
+def _contains(record: dict, fields, needle: Optional[str]) -> bool:
+    """Case-insensitive substring match over any of ``fields``."""
+    if not needle:
+        return True
+    needle = needle.lower()
+    return any(needle in str(record.get(field) or "").lower() for field in fields)
+
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+
+def sort_key(record: dict, field: str, descending: bool = False) -> list:
+    """Total order used for sorting and pagination cursors.
+
+    Records missing the field always sort last, and the id breaks ties so
+    every position in the order is unique. Priorities sort by rank rather
+    than alphabetically. The key is a plain list so it round-trips through
+    JSON as a cursor.
+    """
+    value = record.get(field)
+    if field == "priority":
+        value = PRIORITY_RANK.get(value)
+    present = value is not None
+    return [present if descending else not present, value if present else "", record["id"]]
+
+
+# --- Store Interface ---
+class Store:
+    """Interface shared by every storage backend.
+
+    Collections are addressed by kind ("ideas", "projects", "tasks") and
+    records by their ``id`` field. Returned records must not be mutated in
+    place; go through ``update``/``replace`` instead.
+
+    The ``a*`` methods are the event-loop-friendly variants: backends whose
+    calls can wait on disk (``blocking``) run them in a worker thread,
+    resident ones answer inline since a memory lookup is cheaper than the
+    thread hop.
+    """
+
+    # True when calls may wait on disk I/O and must stay off the event loop.
+    blocking = False
+    # True when other processes write the same files (see ``revalidate``).
+    shared = False
+
+    def __init__(self):
+        self._listeners = []
+        # Notifications held back until the current batch commits (None outside a batch).
+        self._deferred: Optional[list] = None
+
+    def add_listener(self, listener) -> None:
+        """Call ``listener(kind, op, before, after)`` after every mutation.
+
+        Listeners run synchronously on the writing thread in commit order,
+        so they must be quick. ``before``/``after`` are the record images
+        (None for creates/deletes respectively). A whole-collection
+        replacement is reported once as op "reset" with both images None.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, kind: str, op: str, before: Optional[dict], after: Optional[dict]) -> None:
+        if self._deferred is not None:
+            self._deferred.append((kind, op, before, after))
+            return
+        for listener in self._listeners:
+            try:
+                listener(kind, op, before, after)
+            except Exception as e:
+                log.error("listener failed", listener=repr(listener), kind=kind, op=op, error=str(e), exc_info=True)
+
+    def start(self) -> None:
+        """Open the backend and load whatever it keeps resident."""
+
+    def close(self) -> None:
+        """Persist anything pending and release resources."""
+
+    def flush(self) -> None:
+        """Persist pending changes now."""
+
+    def sync(self) -> None:
+        """Persist every change made so far before returning; raises OSError if that fails.
+
+        Backends that write each change before returning have nothing to do.
+        """
+
+    def revalidate(self) -> Optional[str]:
+        """Pick up writes other processes made to shared files.
+
+        Returns a token naming the state now held, the same in every process
+        that sees the same files, or None for a store that only this process
+        writes (its listeners have already seen every change).
+        """
+        return None
+
+    def all(self, kind: str) -> list[dict]:
+        """Return every record of a collection in insertion order."""
+        raise NotImplementedError
+
+    def get(self, kind: str, record_id: str) -> Optional[dict]:
+        """Return a single record by id, or None."""
+        raise NotImplementedError
+
+    def find(self, kind: str, **criteria) -> list[dict]:
+        """Return records whose fields equal every given criterion.
+
+        A None criterion matches missing or empty values, so
+        ``find("tasks", projectId=None)`` returns the inbox.
+        """
+        raise NotImplementedError
+
+    def ids_with_prefix(self, kind: str, prefix: str, limit: int = 2) -> list[str]:
+        """Return up to ``limit`` record ids starting with ``prefix``.
+
+        The default limit of 2 is enough to tell a unique short id from an
+        ambiguous one.
+        """
+        return [record["id"] for record in self.all(kind) if record["id"].startswith(prefix)][:limit]
+
+    def query(self, kind: str, where: Optional[dict] = None, ranges: Optional[dict] = None,
+              search: Optional[str] = None, search_fields=(), sort: str = "createdAt",
+              descending: bool = False, after: Optional[list] = None,
+              limit: Optional[int] = None) -> tuple[list[dict], int, Optional[list]]:
+        """Filter, sort and page a collection.
+
+        ``where`` takes ``find`` criteria, ``ranges`` maps fields to inclusive
+        (low, high) bounds and ``search`` is a substring matched against
+        ``search_fields``. ``after`` is the cursor returned by the previous
+        page. Returns (page, total matches, next cursor or None).
+        """
+        matched = [
+            record for record in self.find(kind, **(where or {}))
+            if _in_ranges(record, ranges) and _contains(record, search_fields, search)
+        ]
+        total = len(matched)
+
+        def key(record: dict) -> list:
+            return sort_key(record, sort, descending)
+
+        if after is not None:
+            matched = [record for record in matched if (key(record) < after if descending else key(record) > after)]
+        if limit is None:
+            return sorted(matched, key=key, reverse=descending), total, None
+
+        # A bounded heap keeps a page at O(n log limit) instead of a full sort.
+        select = heapq.nlargest if descending else heapq.nsmallest
+        page = select(limit, matched, key=key)
+        next_cursor = key(page[-1]) if len(matched) > limit else None
+        return page, total, next_cursor
+
+    def insert(self, kind: str, record: dict) -> dict:
+        """Add a new record (or overwrite one with the same id)."""
+        raise NotImplementedError
+
+    def update(self, kind: str, record_id: str, changes: dict, op: str = "update") -> Optional[dict]:
+        """Merge ``changes`` into a record. Returns the new record or None.
+
+        ``op`` labels the mutation (e.g. "move", "complete").
+        """
+        raise NotImplementedError
+
+    def replace(self, kind: str, record_id: str, record: dict) -> Optional[dict]:
+        """Replace a record wholesale, keeping its id. Returns None if missing."""
+        raise NotImplementedError
+
+    def delete(self, kind: str, record_id: str) -> Optional[dict]:
+        """Remove a record. Returns the removed record or None."""
+        raise NotImplementedError
+
+    def replace_all(self, kind: str, records: list[dict]) -> None:
+        """Replace the whole collection."""
+        raise NotImplementedError
+
+    def batch(self):
+        """Context manager grouping writes into one commit.
+
+        Writes made by this thread inside the block are persisted once when
+        it exits and listeners hear about them only then, in order. If the
+        block raises, every write in it is rolled back and no listener is
+        called. Other writers wait until the batch ends; nested batches join
+        the outermost one.
+
+        This is the unit of work for changes spanning collections (e.g.
+        turning an idea into a task): the commit covers every collection
+        touched, so a crash cannot persist one half without the other.
+        """
+        raise NotImplementedError
+
+    # --- Async access ---
+    async def run(self, fn, *args, **kwargs):
+        """Call ``fn`` (typically a sequence of store calls) off the loop if needed."""
+        if not self.blocking:
+            return fn(*args, **kwargs)
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    async def arevalidate(self) -> Optional[str]:
+        return await self.run(self.revalidate) if self.shared else None
+
+    async def aall(self, kind: str) -> list[dict]:
+        return await self.run(self.all, kind)
+
+    async def aget(self, kind: str, record_id: str) -> Optional[dict]:
+        return await self.run(self.get, kind, record_id)
+
+    async def afind(self, kind: str, **criteria) -> list[dict]:
+        return await self.run(self.find, kind, **criteria)
+
+    async def aquery(self, kind: str, **kwargs) -> tuple[list[dict], int, Optional[list]]:
+        return await self.run(self.query, kind, **kwargs)
+
+    async def ainsert(self, kind: str, record: dict) -> dict:
+        return await self.run(self.insert, kind, record)
+
+    async def aupdate(self, kind: str, record_id: str, changes: dict, op: str = "update") -> Optional[dict]:
+        return await self.run(self.update, kind, record_id, changes, op)
+
+    async def areplace(self, kind: str, record_id: str, record: dict) -> Optional[dict]:
+        return await self.run(self.replace, kind, record_id, record)
+
+    async def adelete(self, kind: str, record_id: str) -> Optional[dict]:
+        return await self.run(self.delete, kind, record_id)
+
+
+# --- Resident Store ---
+class JsonStore(Store):
+    """In-memory collections backed by JSON files with write-behind flushing.
+
+    Records are treated as immutable once stored: updates build a new dict
+    and swap it in, so callers can hand out the returned dicts (e.g. to a
+    response serializer) without holding the lock. Never mutate them in
+    place; go through ``update``/``replace`` instead.
+
+    Besides the id map, each collection keeps hash indexes on the fields in
+    ``INDEXED_FIELDS`` (value -> ids, empty values bucketed under None), so
+    ``find`` on an indexed field costs O(matches) rather than a full scan.
+    """
+
+    INDEXED_FIELDS = {
+        "tasks": ("projectId", "status"),
+    }
+
+    def __init__(self, files: dict[str, str], flush_interval: float = 1.0, flush_max_changes: int = 100):
+        super().__init__()
+        self.files = files
+        self.flush_interval = flush_interval
+        self.flush_max_changes = flush_max_changes
+        # Without the background flusher every write rewrites its file inline.
+        self.blocking = flush_interval <= 0
+
+        self._records: dict[str, dict[str, dict]] = {}
+        # kind -> field -> value -> ids (a dict used as an insertion-ordered set)
+        self._indexes: dict[str, dict[str, dict[object, dict[str, None]]]] = {}
+        self._dirty: dict[str, int] = {kind: 0 for kind in files}
+        self._intent = CommitIntent(default_intent_path(files))
+        # Prior images of records written in the current batch, for rollback.
+        self._undo: Optional[list[tuple[str, Optional[str], object]]] = None
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    # --- Lifecycle ---
+    def start(self) -> None:
+        """Finish any interrupted commit, load every collection and start the background flusher."""
+        self._recover()
+        for kind in self.files:
+            self._collection(kind)
+
+        if self.flush_interval > 0 and self._flusher is None:
+            self._stopped.clear()
+            self._flusher = threading.Thread(target=self._flush_loop, name="store-flusher", daemon=True)
+            self._flusher.start()
+            atexit.register(self.close)
+
+    def close(self) -> None:
+        """Stop the flusher and write out anything still pending."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    def flush(self) -> None:
+        """Write every dirty collection to its file."""
+        self._flush()
+
+    def sync(self) -> None:
+        failed = self._flush()
+        if failed:
+            raise OSError(f"could not save {', '.join(failed)}")
+
+    def _flush(self) -> list[str]:
+        """Write every dirty collection; returns the kinds that failed and stay dirty."""
+        with self._flush_lock:
+            with self._lock:
+                pending = {
+                    kind: list(self._records[kind].values())
+                    for kind, changes in self._dirty.items()
+                    if changes
+                }
+                for kind in pending:
+                    self._dirty[kind] = 0
+
+            if len(pending) > 1:
+                # Several collections changed (e.g. by one batch); replace their files together.
+                return [] if self._save_together(pending) else list(pending)
+            failed = []
+            for kind, records in pending.items():
+                started = time.perf_counter()
+                written = save_json_file(self.files[kind], records)
+                if written is None:
+                    # Keep it dirty so the next flush retries.
+                    with self._lock:
+                        self._dirty[kind] += 1
+                    failed.append(kind)
+                    continue
+                self._record_save(kind, started, written)
+            return failed
+
+    def _save_together(self, pending: dict[str, list[dict]]) -> bool:
+        started = time.perf_counter()
+        try:
+            written = write_json_files({self.files[kind]: records for kind, records in pending.items()}, self._intent, fsync=True)
+        except OSError as e:
+            log.error("save failed", kinds=",".join(pending), error=str(e))
+            with self._lock:
+                for kind in pending:
+                    self._dirty[kind] += 1
+            return False
+        for kind in pending:
+            self._record_save(kind, started, written[self.files[kind]])
+        return True
+
+    def _recover(self) -> None:
+        self._intent.recover()
+
+    @staticmethod
+    def _record_save(kind: str, started: float, written: int) -> None:
+        STORE_SAVE_SECONDS.observe(time.perf_counter() - started, kind=kind)
+        STORE_SAVE_BYTES.observe(written, kind=kind)
+        STORE_WRITTEN_BYTES.inc(written, kind=kind, target="snapshot")
+
+    def _flush_loop(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _collection(self, kind: str) -> dict[str, dict]:
+        records = self._records.get(kind)
+        if records is None:
+            with self._lock:
+                records = self._records.get(kind)
+                if records is None:
+                    with STORE_LOAD_SECONDS.time(kind=kind):
+                        records = self._load(kind)
+                    self._reindex(kind, records)
+                    self._records[kind] = records
+        return records
+
+    # --- Secondary Indexes ---
+    def _reindex(self, kind: str, records: dict[str, dict]) -> None:
+        self._indexes[kind] = {field: {} for field in self.INDEXED_FIELDS.get(kind, ())}
+        for record in records.values():
+            self._index(kind, record)
+
+    def _index(self, kind: str, record: dict) -> None:
+        for field, buckets in self._indexes[kind].items():
+            buckets.setdefault(record.get(field) or None, {})[record["id"]] = None
+
+    def _unindex(self, kind: str, record: dict) -> None:
+        for field, buckets in self._indexes[kind].items():
+            value = record.get(field) or None
+            bucket = buckets.get(value)
+            if bucket is not None:
+                bucket.pop(record["id"], None)
+                if not bucket:
+                    del buckets[value]
+
+    def _put(self, kind: str, record: dict) -> Optional[dict]:
+        records = self._collection(kind)
+        previous = records.get(record["id"])
+        if previous is not None:
+            self._unindex(kind, previous)
+        records[record["id"]] = record
+        self._index(kind, record)
+        return previous
+
+    def _load(self, kind: str) -> dict[str, dict]:
+        loaded = load_json_file(self.files[kind], [])
+        return {record["id"]: record for record in loaded}
+
+    def _log(self, kind: str, op: str, record_id: Optional[str], data=None) -> None:
+        """Record a mutation while the write lock is held."""
+        self._dirty[kind] += 1
+
+    def _schedule_flush(self) -> None:
+        # Called after the write lock is released so a synchronous flush
+        # never waits on _flush_lock while holding _lock. Inside a batch the
+        # flush waits for the batch to end.
+        if self._deferred is not None:
+            return
+        if self.flush_interval <= 0:
+            self.flush()
+        elif sum(self._dirty.values()) >= self.flush_max_changes:
+            self._wakeup.set()
+
+    # --- Reads ---
+    def all(self, kind: str) -> list[dict]:
+        with self._lock:
+            return list(self._collection(kind).values())
+
+    def get(self, kind: str, record_id: str) -> Optional[dict]:
+        return self._collection(kind).get(record_id)
+
+    def ids_with_prefix(self, kind: str, prefix: str, limit: int = 2) -> list[str]:
+        with self._lock:
+            matches = (record_id for record_id in self._collection(kind) if record_id.startswith(prefix))
+            return [record_id for _, record_id in zip(range(limit), matches)]
+
+    def find(self, kind: str, **criteria) -> list[dict]:
+        with self._lock:
+            records = self._collection(kind)
+            indexes = self._indexes[kind]
+            buckets = [
+                indexes[field].get(value or None, {})
+                for field, value in criteria.items()
+                if field in indexes
+            ]
+            if not buckets:
+                return [record for record in records.values() if _matches(record, criteria)]
+
+            # Walk the smallest matching bucket and check the rest directly.
+            candidates = (records[record_id] for record_id in min(buckets, key=len))
+            return [record for record in candidates if _matches(record, criteria)]
+
+    # --- Writes ---
+    @contextmanager
+    def _writing(self, kind: str):
+        """Hold the write lock around one mutation of ``kind``."""
+        with self._lock:
+            yield
+
+    def insert(self, kind: str, record: dict) -> dict:
+        record = dict(record)
+        with self._writing(kind):
+            self._save_undo(kind, record["id"])
+            previous = self._put(kind, record)
+            self._log(kind, "create", record["id"], record)
+            self._notify(kind, "create", previous, record)
+        self._schedule_flush()
+        return record
+
+    def update(self, kind: str, record_id: str, changes: dict, op: str = "update") -> Optional[dict]:
+        with self._writing(kind):
+            records = self._collection(kind)
+            current = records.get(record_id)
+            if current is None:
+                return None
+            updated = {**current, **changes, "id": record_id}
+            self._save_undo(kind, record_id)
+            self._put(kind, updated)
+            self._log(kind, op, record_id, changes)
+            self._notify(kind, op, current, updated)
+        self._schedule_flush()
+        return updated
+
+    def replace(self, kind: str, record_id: str, record: dict) -> Optional[dict]:
+        with self._writing(kind):
+            records = self._collection(kind)
+            if record_id not in records:
+                return None
+            replacement = {**record, "id": record_id}
+            self._save_undo(kind, record_id)
+            previous = self._put(kind, replacement)
+            self._log(kind, "replace", record_id, replacement)
+            self._notify(kind, "replace", previous, replacement)
+        self._schedule_flush()
+        return replacement
+
+    def delete(self, kind: str, record_id: str) -> Optional[dict]:
+        with self._writing(kind):
+            self._save_undo(kind, record_id)
+            removed = self._collection(kind).pop(record_id, None)
+            if removed is None:
+                return None
+            self._unindex(kind, removed)
+            self._log(kind, "delete", record_id)
+            self._notify(kind, "delete", removed, None)
+        self._schedule_flush()
+        return removed
+
+    def replace_all(self, kind: str, records: list[dict]) -> None:
+        with self._writing(kind):
+            self._save_undo(kind, None)
+            self._records[kind] = {record["id"]: dict(record) for record in records}
+            self._reindex(kind, self._records[kind])
+            self._log(kind, "reset", None, list(self._records[kind].values()))
+            self._notify(kind, "reset", None, None)
+        self._schedule_flush()
+
+    # --- Batches ---
+    @contextmanager
+    def batch(self):
+        with self._lock:
+            if self._deferred is not None:
+                yield
+                return
+
+            self._begin_batch()
+            self._deferred, self._undo = [], []
+            try:
+                yield
+                self._end_batch(commit=True)
+            except BaseException:
+                self._rollback()
+                self._end_batch(commit=False)
+                self._deferred = self._undo = None
+                raise
+
+            notifications, self._deferred, self._undo = self._deferred, None, None
+            for notification in notifications:
+                self._notify(*notification)
+        self._schedule_flush()
+
+    def _save_undo(self, kind: str, record_id: Optional[str]) -> None:
+        """Remember a record's current image (or the whole collection) before a batched write."""
+        if self._undo is None:
+            return
+        records = self._collection(kind)
+        self._undo.append((kind, record_id, dict(records) if record_id is None else records.get(record_id)))
+
+    def _rollback(self) -> None:
+        for kind, record_id, previous in reversed(self._undo):
+            if record_id is None:
+                self._records[kind] = previous
+                self._reindex(kind, previous)
+            elif previous is None:
+                removed = self._records[kind].pop(record_id, None)
+                if removed is not None:
+                    self._unindex(kind, removed)
+            else:
+                self._put(kind, previous)
+
+    def _begin_batch(self) -> None:
+        """Prepare for a batch; the lock is held and notifications are not yet deferred."""
+
+    def _end_batch(self, commit: bool) -> None:
+        """Persist (or drop) whatever the batch buffered; the lock is held."""
+
+
+class JournalStore(JsonStore):
+    """Resident store that appends each mutation to a per-collection journal.
+
+    Every create/update/delete costs one small line appended to
+    ``<file>.journal`` rather than a rewrite of the whole collection. On load
+    the journal is replayed on top of the JSON snapshot, and compaction
+    (run by the background flusher once ``flush_max_changes`` entries have
+    accumulated, or every ``flush_interval`` seconds) folds the journal into
+    a fresh snapshot.
+
+    Compaction rotates the live journal to ``<file>.journal.compacting``
+    before writing the snapshot, so mutations keep appending to a new
+    journal while the snapshot is written. Replay handles a leftover
+    ``.compacting`` file after a crash; every entry is idempotent.
+    """
+
+    def __init__(self, files: dict[str, str], flush_interval: float = 30.0, flush_max_changes: int = 1000, fsync: bool = False):
+        super().__init__(files, flush_interval=flush_interval, flush_max_changes=flush_max_changes)
+        self.fsync = fsync
+        self.blocking = self.blocking or fsync
+        self._journals: dict[str, object] = {}
+        # kind -> entries logged by the current batch, appended as one line on commit
+        self._batch_entries: dict[str, list[dict]] = {}
+
+    def _journal_path(self, kind: str) -> str:
+        return self.files[kind] + ".journal"
+
+    def _load(self, kind: str) -> dict[str, dict]:
+        records = super()._load(kind)
+        journal_path = self._journal_path(kind)
+        for path in (journal_path + ".compacting", journal_path):
+            torn = truncate_torn_tail(path)
+            if torn:
+                log.warning("journal torn tail removed", path=path, bytes=torn)
+            replayed = self._replay(path, records)
+            self._dirty[kind] += replayed
+        return records
+
+    @staticmethod
+    def _replay(path: str, records: dict[str, dict]) -> int:
+        if not os.path.exists(path):
+            return 0
+
+        replayed = 0
+        with open(path, 'r') as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn tails are cut off before replay, so this is a
+                    # damaged line; the entries after it still apply.
+                    log.error("journal line skipped", path=path, line=number)
+                    continue
+
+                JournalStore._apply(records, entry)
+                replayed += 1
+        return replayed
+
+    @staticmethod
+    def _apply(records: dict[str, dict], entry: dict) -> None:
+        op, record_id, data = entry["op"], entry.get("id"), entry.get("data")
+        if op == "batch":
+            # One line per committed batch, so a torn append drops the whole batch.
+            for batched in entry["entries"]:
+                JournalStore._apply(records, batched)
+        elif op == "delete":
+            records.pop(record_id, None)
+        elif op == "reset":
+            records.clear()
+            records.update((record["id"], record) for record in data)
+        elif op in ("create", "replace"):
+            records[record_id] = data
+        elif record_id in records:
+            records[record_id] = {**records[record_id], **data}
+
+    def _log(self, kind: str, op: str, record_id: Optional[str], data=None) -> None:
+        entry = {"op": op, "id": record_id}
+        if data is not None:
+            entry["data"] = data
+        if self._deferred is not None:
+            self._batch_entries.setdefault(kind, []).append(entry)
+            return
+        self._append(kind, entry)
+        self._dirty[kind] += 1
+
+    def _append(self, kind: str, entry: dict) -> None:
+        self._append_line(kind, json.dumps(entry) + "\n")
+
+    def _append_line(self, kind: str, line: str) -> None:
+        journal = self._journals.get(kind)
+        if journal is None:
+            journal = open(self._journal_path(kind), 'a')
+            self._journals[kind] = journal
+
+        journal.write(line)
+        journal.flush()
+        STORE_WRITTEN_BYTES.inc(len(line), kind=kind, target="journal")
+        if self.fsync:
+            os.fsync(journal.fileno())
+
+    def _end_batch(self, commit: bool) -> None:
+        entries, self._batch_entries = self._batch_entries, {}
+        if not commit:
+            return
+
+        if len(entries) == 1:
+            for kind, batched in entries.items():
+                self._append(kind, {"op": "batch", "entries": batched})
+                self._dirty[kind] += len(batched)
+            return
+
+        # One line per journal, committed together through the intent, so a
+        # crash between two appends cannot keep half the batch. The tx id
+        # keeps each line unique for recovery.
+        tx = uuid.uuid4().hex
+        lines = {kind: json.dumps({"op": "batch", "tx": tx, "entries": batched}) + "\n" for kind, batched in entries.items()}
+        self._intent.write([{"append": self._journal_path(kind), "line": line} for kind, line in lines.items()], self.fsync)
+        for kind, line in lines.items():
+            self._append_line(kind, line)
+            self._dirty[kind] += len(entries[kind])
+        self._intent.clear()
+
+    def _schedule_flush(self) -> None:
+        # The journal append already made the change durable; only compaction
+        # is deferred.
+        if sum(self._dirty.values()) < self.flush_max_changes:
+            return
+        if self._flusher is None:
+            self.flush()
+        else:
+            self._wakeup.set()
+
+    def sync(self) -> None:
+        """Every change is already in its journal; make sure the appends reached the disk."""
+        with self._lock:
+            for journal in self._journals.values():
+                os.fsync(journal.fileno())
+
+    def flush(self) -> None:
+        """Compact every collection with pending journal entries."""
+        with self._flush_lock:
+            with self._lock:
+                pending = {}
+                for kind, changes in self._dirty.items():
+                    if not changes:
+                        continue
+                    pending[kind] = list(self._records[kind].values())
+                    self._rotate_journal(kind)
+                    self._dirty[kind] = 0
+
+            for kind, records in pending.items():
+                snapshot_path = self.files[kind]
+                try:
+                    started = time.perf_counter()
+                    written = write_json_file(snapshot_path, records, fsync=True)
+                    self._record_save(kind, started, written)
+                    os.remove(self._journal_path(kind) + ".compacting")
+                except OSError as e:
+                    # The .compacting journal is still on disk, so nothing is
+                    # lost; retry on the next pass.
+                    log.error("compaction failed", path=snapshot_path, error=str(e))
+                    with self._lock:
+                        self._dirty[kind] += 1
+
+    def _rotate_journal(self, kind: str) -> None:
+        journal = self._journals.pop(kind, None)
+        if journal is not None:
+            journal.close()
+
+        journal_path = self._journal_path(kind)
+        compacting_path = journal_path + ".compacting"
+        if not os.path.exists(journal_path):
+            open(compacting_path, 'a').close()
+        elif os.path.exists(compacting_path):
+            # A previous compaction died before finishing; keep its entries.
+            with open(journal_path, 'r') as src, open(compacting_path, 'a') as dst:
+                dst.write(src.read())
+            os.remove(journal_path)
+        else:
+            os.replace(journal_path, compacting_path)
+
+    def close(self) -> None:
+        super().close()
+        with self._lock:
+            for journal in self._journals.values():
+                journal.close()
+            self._journals.clear()
+
+
+class SharedJsonStore(JsonStore):
+    """JSON files shared by several processes, e.g. ``uvicorn --workers N``.
+
+    Each process keeps the resident collections of ``JsonStore``, tagged
+    with the ``file_signature`` they were read from. Reads re-stat the file
+    and re-parse it only when another process has replaced it; the derived
+    indexes then see a "reset" and rebuild. Writes are write-through: take
+    the collection's ``FileLock``, pick up any newer file, apply the change,
+    save atomically and record the new signature before unlocking, so no
+    process ever overwrites an update it has not seen.
+
+    A batch locks every collection for its duration and replaces all the
+    files it changed as one ``CommitIntent`` commit. A process that dies
+    mid-commit leaves the intent behind; whichever process locks a
+    collection next finishes it first. Each write still rewrites a whole
+    file, so this suits modest collections and write rates; SQLite is the
+    better fit for heavy multi-worker load.
+
+    Listeners only hear about another process's writes as a "reset" when a
+    read notices the new file. ``revalidate`` checks every collection at
+    once and names the resulting state by the files' signatures, so all
+    workers agree on it.
+    """
+
+    shared = True
+    STALE = object()  # signature of a collection whose memory may differ from its file
+
+    def __init__(self, files: dict[str, str]):
+        if fcntl is None:
+            raise RuntimeError("SharedJsonStore needs fcntl.flock, which this platform lacks")
+        super().__init__(files, flush_interval=0)
+        self._signatures: dict[str, object] = {}
+        self._file_locks = {kind: FileLock(path) for kind, path in files.items()}
+        # Collections locked (and written) by the current batch
+        self._held: list[str] = []
+        self._batch_written: set[str] = set()
+
+    def close(self) -> None:
+        super().close()
+        with self._lock:
+            for lock in self._file_locks.values():
+                lock.close()
+
+    def flush(self) -> None:
+        """Nothing to do: every write reached its file before returning."""
+
+    def sync(self) -> None:
+        """Nothing to do: every write reached its file before returning."""
+
+    def _recover(self) -> None:
+        with self._lock:
+            self._begin_batch()  # locks every collection and finishes any pending commit
+            self._release_held()
+
+    def revalidate(self) -> str:
+        for kind in self.files:
+            self._collection(kind)
+        with self._lock:
+            signatures = [self._signatures.get(kind) for kind in self.files]
+        return hashlib.sha256(repr(signatures).encode()).hexdigest()[:12]
+
+    # --- Read cache ---
+    def _collection(self, kind: str) -> dict[str, dict]:
+        records = self._records.get(kind)
+        if records is not None and self._signatures.get(kind) == file_signature(self.files[kind]):
+            return records
+        with self._lock:
+            return self._refresh(kind)
+
+    def _refresh(self, kind: str) -> dict[str, dict]:
+        """Return ``kind``, re-reading its file if it changed since we last saw it; the lock is held."""
+        path = self.files[kind]
+        records = self._records.get(kind)
+        if records is not None and self._signatures.get(kind) == file_signature(path):
+            return records
+
+        with STORE_LOAD_SECONDS.time(kind=kind):
+            records, signature = self._read(path)
+        reloaded = kind in self._records
+        self._records[kind] = records
+        self._signatures[kind] = signature
+        self._reindex(kind, records)
+        self._dirty[kind] = 0
+        if reloaded:
+            STORE_RELOADS.inc(kind=kind)
+            log.debug("collection reloaded", kind=kind, records=len(records))
+            self._notify(kind, "reset", None, None)
+        return records
+
+    @staticmethod
+    def _read(path: str) -> tuple[dict[str, dict], Optional[tuple[int, int, int]]]:
+        try:
+            f = open(path, 'r')
+        except FileNotFoundError:
+            return {}, None
+        with f:
+            # Stat the open file, so the signature belongs to exactly what was parsed.
+            stat = os.fstat(f.fileno())
+            loaded = _read_json(f, path) or []
+        return {record["id"]: record for record in loaded}, (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    # --- Write-through ---
+    def _lock_file(self, kind: str) -> None:
+        with STORE_LOCK_WAIT_SECONDS.time(kind=kind):
+            self._file_locks[kind].acquire()
+
+    def _write(self, kind: str) -> None:
+        """Save ``kind`` if it changed; the lock and its file lock are held."""
+        if not self._dirty[kind]:
+            return
+
+        path = self.files[kind]
+        started = time.perf_counter()
+        try:
+            written = write_json_file(path, list(self._records[kind].values()))
+        except OSError as e:
+            log.error("save failed", path=path, error=str(e))
+            # Memory is now ahead of the file; the next read reloads the file.
+            self._signatures[kind] = self.STALE
+            raise
+        self._record_save(kind, started, written)
+        self._signatures[kind] = file_signature(path)
+        self._dirty[kind] = 0
+        if self._held:
+            self._batch_written.add(kind)
+
+    def _write_together(self, kinds: list[str]) -> None:
+        """Save several changed collections as one commit; the lock and their file locks are held."""
+        started = time.perf_counter()
+        try:
+            written = write_json_files({self.files[kind]: list(self._records[kind].values()) for kind in kinds}, self._intent, fsync=True)
+        except OSError as e:
+            log.error("save failed", kinds=",".join(kinds), error=str(e))
+            for kind in kinds:
+                self._signatures[kind] = self.STALE
+            raise
+        for kind in kinds:
+            self._record_save(kind, started, written[self.files[kind]])
+            self._signatures[kind] = file_signature(self.files[kind])
+            self._dirty[kind] = 0
+            self._batch_written.add(kind)
+
+    @contextmanager
+    def _writing(self, kind: str):
+        with self._lock:
+            if self._held:
+                # Inside a batch, which already holds every file lock.
+                yield
+                return
+
+            self._lock_file(kind)
+            while self._intent.pending():
+                # Another process died mid-commit; finish it under every lock first.
+                self._file_locks[kind].release()
+                self._recover()
+                self._lock_file(kind)
+            try:
+                self._refresh(kind)
+                yield
+                self._write(kind)
+            finally:
+                self._file_locks[kind].release()
+
+    def _begin_batch(self) -> None:
+        # Lock in a fixed order so two processes' batches cannot deadlock.
+        try:
+            for kind in self.files:
+                self._lock_file(kind)
+                self._held.append(kind)
+            self._intent.recover()
+            for kind in self.files:
+                self._refresh(kind)
+        except BaseException:
+            self._release_held()
+            raise
+
+    def _end_batch(self, commit: bool) -> None:
+        if commit:
+            # A failed save raises with the locks still held; the rollback
+            # path then calls us again with commit=False.
+            changed = [kind for kind in self._held if self._dirty[kind]]
+            if len(changed) > 1:
+                self._write_together(changed)
+            for kind in changed:
+                self._write(kind)
+        else:
+            for kind in self._held:
+                self._dirty[kind] = 0
+                if kind in self._batch_written:
+                    # Saved before a later collection failed; memory was rolled back.
+                    self._signatures[kind] = self.STALE
+        self._release_held()
+
+    def _release_held(self) -> None:
+        for kind in reversed(self._held):
+            self._file_locks[kind].release()
+        self._held.clear()
+        self._batch_written.clear()
+
+
+# --- SQLite Store ---
+class SqliteStore(Store):
+    """SQLite-backed store with one table per collection.
+
+    Each row keeps the full record as JSON in ``data`` alongside indexed
+    copies of the fields the server filters and sorts on. The database runs
+    in WAL mode so readers never block the writer, and every thread gets
+    its own connection.
+    """
+
+    INDEXED_COLUMNS = {
+        "ideas": ("createdAt",),
+        "projects": ("createdAt",),
+        "tasks": ("projectId", "status", "priority", "dueDate", "createdAt"),
+    }
+
+    blocking = True
+
+    def __init__(self, path: str, kinds=("ideas", "projects", "tasks")):
+        super().__init__()
+        self.path = path
+        self.kinds = tuple(kinds)
+        # Serializes this process's writes so listeners see commit order.
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn: sqlite3.Connection) -> None:
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            for kind in self.kinds:
+                columns = self.INDEXED_COLUMNS.get(kind, ())
+                column_defs = "".join(f", {column} TEXT" for column in columns)
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {kind} (id TEXT PRIMARY KEY{column_defs}, data TEXT NOT NULL)")
+                for column in columns:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{kind}_{column} ON {kind} ({column})")
+            self._schema_ready = True
+
+    def _row_values(self, kind: str, record: dict) -> tuple:
+        # Empty strings are stored as NULL so "no project" has one
+        # representation in the projectId index.
+        columns = self.INDEXED_COLUMNS.get(kind, ())
+        return (record["id"], *(record.get(column) or None for column in columns), json.dumps(record))
+
+    def _upsert_sql(self, kind: str) -> str:
+        columns = ("id", *self.INDEXED_COLUMNS.get(kind, ()), "data")
+        placeholders = ", ".join("?" for _ in columns)
+        assignments = ", ".join(f"{column} = excluded.{column}" for column in columns[1:])
+        return (
+            f"INSERT INTO {kind} ({', '.join(columns)}) VALUES ({placeholders}) "
+            f"ON CONFLICT(id) DO UPDATE SET {assignments}"
+        )
+
+    # --- Lifecycle ---
+    def start(self) -> None:
+        self._conn()
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # --- Reads ---
+    def all(self, kind: str) -> list[dict]:
+        rows = self._conn().execute(f"SELECT data FROM {kind} ORDER BY rowid")
+        return [json.loads(data) for (data,) in rows]
+
+    def get(self, kind: str, record_id: str) -> Optional[dict]:
+        row = self._conn().execute(f"SELECT data FROM {kind} WHERE id = ?", (record_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def ids_with_prefix(self, kind: str, prefix: str, limit: int = 2) -> list[str]:
+        # Range scan on the primary key instead of LIKE, which skips the index.
+        rows = self._conn().execute(
+            f"SELECT id FROM {kind} WHERE id >= ? AND id < ? ORDER BY id LIMIT ?",
+            (prefix, prefix + "\uffff", limit),
+        )
+        return [record_id for (record_id,) in rows]
+
+    def find(self, kind: str, **criteria) -> list[dict]:
+        indexed = self.INDEXED_COLUMNS.get(kind, ())
+        clauses, params, residual = [], [], {}
+        for field, value in criteria.items():
+            if field not in indexed and field != "id":
+                residual[field] = value
+            elif value is None:
+                clauses.append(f"{field} IS NULL")
+            else:
+                clauses.append(f"{field} = ?")
+                params.append(value)
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(f"SELECT data FROM {kind}{where} ORDER BY rowid", params)
+        records = (json.loads(data) for (data,) in rows)
+        return [record for record in records if _matches(record, residual)]
+
+    def _expr(self, kind: str, field: str) -> str:
+        if field == "id" or field in self.INDEXED_COLUMNS.get(kind, ()):
+            return field
+        if not field.isidentifier():
+            raise ValueError(f"Invalid field name: {field}")
+        return f"json_extract(data, '$.{field}')"
+
+    def query(self, kind: str, where: Optional[dict] = None, ranges: Optional[dict] = None,
+              search: Optional[str] = None, search_fields=(), sort: str = "createdAt",
+              descending: bool = False, after: Optional[list] = None,
+              limit: Optional[int] = None) -> tuple[list[dict], int, Optional[list]]:
+        clauses, params = [], []
+        for field, value in (where or {}).items():
+            expr = self._expr(kind, field)
+            if value is None:
+                clauses.append(f"({expr} IS NULL OR {expr} = '')")
+            else:
+                clauses.append(f"{expr} = ?")
+                params.append(value)
+        for field, (low, high) in (ranges or {}).items():
+            expr = self._expr(kind, field)
+            clauses.append(f"{expr} IS NOT NULL")
+            if low is not None:
+                clauses.append(f"{expr} >= ?")
+                params.append(low)
+            if high is not None:
+                clauses.append(f"{expr} <= ?")
+                params.append(high)
+        if search and search_fields:
+            pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            clauses.append("(" + " OR ".join(f"{self._expr(kind, field)} LIKE ? ESCAPE '\\'" for field in search_fields) + ")")
+            params.extend(pattern for _ in search_fields)
+
+        conn = self._conn()
+        where_sql = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        total = conn.execute(f"SELECT COUNT(*) FROM {kind}{where_sql}", params).fetchone()[0]
+
+        # Mirror sort_key(): presence flag, value, id.
+        value = self._expr(kind, sort)
+        if sort == "priority":
+            value = "CASE priority " + " ".join(f"WHEN '{name}' THEN {rank}" for name, rank in PRIORITY_RANK.items()) + " END"
+        presence = f"({value} IS NOT NULL)" if descending else f"({value} IS NULL)"
+        key = (presence, f"COALESCE({value}, '')", "id")
+        direction = "DESC" if descending else "ASC"
+
+        page_clauses, page_params = list(clauses), list(params)
+        if after is not None:
+            page_clauses.append(f"({', '.join(key)}) {'<' if descending else '>'} (?, ?, ?)")
+            page_params.extend(after)
+        page_where = f" WHERE {' AND '.join(page_clauses)}" if page_clauses else ""
+        order = ", ".join(f"{part} {direction}" for part in key)
+        sql = f"SELECT data FROM {kind}{page_where} ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            page_params.append(limit + 1)
+
+        page = [json.loads(data) for (data,) in conn.execute(sql, page_params)]
+        next_cursor = None
+        if limit is not None and len(page) > limit:
+            page = page[:limit]
+            next_cursor = sort_key(page[-1], sort, descending)
+        return page, total, next_cursor
+
+    # --- Writes ---
+    @contextmanager
+    def _transaction(self, conn: sqlite3.Connection):
+        if self._deferred is not None:
+            # Part of a batch: its transaction commits or rolls back this write.
+            yield
+            return
+        with STORE_TRANSACTION_SECONDS.time(mode="single"), conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield
+
+    def insert(self, kind: str, record: dict) -> dict:
+        record = dict(record)
+        conn = self._conn()
+        with self._write_lock:
+            with self._transaction(conn):
+                previous = self.get(kind, record["id"])
+                conn.execute(self._upsert_sql(kind), self._row_values(kind, record))
+            self._notify(kind, "create", previous, record)
+        return record
+
+    def update(self, kind: str, record_id: str, changes: dict, op: str = "update") -> Optional[dict]:
+        conn = self._conn()
+        with self._write_lock:
+            with self._transaction(conn):
+                current = self.get(kind, record_id)
+                if current is None:
+                    return None
+                updated = {**current, **changes, "id": record_id}
+                conn.execute(self._upsert_sql(kind), self._row_values(kind, updated))
+            self._notify(kind, op, current, updated)
+        return updated
+
+    def replace(self, kind: str, record_id: str, record: dict) -> Optional[dict]:
+        conn = self._conn()
+        with self._write_lock:
+            with self._transaction(conn):
+                current = self.get(kind, record_id)
+                if current is None:
+                    return None
+                replacement = {**record, "id": record_id}
+                conn.execute(self._upsert_sql(kind), self._row_values(kind, replacement))
+            self._notify(kind, "replace", current, replacement)
+        return replacement
+
+    def delete(self, kind: str, record_id: str) -> Optional[dict]:
+        conn = self._conn()
+        with self._write_lock:
+            with self._transaction(conn):
+                current = self.get(kind, record_id)
+                if current is None:
+                    return None
+                conn.execute(f"DELETE FROM {kind} WHERE id = ?", (record_id,))
+            self._notify(kind, "delete", current, None)
+        return current
+
+    def replace_all(self, kind: str, records: list[dict]) -> None:
+        conn = self._conn()
+        with self._write_lock:
+            with self._transaction(conn):
+                conn.execute(f"DELETE FROM {kind}")
+                conn.executemany(self._upsert_sql(kind), [self._row_values(kind, record) for record in records])
+            self._notify(kind, "reset", None, None)
+
+    # --- Batches ---
+    @contextmanager
+    def batch(self):
+        conn = self._conn()
+        with self._write_lock:
+            if self._deferred is not None:
+                yield
+                return
+
+            self._deferred = []
+            try:
+                with STORE_TRANSACTION_SECONDS.time(mode="batch"), conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    yield
+            finally:
+                notifications, self._deferred = self._deferred, None
+            for notification in notifications:
+                self._notify(*notification)
+
+
+def migrate_json_to_sqlite(files: dict[str, str], db_path: str) -> dict[str, int]:
+    """Import the JSON collection files into a SQLite database.
+
+    Existing rows for each collection are replaced. Returns the number of
+    records imported per collection.
+    """
+    sqlite_store = SqliteStore(db_path, kinds=files.keys())
+    counts = {}
+    for kind, filepath in files.items():
+        records = load_json_file(filepath, [])
+        sqlite_store.replace_all(kind, records)
+        counts[kind] = len(records)
+    sqlite_store.close()
+    return counts
+
+
+DEFAULT_FILES = {
+    "ideas": "ideas.json",
+    "projects": "projects.json",
+    "tasks": "tasks.json",
+}
+
+
+def build_store(files: dict[str, str]) -> Store:
+    """Configure the store from environment variables.
+
+    STORAGE_BACKEND selects "json" (write-behind full snapshots, the default),
+    "journal" (append-only journal with background compaction), "shared"
+    (write-through JSON files safe to share between worker processes) or
+    "sqlite" (database at STORAGE_SQLITE_PATH).
+    """
+    backend = os.environ.get("STORAGE_BACKEND", "json")
+    flush_interval = os.environ.get("STORAGE_FLUSH_INTERVAL")
+    flush_max_changes = os.environ.get("STORAGE_FLUSH_MAX_CHANGES")
+
+    if backend == "journal":
+        return JournalStore(
+            files,
+            flush_interval=float(flush_interval or "30.0"),
+            flush_max_changes=int(flush_max_changes or "1000"),
+            fsync=os.environ.get("STORAGE_JOURNAL_FSYNC", "0") == "1",
+        )
+    if backend == "shared":
+        return SharedJsonStore(files)
+    if backend == "sqlite":
+        return SqliteStore(os.environ.get("STORAGE_SQLITE_PATH", "productivity.db"), kinds=files.keys())
+    if backend == "json":
+        return JsonStore(
+            files,
+            flush_interval=float(flush_interval or "1.0"),
+            flush_max_changes=int(flush_max_changes or "100"),
+        )
+    raise RuntimeError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Storage maintenance commands")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    migrate = subcommands.add_parser("migrate", help="Import the JSON files into SQLite")
+    migrate.add_argument("--db", default=os.environ.get("STORAGE_SQLITE_PATH", "productivity.db"))
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        counts = migrate_json_to_sqlite(DEFAULT_FILES, args.db)
+        for kind, count in counts.items():
+            print(f"Imported {count} {kind} into {args.db}")
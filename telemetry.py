@@ -0,0 +1,271 @@
+"""Structured logging and in-process metrics.
+
+Logging: ``get_logger(name)`` returns a logger whose calls take an event
+name plus keyword fields, e.g. ``log.debug("intent.keyword", intent="help")``.
+Records are rendered as logfmt (or JSON with LOG_FORMAT=json) at the level
+set by LOG_LEVEL (default INFO). The level check comes first, so disabled
+calls cost one comparison and never format their fields.
+
+Metrics: a small Prometheus-compatible registry of counters, gauges and
+histograms with labels. ``REGISTRY.render()`` produces the text exposition
+format served on /metrics. Metrics are process-local; with several workers
+each one reports its own.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+
+LOGGER_ROOT = "taskmanager"
+
+
+# --- Logging ---
+class StructuredLogger:
+    """Event-plus-fields facade over a stdlib logger."""
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(f"{LOGGER_ROOT}.{name}")
+
+    def _log(self, level: int, event: str, fields: dict, exc_info=None) -> None:
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, event, extra={"fields": fields}, exc_info=exc_info)
+
+    def enabled(self, level: int = logging.DEBUG) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def debug(self, event: str, **fields) -> None:
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields) -> None:
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields) -> None:
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, exc_info=None, **fields) -> None:
+        self._log(logging.ERROR, event, fields, exc_info=exc_info)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(name)
+
+
+def _logfmt_value(value) -> str:
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    if text and not any(char in text for char in ' "=\n'):
+        return text
+    return json.dumps(text)
+
+
+class StructuredFormatter(logging.Formatter):
+    """Renders records as logfmt or JSON lines."""
+
+    def __init__(self, style: str = "logfmt"):
+        super().__init__()
+        self.style = style
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {
+            "ts": datetime.utcfromtimestamp(record.created).isoformat(timespec="milliseconds") + "Z",
+            "level": record.levelname.lower(),
+            "logger": record.name.removeprefix(LOGGER_ROOT + "."),
+            "event": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            fields["exc"] = self.formatException(record.exc_info)
+        if self.style == "json":
+            return json.dumps(fields, default=str)
+        return " ".join(f"{key}={_logfmt_value(value)}" for key, value in fields.items())
+
+
+def configure_logging(level: Optional[str] = None, style: Optional[str] = None) -> None:
+    """Send the app's loggers to stderr at LOG_LEVEL in LOG_FORMAT."""
+    logger = logging.getLogger(LOGGER_ROOT)
+    logger.setLevel((level or os.environ.get("LOG_LEVEL", "INFO")).upper())
+    logger.propagate = False
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        logger.addHandler(handler)
+    for handler in logger.handlers:
+        handler.setFormatter(StructuredFormatter(style or os.environ.get("LOG_FORMAT", "logfmt")))
+
+
+# --- Metrics ---
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        """(suffix, rendered labels, value) triples."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_format_number(value)}" for suffix, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonic count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        with self._lock:
+            return [("", _format_labels(self.labels, key), value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(Metric):
+    """Point-in-time value per label set, set directly or read from ``collect`` at render time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (),
+                 collect: Optional[Callable[[], dict[tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+        self.collect = collect
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        if self.collect is not None:
+            values = self.collect()
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [("", _format_labels(self.labels, key), value) for key, value in sorted(values.items())]
+
+
+class Histogram(Metric):
+    """Cumulative-bucket distribution per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: dict[tuple[str, ...], list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the ``with`` block, even if it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[-1] if state else 0
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+        samples = []
+        for key, state in values:
+            for bound, count in zip(self.buckets, state):
+                samples.append(("_bucket", _format_labels(self.labels, key, f'le="{_format_number(bound)}"'), count))
+            samples.append(("_bucket", _format_labels(self.labels, key, 'le="+Inf"'), state[-1]))
+            samples.append(("_sum", _format_labels(self.labels, key), state[-2]))
+            samples.append(("_count", _format_labels(self.labels, key), state[-1]))
+        return samples
+
+
+class Registry:
+    """Named metrics rendered together; registering a name twice returns the first metric."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: tuple[str, ...] = (), collect=None) -> Gauge:
+        return self._register(Gauge(name, documentation, labels, collect))
+
+    def histogram(self, name: str, documentation: str, labels: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+os.environ["REST_ONLY"] = "1"
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    from fastapi.testclient import TestClient
+
+    # The server keeps its collection files relative to the working directory.
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("data"))
+    try:
+        import server
+
+        with TestClient(server.app) as client:
+            yield client
+    finally:
+        os.chdir(cwd)
+
+
+def task_texts(client) -> list[str]:
+    return sorted(task["text"] for task in client.get("/tasks").json())
+
+
+def test_atomic_batch_applies_nothing_when_one_operation_fails(client):
+    before = task_texts(client)
+    response = client.post("/tasks/batch", json={"atomic": True, "operations": [
+        {"op": "create", "task": {"text": "first"}},
+        {"op": "complete", "id": "no-such-task"},
+    ]})
+    assert response.status_code == 409
+    assert response.json()["detail"]["failed"][0]["status"] == 404
+    assert task_texts(client) == before
+
+
+def test_create_cannot_overwrite_an_existing_task(client):
+    existing = client.post("/tasks", json={"text": "keep me"}).json()
+    response = client.post("/tasks/batch", json={"atomic": True, "operations": [
+        {"op": "create", "task": {"id": existing["id"], "text": "overwritten"}},
+    ]})
+    assert response.status_code == 409
+    assert response.json()["detail"]["failed"][0]["status"] == 409
+    assert "keep me" in task_texts(client)
+    assert "overwritten" not in task_texts(client)
+
+
+def test_non_atomic_batch_reports_failures_per_operation(client):
+    existing = client.post("/tasks", json={"text": "original"}).json()
+    response = client.post("/tasks/batch", json={"atomic": False, "output": "full", "operations": [
+        {"op": "create", "task": {"text": "created"}},
+        {"op": "create", "task": {"id": existing["id"], "text": "clash"}},
+        {"op": "move", "id": existing["id"], "projectId": None},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["applied"], body["failed"]) == (2, 1)
+    assert [result["ok"] for result in body["results"]] == [True, False, True]
+    assert "created" in task_texts(client)
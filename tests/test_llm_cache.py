@@ -0,0 +1,44 @@
+import asyncio
+import sqlite3
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+import llm_cache
+from llm_cache import LLMCache
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return AIMessage(content=f"reply {self.calls}")
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    model = CountingModel()
+    messages = [HumanMessage(content="categorize   this")]
+
+    first = LLMCache(disk_path=path)
+    assert asyncio.run(first.ainvoke(model, messages, "site")).content == "reply 1"
+
+    second = LLMCache(disk_path=path)
+    assert asyncio.run(second.ainvoke(model, [HumanMessage(content="categorize this")], "site")).content == "reply 1"
+    assert model.calls == 1
+    assert second.stats["site"]["disk_hit"] == 1
+
+
+def test_expired_rows_are_purged(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "PURGE_EVERY", 3)
+    path = str(tmp_path / "cache.db")
+    cache = LLMCache(ttl_seconds=-1, disk_path=path)
+    cache.put("stale", "old reply")
+
+    LLMCache(disk_path=path)  # opening purges
+    assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 0
+
+    cache.put("stale 2", "old reply")
+    cache.put("stale 3", "old reply")  # the third write purges
+    assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 0
@@ -0,0 +1,135 @@
+from datetime import date
+
+import pytest
+
+from local_parser import parse_local
+
+TASK_IDS = [
+    "8d974b68-1c2e-4f0a-9b7d-3e5f6a7b8c9d",
+    "2025abcd-0000-4000-8000-000000000001",
+    "cafe1234-0000-4000-8000-000000000002",
+    "deadbeef-0000-4000-8000-000000000003",
+    "beef0000-0000-4000-8000-000000000004",
+    "8d97aaaa-0000-4000-8000-000000000005",
+]
+
+
+def ids_with_prefix(prefix: str, limit: int = 2) -> list[str]:
+    return [task_id for task_id in TASK_IDS if task_id.startswith(prefix)][:limit]
+
+
+def parse(intent: str, text: str):
+    return parse_local(intent, text, [], ids_with_prefix, today=date(2025, 1, 1))
+
+
+@pytest.mark.parametrize("intent, text", [
+    ("delete_task", "delete the notes from 2025"),
+    ("delete_task", "delete the cafe reservation"),
+    ("delete_task", "remove dead code task"),
+    ("delete_task", "delete beef"),
+    ("delete_task", "delete 2025"),
+    ("complete_task", "finish the 2025 budget"),
+    ("complete_task", "complete 8d97"),
+    ("complete_task", "complete task cafe"),
+    ("complete_task", "mark deadbeef and 8d974b68 as done"),
+])
+def test_hex_looking_words_do_not_resolve(intent, text):
+    assert parse(intent, text) is None
+
+
+@pytest.mark.parametrize("intent, text, task_id", [
+    ("complete_task", "complete 8d974b68", TASK_IDS[0]),
+    ("complete_task", "please complete task 8d974b68…", TASK_IDS[0]),
+    ("complete_task", "complete 8d974b68-…", TASK_IDS[0]),
+    ("complete_task", "mark deadbeef as done", TASK_IDS[3]),
+    ("delete_task", "delete task #cafe1234", TASK_IDS[2]),
+    ("delete_task", "remove 2025abcd-0000", TASK_IDS[1]),
+    ("delete_task", "delete 8d974b68-1c2e-4f0a-9b7d-3e5f6a7b8c9d", TASK_IDS[0]),
+])
+def test_whole_argument_ids_resolve(intent, text, task_id):
+    assert parse(intent, text) == {"taskId": task_id}
+
+
+def test_ambiguous_or_unknown_prefix_falls_back():
+    assert parse("complete_task", "complete 8d97") is None
+    assert parse("complete_task", "complete 12345678") is None
+
+
+PROJECTS = ["Work", "Home Reno"]
+TODAY = date(2026, 10, 17)  # a Saturday
+
+
+def parse_task(text: str, intent: str = "add_task"):
+    return parse_local(intent, text, PROJECTS, ids_with_prefix, today=TODAY)
+
+
+@pytest.mark.parametrize("intent, text, expected", [
+    ("add_task", "add buy groceries", {"text": "buy groceries"}),
+    ("add_task", "Add a new task: call mom to say hi", {"text": "call mom to say hi"}),
+    ("add_task", "please todo water plants", {"text": "water plants"}),
+    ("add_idea", "new idea: solar kettle", {"text": "solar kettle"}),
+    ("add_idea", "add an idea about a podcast", {"text": "a podcast"}),
+    ("add_project", 'create project called "Garden"', {"text": "Garden"}),
+    ("add_task", "can you add milk", None),
+])
+def test_verb_detection(intent, text, expected):
+    assert parse_task(text, intent) == expected
+
+
+@pytest.mark.parametrize("text, priority, remaining", [
+    ("add fix roof high priority", "high", "fix roof"),
+    ("add fix roof priority: low", "low", "fix roof"),
+    ("add send report p2", "medium", "send report"),
+    ("add urgent: call the bank", "high", "call the bank"),
+    ("add call the bank asap", "high", "call the bank"),
+    ("add review slides (urgent)", "high", "review slides"),
+    ("add urgent care appointment", None, "urgent care appointment"),
+    ("add read the asap guidelines", None, "read the asap guidelines"),
+])
+def test_priority(text, priority, remaining):
+    args = parse_task(text)
+    assert args.get("priority") == priority
+    assert args["text"] == remaining
+
+
+@pytest.mark.parametrize("text, due, remaining", [
+    ("add buy milk tomorrow", "2026-10-18", "buy milk"),
+    ("add buy milk by tomorrow", "2026-10-18", "buy milk"),
+    ("add call mom on today", "2026-10-17", "call mom"),
+    ("add pay rent due 2026-11-01", "2026-11-01", "pay rent"),
+    ("add fix roof by friday", "2026-10-23", "fix roof"),
+    ("add plan trip by next saturday", "2026-10-24", "plan trip"),
+    ("add renew passport in 10 days", "2026-10-27", "renew passport"),
+    ("add read today's news", None, "read today's news"),
+    ("add buy tomorrowland tickets", None, "buy tomorrowland tickets"),
+])
+def test_due_date(text, due, remaining):
+    args = parse_task(text)
+    assert args.get("dueDate") == due
+    assert args["text"] == remaining
+
+
+@pytest.mark.parametrize("text, project, remaining", [
+    ("add fix roof to home reno", "Home Reno", "fix roof"),
+    ("add send report in the Work project", "Work", "send report"),
+    ("add pay rent to inbox", None, "pay rent"),
+    ("add call mom to say hi", None, "call mom to say hi"),
+    ("add call the bank asap to work by friday", "Work", "call the bank"),
+])
+def test_project(text, project, remaining):
+    args = parse_task(text)
+    assert args.get("project") == project
+    assert args["text"] == remaining
+
+
+@pytest.mark.parametrize("intent, text", [
+    ("add_task", "new task"),
+    ("add_task", "add something"),
+    ("add_task", "add tomorrow"),
+    ("add_task", "add thing with priority of sorts"),
+    ("add_task", "add report due whenever"),
+    ("add_idea", "new idea:"),
+    ("list_all", "list everything"),
+])
+def test_falls_back_to_the_llm(intent, text):
+    assert parse_task(text, intent) is None
@@ -0,0 +1,41 @@
+import random
+
+from search import ProjectRetriever
+
+WORDS = "budget garden slides invoice roof paint report taxes".split()
+
+
+class EmptyStore:
+    def all(self, kind):
+        return []
+
+
+def test_profile_lengths_follow_every_change():
+    retriever = ProjectRetriever()
+    on_change = retriever.listener(EmptyStore())
+    rng = random.Random(0)
+    tasks = {}
+    for i in range(2000):
+        roll = rng.random()
+        if roll < 0.05:
+            project_id = f"p{rng.randrange(5)}"
+            on_change("projects", "update", {"id": project_id}, {"id": project_id, "name": " ".join(rng.sample(WORDS, 2))})
+        elif roll < 0.7 or not tasks:
+            task = {"id": f"t{i}", "text": " ".join(rng.choices(WORDS, k=3)), "projectId": f"p{rng.randrange(5)}"}
+            tasks[task["id"]] = task
+            on_change("tasks", "create", None, task)
+        else:
+            on_change("tasks", "delete", tasks.pop(rng.choice(list(tasks))), None)
+
+    for project_id, profile in retriever._profiles.items():
+        assert abs(retriever._lengths[project_id] - sum(profile.values())) < 1e-6
+
+
+def test_rank_prefers_the_project_whose_tasks_share_terms():
+    retriever = ProjectRetriever()
+    on_change = retriever.listener(EmptyStore())
+    on_change("projects", "create", None, {"id": "home", "name": "Home"})
+    on_change("projects", "create", None, {"id": "work", "name": "Work"})
+    on_change("tasks", "create", None, {"id": "a", "text": "paint the fence", "projectId": "home"})
+    on_change("tasks", "create", None, {"id": "b", "text": "quarterly budget slides", "projectId": "work"})
+    assert retriever.rank("finish budget slides", ["home", "work"], 2) == ["work", "home"]
@@ -0,0 +1,198 @@
+import json
+import os
+
+import pytest
+
+from storage import CommitIntent, JournalStore, JsonStore, SharedJsonStore, SqliteStore, write_json_files
+
+KINDS = ("ideas", "projects", "tasks")
+
+
+def files_in(directory) -> dict[str, str]:
+    return {kind: str(directory / f"{kind}.json") for kind in KINDS}
+
+
+def open_journal_store(directory) -> JournalStore:
+    # A long interval keeps the background flusher from compacting mid-test.
+    store = JournalStore(files_in(directory), flush_interval=3600)
+    store.start()
+    return store
+
+
+def crash(store: JournalStore) -> None:
+    """Drop the store without the final compaction close() would do."""
+    for journal in store._journals.values():
+        journal.close()
+    store._journals.clear()
+
+
+def test_journal_survives_repeated_torn_appends(tmp_path):
+    store = open_journal_store(tmp_path)
+    store.insert("tasks", {"id": "a", "text": "before the first crash"})
+    crash(store)
+    with open(tmp_path / "tasks.json.journal", "a") as f:
+        f.write('{"op": "create", "id": "torn", "da')
+
+    store = open_journal_store(tmp_path)
+    assert [task["id"] for task in store.all("tasks")] == ["a"]
+    store.insert("tasks", {"id": "b", "text": "after the first crash"})
+    crash(store)
+
+    store = open_journal_store(tmp_path)
+    assert [task["id"] for task in store.all("tasks")] == ["a", "b"]
+    store.close()
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(tmp_path):
+    store = open_journal_store(tmp_path)
+    store.insert("tasks", {"id": "a", "text": "first"})
+    store.update("tasks", "a", {"text": "renamed"})
+    store.insert("tasks", {"id": "b", "text": "second"})
+    store.delete("tasks", "b")
+    store.flush()
+
+    with open(tmp_path / "tasks.json") as f:
+        assert json.load(f) == [{"id": "a", "text": "renamed"}]
+    assert not os.path.exists(tmp_path / "tasks.json.journal.compacting")
+    crash(store)
+
+    store = open_journal_store(tmp_path)
+    assert store.all("tasks") == [{"id": "a", "text": "renamed"}]
+    store.close()
+
+
+def test_replay_finishes_an_interrupted_compaction(tmp_path):
+    store = open_journal_store(tmp_path)
+    store.insert("tasks", {"id": "a", "text": "compacting"})
+    crash(store)
+    # A crash after rotating the journal but before the snapshot was written
+    os.replace(tmp_path / "tasks.json.journal", tmp_path / "tasks.json.journal.compacting")
+    with open(tmp_path / "tasks.json.journal", "w") as f:
+        f.write(json.dumps({"op": "update", "id": "a", "data": {"text": "after rotation"}}) + "\n")
+
+    store = open_journal_store(tmp_path)
+    assert store.all("tasks") == [{"id": "a", "text": "after rotation"}]
+    store.close()
+
+
+BACKENDS = {
+    "json": lambda directory: JsonStore(files_in(directory), flush_interval=3600),
+    "journal": lambda directory: JournalStore(files_in(directory), flush_interval=3600),
+    "shared": lambda directory: SharedJsonStore(files_in(directory)),
+    "sqlite": lambda directory: SqliteStore(str(directory / "store.db")),
+}
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def reopen(request, tmp_path):
+    """Open the backend on tmp_path; each call closes the previous store first."""
+    opened = []
+
+    def open_store():
+        if opened:
+            opened[-1].close()
+        store = BACKENDS[request.param](tmp_path)
+        store.start()
+        opened.append(store)
+        return store
+
+    yield open_store
+    opened[-1].close()
+
+
+def test_failed_batch_rolls_back_every_write(reopen):
+    store = reopen()
+    store.insert("projects", {"id": "p", "name": "Home"})
+    store.insert("tasks", {"id": "a", "text": "keep", "projectId": "p"})
+    heard = []
+    store.add_listener(lambda kind, op, before, after: heard.append((kind, op)))
+
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            store.update("tasks", "a", {"text": "changed"})
+            store.insert("tasks", {"id": "b", "text": "new", "projectId": "p"})
+            store.delete("projects", "p")
+            raise RuntimeError("abort")
+
+    assert heard == []
+    for current in (store, reopen()):
+        assert current.all("tasks") == [{"id": "a", "text": "keep", "projectId": "p"}]
+        assert current.get("projects", "p") == {"id": "p", "name": "Home"}
+
+
+def test_committed_batch_persists_and_notifies_in_order(reopen):
+    store = reopen()
+    heard = []
+    store.add_listener(lambda kind, op, before, after: heard.append((kind, op)))
+
+    with store.batch():
+        store.insert("projects", {"id": "p", "name": "Home"})
+        store.insert("tasks", {"id": "a", "text": "task", "projectId": "p"})
+        assert heard == []
+
+    assert heard == [("projects", "create"), ("tasks", "create")]
+    store = reopen()
+    assert store.get("tasks", "a") == {"id": "a", "text": "task", "projectId": "p"}
+    assert store.get("projects", "p") == {"id": "p", "name": "Home"}
+
+
+def test_commit_is_all_or_nothing_before_the_intent(tmp_path, monkeypatch):
+    files = files_in(tmp_path)
+    intent = CommitIntent(str(tmp_path / "store.intent"))
+    write_json_files({files["tasks"]: [{"id": "a"}], files["projects"]: [{"id": "p"}]}, intent)
+
+    def no_space(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(intent, "write", no_space)
+    with pytest.raises(OSError):
+        write_json_files({files["tasks"]: [{"id": "b"}], files["projects"]: [{"id": "q"}]}, intent)
+
+    with open(files["tasks"]) as f:
+        assert json.load(f) == [{"id": "a"}]
+    with open(files["projects"]) as f:
+        assert json.load(f) == [{"id": "p"}]
+    assert sorted(os.listdir(tmp_path)) == ["projects.json", "tasks.json"]
+
+
+def test_store_finishes_a_commit_interrupted_after_its_intent(tmp_path):
+    files = files_in(tmp_path)
+    store = JsonStore(files, flush_interval=3600)
+    store.start()
+    store.insert("tasks", {"id": "a"})
+    store.close()
+
+    # Staged snapshots plus the intent, as a crash just before the renames leaves them
+    actions = []
+    for kind, records in (("tasks", [{"id": "a"}, {"id": "b"}]), ("projects", [{"id": "p"}])):
+        staged = files[kind] + ".staged.tmp"
+        with open(staged, "w") as f:
+            json.dump(records, f)
+        actions.append({"rename": staged, "to": files[kind]})
+    CommitIntent(str(tmp_path / "store.intent")).write(actions)
+
+    store = JsonStore(files, flush_interval=3600)
+    store.start()
+    assert [task["id"] for task in store.all("tasks")] == ["a", "b"]
+    assert [project["id"] for project in store.all("projects")] == ["p"]
+    assert not os.path.exists(tmp_path / "store.intent")
+    store.close()
+
+
+def test_journal_intent_replays_each_append_once(tmp_path):
+    store = open_journal_store(tmp_path)
+    store.insert("tasks", {"id": "a", "text": "one"})
+    crash(store)
+
+    line = json.dumps({"op": "batch", "tx": "t1", "entries": [{"op": "create", "id": "b", "data": {"id": "b", "text": "two"}}]}) + "\n"
+    intent = CommitIntent(str(tmp_path / "store.intent"))
+    intent.write([{"append": str(tmp_path / "tasks.json.journal"), "line": line}])
+    assert intent.recover() == 1
+    intent.write([{"append": str(tmp_path / "tasks.json.journal"), "line": line}])
+    intent.recover()  # already applied: a no-op
+
+    with open(tmp_path / "tasks.json.journal") as f:
+        assert f.read().count('"tx": "t1"') == 1
+    store = open_journal_store(tmp_path)
+    assert [task["id"] for task in store.all("tasks")] == ["a", "b"]
+    store.close()